@@ -0,0 +1,36 @@
+"""
+Module-level Supabase clients, created on first use.
+
+Creating a client builds its auth, storage and PostgREST sub-clients and
+takes a couple of hundred milliseconds. Modules that keep one client for
+all requests hold a LazyClient instead, so importing them (and therefore
+app.main, which the desktop bundle imports before opening its window)
+does not pay for it.
+"""
+
+import threading
+from typing import Any
+
+from .config import settings
+
+
+class LazyClient:
+    """Stands in for a Supabase Client; the real one is created on first attribute access."""
+
+    def __init__(self, key_setting: str = 'SUPABASE_KEY'):
+        # Name of the settings attribute holding the API key; SUPABASE_KEY when it is unset
+        self._key_setting = key_setting
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(settings.SUPABASE_URL,
+                                                 getattr(settings, self._key_setting) or settings.SUPABASE_KEY)
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
@@ -71,6 +71,81 @@ class Settings:
         "MAILERSEND_URL", "https://api.mailersend.com/v1/email"
     )
 
+    # Email outbox ("mailersend" or "fake" for local runs)
+    EMAIL_PROVIDER: str = os.getenv("EMAIL_PROVIDER", "mailersend")
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+    EMAIL_OUTBOX_RATE_PER_SECOND: float = float(os.getenv("EMAIL_OUTBOX_RATE_PER_SECOND", "10"))
+
+    # Buffered notification writes
+    NOTIFICATION_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+    NOTIFICATION_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("NOTIFICATION_FLUSH_INTERVAL_SECONDS", "2"))
+    NOTIFICATION_COALESCE_WINDOW_SECONDS: float = float(os.getenv("NOTIFICATION_COALESCE_WINDOW_SECONDS", "300"))
+
+    # Retention of expired sessions, notifications and reset codes
+    RETENTION_INTERVAL_MINUTES: int = int(os.getenv("RETENTION_INTERVAL_MINUTES", "30"))
+    RETENTION_CHUNK_SIZE: int = int(os.getenv("RETENTION_CHUNK_SIZE", "500"))
+    RETENTION_MAX_CHUNKS_PER_RUN: int = int(os.getenv("RETENTION_MAX_CHUNKS_PER_RUN", "40"))
+    RETENTION_CHUNK_PAUSE_SECONDS: float = float(os.getenv("RETENTION_CHUNK_PAUSE_SECONDS", "0.2"))
+
+    # Referral stats / downline page cache
+    REFERRAL_CACHE_TTL_SECONDS: float = float(os.getenv("REFERRAL_CACHE_TTL_SECONDS", "60"))
+    # Admin payments headline totals cache
+    PAYMENT_TOTALS_CACHE_TTL_SECONDS: float = float(os.getenv("PAYMENT_TOTALS_CACHE_TTL_SECONDS", "30"))
+
+    # Values reserved per id_blocks round trip (referral codes, account numbers)
+    ID_BLOCK_SIZE: int = int(os.getenv("ID_BLOCK_SIZE", "100"))
+
+    # Sweep for investors whose due dates were never initialised
+    DUE_DATE_SYNC_INTERVAL_HOURS: int = int(os.getenv("DUE_DATE_SYNC_INTERVAL_HOURS", "24"))
+    # Days of upcoming due dates held by the in-process due-date timer
+    DUE_TIMER_HORIZON_DAYS: int = int(os.getenv("DUE_TIMER_HORIZON_DAYS", "8"))
+
+    # Per-request query budget (0 disables a check); strict mode raises instead of logging
+    QUERY_BUDGET_PER_REQUEST: int = int(os.getenv("QUERY_BUDGET_PER_REQUEST", "25"))
+    QUERY_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+    QUERY_BUDGET_STRICT: bool = os.getenv("QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes")
+
+    # Bearer token required by /metrics; the endpoint returns 404 while it is unset
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # FastJSONResponse bodies at least this large are gzipped when accepted (0 disables)
+    JSON_GZIP_MIN_BYTES: int = int(os.getenv("JSON_GZIP_MIN_BYTES", "1024"))
+    JSON_GZIP_LEVEL: int = int(os.getenv("JSON_GZIP_LEVEL", "5"))
+
+    # Logging: root level, per-logger levels ("app.routes.portfolio=DEBUG,httpx=WARNING"),
+    # "json" or "text" output, share of DEBUG records kept, and queue bound before dropping
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    # On-demand sampling profiler (/admin/profiling): sample interval, longest
+    # session or wait for requests, and finished profiles kept in memory
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_SECONDS: int = int(os.getenv("PROFILING_MAX_SECONDS", "300"))
+    PROFILING_KEEP: int = int(os.getenv("PROFILING_KEEP", "10"))
+
+    # Largest customer-care attachment accepted (the request body is capped just above it)
+    CUSTOMER_CARE_MAX_ATTACHMENT_BYTES: int = int(os.getenv("CUSTOMER_CARE_MAX_ATTACHMENT_BYTES", str(5 * 1024 * 1024)))
+
+    # Bulk withdrawal payouts ("paystack", or "fake" to stub transfers locally): transfers
+    # per Paystack bulk request (Paystack allows 100), withdrawals per run, runs kept in memory
+    PAYOUT_PROVIDER: str = os.getenv("PAYOUT_PROVIDER", "paystack").lower()
+    PAYOUT_CHUNK_SIZE: int = int(os.getenv("PAYOUT_CHUNK_SIZE", "100"))
+    PAYOUT_MAX_ITEMS: int = int(os.getenv("PAYOUT_MAX_ITEMS", "1000"))
+    PAYOUT_RUNS_KEEP: int = int(os.getenv("PAYOUT_RUNS_KEEP", "20"))
+
+    # Per-process spending-account cache (write-through; other workers see changes after the TTL)
+    SPENDING_ACCOUNT_CACHE_TTL_SECONDS: float = float(os.getenv("SPENDING_ACCOUNT_CACHE_TTL_SECONDS", "30"))
+    SPENDING_ACCOUNT_CACHE_SIZE: int = int(os.getenv("SPENDING_ACCOUNT_CACHE_SIZE", "10000"))
+
+    # Optimistic (compare-and-swap) row updates: attempts before giving up, and the
+    # base backoff between attempts, doubled each retry and jittered
+    CAS_MAX_ATTEMPTS: int = int(os.getenv("CAS_MAX_ATTEMPTS", "8"))
+    CAS_BACKOFF_MS: float = float(os.getenv("CAS_BACKOFF_MS", "10"))
+
 
 # Create the settings instance
 settings = Settings()
@@ -0,0 +1,134 @@
+"""
+In-process timer of upcoming investor due dates.
+
+A min-heap keyed on the start of each investor's next_due_date. The
+scheduler loads it at startup from the due-date index, services update it
+whenever they write a new next_due_date, and a one-shot scheduler job is
+armed for the earliest entry so payouts run when they fall due instead of
+on the next hourly tick. The hourly interest job stays as a safety sweep
+for anything the timer misses (other processes, failed payouts, restarts).
+
+Entries are replaced lazily: scheduling an investor again records the new
+date and leaves the old heap entry to be discarded when it surfaces.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DueDate = Union[str, date, datetime, None]
+
+
+def _parse_due_date(value: DueDate) -> Optional[date]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # Column is a date, but some writers store full ISO timestamps.
+    return date.fromisoformat(str(value)[:10])
+
+
+class DueDateTimer:
+    """Min-heap of (due_at, investor_id) with lazy replacement."""
+
+    def __init__(self, horizon_days: int = 8):
+        self.horizon_days = horizon_days
+        self._heap: List[Tuple[datetime, str]] = []
+        self._due_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._waker: Optional[Callable[[datetime], None]] = None
+        self._armed_for: Optional[datetime] = None
+
+    def set_waker(self, waker: Optional[Callable[[datetime], None]]) -> None:
+        """Register the callback that arms a wake-up at a given time (None disables it)."""
+        with self._lock:
+            self._waker = waker
+            self._armed_for = None
+        self.rearm()
+
+    def load(self, entries: Iterable[Tuple[str, DueDate]]) -> int:
+        """Replace the timer contents with (investor_id, next_due_date) pairs."""
+        with self._lock:
+            self._heap = []
+            self._due_at = {}
+            for investor_id, due in entries:
+                self._add_locked(investor_id, _parse_due_date(due))
+            heapq.heapify(self._heap)
+            self._armed_for = None
+            count = len(self._due_at)
+        self.rearm()
+        return count
+
+    def schedule(self, investor_id: str, next_due_date: DueDate) -> None:
+        """Record an investor's new next_due_date; None removes them."""
+        with self._lock:
+            self._due_at.pop(investor_id, None)
+            due_at = self._add_locked(investor_id, _parse_due_date(next_due_date), push=True)
+            earlier = due_at is not None and (self._armed_for is None or due_at < self._armed_for)
+        if earlier:
+            self.rearm()
+
+    def discard(self, investor_id: str) -> None:
+        self.schedule(investor_id, None)
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[str]:
+        """Remove and return every investor due at or before `now`."""
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, investor_id = heapq.heappop(self._heap)
+                if self._due_at.get(investor_id) == due_at:
+                    del self._due_at[investor_id]
+                    due.append(investor_id)
+            self._armed_for = None
+        return due
+
+    def next_due_at(self) -> Optional[datetime]:
+        with self._lock:
+            return self._peek_locked()
+
+    def rearm(self) -> None:
+        """Arm the waker for the earliest pending entry, if it changed."""
+        with self._lock:
+            waker = self._waker
+            next_at = self._peek_locked()
+            if waker is None or next_at is None or next_at == self._armed_for:
+                return
+            self._armed_for = next_at
+        try:
+            waker(max(next_at, datetime.now()))
+        except Exception as e:
+            logger.error(f"Failed to arm due-date timer: {str(e)}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._due_at)
+
+    def _add_locked(self, investor_id: str, due: Optional[date], push: bool = False) -> Optional[datetime]:
+        if due is None or due > date.today() + timedelta(days=self.horizon_days):
+            # Beyond the horizon: picked up by the next reload.
+            return None
+        due_at = datetime.combine(due, time.min)
+        self._due_at[investor_id] = due_at
+        if push:
+            heapq.heappush(self._heap, (due_at, investor_id))
+        else:
+            self._heap.append((due_at, investor_id))
+        return due_at
+
+    def _peek_locked(self) -> Optional[datetime]:
+        # Drop stale heads so the armed time reflects a live entry.
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+
+due_date_timer = DueDateTimer(horizon_days=settings.DUE_TIMER_HORIZON_DAYS)
@@ -0,0 +1,44 @@
+"""
+Chunk encoders for streaming report exports.
+
+Each encoder turns an iterator of row pages into an iterator of byte chunks,
+one chunk per page, for use with StreamingResponse.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def csv_chunks(pages: Iterable[List[Dict[str, Any]]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header-only exports still produce a file
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(pages: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for page in pages:
+        yield ''.join(json.dumps(row, default=str) + '\n' for row in page).encode('utf-8')
+
+
+def encode_export(pages: Iterable[List[Dict[str, Any]]], columns: List[str], fmt: str) -> Iterator[bytes]:
+    """Encode row pages as CSV or NDJSON chunks."""
+    if fmt == 'csv':
+        return csv_chunks(pages, columns)
+    if fmt == 'ndjson':
+        return ndjson_chunks(pages)
+    raise ValueError(f"Unsupported export format '{fmt}'")
@@ -0,0 +1,210 @@
+"""
+Non-blocking, structured application logging.
+
+`setup_logging()` puts a single QueueHandler on the root logger. A request
+thread (or the event loop) only filters the record, resolves its message
+and enqueues it; a QueueListener thread formats it and writes to stdout.
+A full queue drops the record and counts it in log_records_dropped_total
+rather than blocking the caller.
+
+Records are written as one JSON object per line (LOG_FORMAT=json, the
+default) or as plain text for local runs (LOG_FORMAT=text). Each record
+carries the id of the HTTP request it was logged under: RequestIdMiddleware
+takes it from the X-Request-ID header, or generates one, and echoes it on
+the response.
+
+Levels are set with LOG_LEVEL for the root logger and LOG_LEVELS for
+individual loggers, e.g. "app.routes.portfolio=DEBUG,httpx=WARNING".
+DEBUG records are kept with probability LOG_DEBUG_SAMPLE_RATE; a call can
+set its own rate with `extra={'sample_rate': 0.01}`.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .config import settings
+from . import metrics
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+_INTERNAL_ATTRIBUTES = {'request_id', 'sample_rate'}
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'app.routes.portfolio=DEBUG,httpx=WARNING' to {logger name: level}."""
+    levels = {}
+    for part in spec.split(','):
+        name, _, level = part.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return {name: level for name, level in levels.items() if isinstance(level, int)}
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id and applies DEBUG sampling in the caller's thread, before queueing."""
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG:
+            rate = getattr(record, 'sample_rate', self.debug_sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with `extra=` fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        if record.threadName != 'MainThread':
+            entry['thread'] = record.threadName
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in _INTERNAL_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, 'request_id', None) or '-'
+        return super().format(record)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now, while its arguments still hold their
+        # current values; formatting (timestamps, JSON, tracebacks) is left
+        # to the listener thread. exc_info stays attached for it.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(stream=None) -> None:
+    """Route all logging through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(TextFormatter() if settings.LOG_FORMAT == 'text' else JSONFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def capture_server_loggers() -> None:
+    """
+    Send uvicorn's own records (access log included) through the queue too.
+
+    uvicorn installs stream handlers when it builds its Config, which may be
+    after setup_logging(), so this runs from the app's startup event.
+    """
+    for name in ('uvicorn', 'uvicorn.error', 'uvicorn.access'):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each HTTP request an id for its log records."""
+
+    header = b'x-request-id'
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get('headers', []):
+            if name == self.header:
+                # Client-supplied ids are trusted only up to a sane length
+                request_id = value.decode('latin-1')[:64] or None
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = _request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((self.header, request_id.encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
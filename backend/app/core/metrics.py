@@ -0,0 +1,275 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Counters, gauges and histograms are plain dicts keyed by label values and
+guarded by one lock each, so recording a sample costs a dict update. No
+client library is required; `render()` writes exposition format 0.0.4.
+
+What is recorded, and where:
+- HTTP latency per route template and in-flight requests: MetricsMiddleware
+- Supabase calls per table/operation: app/core/query_stats.py execute wrapper
+- Paystack / MailerSend latency: `external_call()` around SDK calls
+- Scheduler job duration, investors processed and failures: `record_job()`
+- Cache hits and misses: caches passed to `register_cache()`
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0)
+
+_metrics: List['_Metric'] = []
+_caches: Dict[str, object] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._values.get(labels)
+            return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{base} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{base} {cumulative}')
+        return lines
+
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template.',
+    ('method', 'route', 'status')
+)
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests currently being served.')
+
+# Database
+SUPABASE_CALL_DURATION = Histogram(
+    'supabase_call_duration_seconds', 'Supabase (PostgREST) round-trip latency by table and operation.',
+    ('table', 'operation')
+)
+SUPABASE_CALL_ERRORS = Counter(
+    'supabase_call_errors_total', 'Supabase calls that raised.', ('table', 'operation')
+)
+ROW_VERSION_CONFLICTS = Counter(
+    'row_version_conflicts_total', 'Versioned updates retried because another writer changed the row first.',
+    ('table',)
+)
+ROW_VERSION_FAILURES = Counter(
+    'row_version_failures_total', 'Versioned updates abandoned after CAS_MAX_ATTEMPTS conflicts.', ('table',)
+)
+
+# Third-party APIs
+EXTERNAL_CALL_DURATION = Histogram(
+    'external_call_duration_seconds', 'Paystack / MailerSend API call latency.',
+    ('service', 'operation', 'outcome')
+)
+
+# Scheduler
+JOB_DURATION = Histogram('scheduler_job_duration_seconds', 'Scheduler job run time.', ('job',), JOB_BUCKETS)
+JOB_FAILURES = Counter('scheduler_job_failures_total', 'Scheduler job runs that failed.', ('job',))
+JOB_INVESTORS_CHECKED = Counter(
+    'scheduler_investors_checked_total', 'Investors examined by scheduler jobs.', ('job',)
+)
+JOB_INVESTORS_PROCESSED = Counter(
+    'scheduler_investors_processed_total', 'Investors paid or updated by scheduler jobs.', ('job',)
+)
+JOB_INVESTOR_ERRORS = Counter(
+    'scheduler_investor_errors_total', 'Per-investor errors reported by scheduler jobs.', ('job',)
+)
+
+# Logging
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log records dropped because the log queue was full.')
+
+
+@contextmanager
+def external_call(service: str, operation: str) -> Iterator[None]:
+    """Time a third-party API call; exceptions are recorded as outcome="error" and re-raised."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - started, service, operation, outcome)
+
+
+def record_job(job: str, seconds: float, result: Optional[dict] = None, failed: bool = False) -> None:
+    """Record one scheduler job run and the counts in its service result, if any."""
+    JOB_DURATION.observe(seconds, job)
+    if failed or (isinstance(result, dict) and result.get('success') is False):
+        JOB_FAILURES.inc(job)
+    if isinstance(result, dict):
+        JOB_INVESTORS_CHECKED.inc(job, amount=result.get('checked_count', 0) or 0)
+        JOB_INVESTORS_PROCESSED.inc(job, amount=result.get('processed_count', 0) or 0)
+        JOB_INVESTOR_ERRORS.inc(job, amount=len(result.get('errors') or []))
+
+
+def register_cache(name: str, cache) -> None:
+    """Expose a TTLCache's hits and misses (read at scrape time)."""
+    _caches[name] = cache
+
+
+def _render_caches() -> List[str]:
+    lines = [
+        '# HELP cache_requests_total Cache lookups by result.',
+        '# TYPE cache_requests_total counter',
+    ]
+    ratios = [
+        '# HELP cache_hit_ratio Share of cache lookups that hit since start.',
+        '# TYPE cache_hit_ratio gauge',
+    ]
+    for name, cache in sorted(_caches.items()):
+        hits, misses = getattr(cache, 'hits', 0), getattr(cache, 'misses', 0)
+        lines.append(f'cache_requests_total{{cache="{_escape(name)}",result="hit"}} {hits}')
+        lines.append(f'cache_requests_total{{cache="{_escape(name)}",result="miss"}} {misses}')
+        total = hits + misses
+        ratios.append(f'cache_hit_ratio{{cache="{_escape(name)}"}} {_format_value(hits / total if total else 0.0)}')
+    return lines + ratios
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in list(_metrics):
+        lines.extend(metric.render())
+    lines.extend(_render_caches())
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template and in-flight requests."""
+
+    def __init__(self, app, clock: Callable[[], float] = time.perf_counter):
+        self.app = app
+        self.clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = self.clock()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route on the shared scope.
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or 'unmatched'
+            HTTP_REQUEST_DURATION.observe(
+                self.clock() - started, scope.get('method', ''), template, str(status['code'])
+            )
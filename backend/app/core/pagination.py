@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on a page, encoded as opaque
+URL-safe base64 JSON. The next page asks for rows strictly after that key,
+so every page costs the same index range scan no matter how deep it is.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort key of the last row on a page."""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor from `encode_cursor`. Raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def clamp_page_size(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE,
+                    maximum: int = MAX_PAGE_SIZE) -> int:
+    if not limit or limit < 1:
+        return default
+    return min(limit, maximum)
+
+
+def descending_keyset_filter(sort_column: str, sort_value: Any,
+                             id_column: str, id_value: Any) -> str:
+    """
+    PostgREST `or` filter selecting rows after (sort_value, id_value) when
+    ordering by sort_column DESC, id_column DESC.
+    """
+    return (
+        f'{sort_column}.lt."{sort_value}",'
+        f'and({sort_column}.eq."{sort_value}",{id_column}.lt."{id_value}")'
+    )
+
+
+def ascending_keyset_filter(sort_column: str, sort_value: Any,
+                            id_column: str, id_value: Any) -> str:
+    """
+    PostgREST `or` filter selecting rows after (sort_value, id_value) when
+    ordering by sort_column ASC, id_column ASC.
+    """
+    return (
+        f'{sort_column}.gt."{sort_value}",'
+        f'and({sort_column}.eq."{sort_value}",{id_column}.gt."{id_value}")'
+    )
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int,
+               sort_column: str, id_column: str = 'id') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trim a `limit + 1` row fetch to one page and build the next cursor.
+
+    Returns:
+        The page rows and the cursor for the following page (None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor({sort_column: last[sort_column], id_column: last[id_column]})
@@ -0,0 +1,364 @@
+"""
+On-demand sampling profiler for live diagnosis.
+
+Nothing runs until an admin starts a profile (routes/profiling.py). While
+one is collecting, a sampler thread wakes every PROFILING_INTERVAL_MS,
+reads every thread's current stack from `sys._current_frames()` and counts
+it against each profile that is collecting; threads parked on a lock or a
+selector are skipped. Once the last profile finishes,
+the thread exits, so an idle profiler costs nothing beyond one list check
+per request in ProfilingMiddleware.
+
+A profile collects in one of three modes:
+
+- `seconds`: every thread, for a fixed time;
+- `requests`: every thread, while any of the next N requests whose path
+  matches a pattern (`/api/v1/dashboard/data`, `/api/v1/portfolio/*`) are in
+  flight. Async handlers share the event loop thread, so concurrent
+  requests to other routes can show up in these samples;
+- `capture()`: only the calling thread, for the duration of a block (used
+  for a manual interest-job run).
+
+Finished profiles are kept in memory (the last PROFILING_KEEP) and exported
+as speedscope JSON (https://www.speedscope.app) or as collapsed stacks for
+flamegraph.pl / inferno.
+"""
+
+import fnmatch
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# (function qualname, file, first line)
+Frame = Tuple[str, str, int]
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Innermost frames of threads parked on a lock or selector (log listener,
+# scheduler, idle event loop); their samples are dropped
+_IDLE_LEAVES = {('threading.py', 'wait'), ('selectors.py', 'select')}
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+class Profile:
+    """Stack samples collected for one profiling session."""
+
+    def __init__(self, profile_id: int, label: str, mode: str, interval: float,
+                 deadline: float, route: Optional[str] = None, requests: int = 0,
+                 thread_id: Optional[int] = None):
+        self.id = profile_id
+        self.label = label
+        self.mode = mode
+        self.interval = interval
+        self.deadline = deadline
+        self.route = route
+        self.requests_left = requests
+        self.requests_profiled = 0
+        self.thread_id = thread_id
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.sample_count = 0
+        # (thread name, stack root-first) -> samples
+        self.stacks: Counter = Counter()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def collecting(self, now: float) -> bool:
+        if self.finished:
+            return False
+        if self.mode == 'seconds':
+            return now < self.deadline
+        return self._in_flight > 0
+
+    def matches(self, path: str) -> bool:
+        if self.mode != 'requests' or self.finished:
+            return False
+        if time.monotonic() >= self.deadline:
+            # Armed profiles nobody used expire
+            self.finish()
+            return False
+        return fnmatch.fnmatchcase(path, self.route or '')
+
+    def begin(self) -> bool:
+        """Count a request or block in; False once the profile has all the requests it wants."""
+        with self._lock:
+            if self.finished or (self.mode == 'requests' and self.requests_left <= 0):
+                return False
+            if self.mode == 'requests':
+                self.requests_left -= 1
+            self._in_flight += 1
+            return True
+
+    def end(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.requests_profiled += 1
+            done = self._in_flight == 0 and (self.mode != 'requests' or self.requests_left <= 0)
+        if done:
+            self.finish()
+
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = datetime.now(timezone.utc)
+            logger.info(f"Profile {self.id} ({self.label}) finished with {self.sample_count} samples")
+
+    def record(self, thread_name: str, stack: Tuple[Frame, ...]) -> None:
+        with self._lock:
+            self.stacks[(thread_name, stack)] += 1
+            self.sample_count += 1
+
+    def snapshot(self) -> Dict[Tuple[str, Tuple[Frame, ...]], int]:
+        """Samples so far; safe to call while the profile is still collecting."""
+        with self._lock:
+            return dict(self.stacks)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'label': self.label,
+            'mode': self.mode,
+            'route': self.route,
+            'requests_profiled': self.requests_profiled,
+            'interval_ms': self.interval * 1000,
+            'samples': self.sample_count,
+            'status': 'finished' if self.finished else 'collecting',
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def _frame_name(frame: Frame) -> str:
+    name, filename, line = frame
+    if filename.startswith(_BASE_DIR):
+        filename = os.path.relpath(filename, _BASE_DIR)
+    return f"{name} ({filename}:{line})"
+
+
+def to_speedscope(profile: Profile) -> Dict[str, Any]:
+    """speedscope file: one sampled profile per thread, weights in milliseconds."""
+    frames: List[Dict[str, Any]] = []
+    frame_index: Dict[Frame, int] = {}
+    by_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+    weight = profile.interval * 1000
+
+    for (thread_name, stack), count in profile.snapshot().items():
+        indexes = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                name, filename, line = frame
+                frames.append({'name': name, 'file': filename, 'line': line})
+            indexes.append(frame_index[frame])
+        samples, weights = by_thread.setdefault(thread_name, ([], []))
+        samples.append(indexes)
+        weights.append(count * weight)
+
+    profiles = []
+    for thread_name, (samples, weights) in sorted(by_thread.items()):
+        total = sum(weights)
+        profiles.append({
+            'type': 'sampled',
+            'name': f"{profile.label} [{thread_name}]",
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': total,
+            'samples': samples,
+            'weights': weights,
+        })
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': profile.label,
+        'exporter': 'app.core.profiling',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': profiles,
+    }
+
+
+def to_collapsed(profile: Profile) -> str:
+    """Collapsed stacks (`thread;outer;...;inner count`), the input format of flamegraph.pl."""
+    lines = []
+    for (thread_name, stack), count in sorted(profile.snapshot().items(), key=lambda item: -item[1]):
+        names = [thread_name] + [_frame_name(frame).replace(';', ':') for frame in stack]
+        lines.append(f"{';'.join(names)} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """Owns the profiles and the sampler thread."""
+
+    def __init__(self):
+        self._profiles: 'OrderedDict[int, Profile]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Profiles waiting for matching requests; read lock-free by the middleware
+        self.armed: List[Profile] = []
+
+    # -- Starting profiles -------------------------------------------------
+
+    def _interval(self, interval_ms: Optional[float]) -> float:
+        return max(1.0, interval_ms or settings.PROFILING_INTERVAL_MS) / 1000
+
+    def _add(self, profile: Profile) -> Profile:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            finished = [p.id for p in self._profiles.values() if p.finished]
+            while len(self._profiles) > settings.PROFILING_KEEP and finished:
+                del self._profiles[finished.pop(0)]
+        logger.info(f"Profile {profile.id} started: {profile.label}")
+        return profile
+
+    def start_timed(self, seconds: float, interval_ms: Optional[float] = None) -> Profile:
+        seconds = min(seconds, settings.PROFILING_MAX_SECONDS)
+        profile = self._add(Profile(next(self._ids), f"all threads for {seconds:g}s", 'seconds',
+                                    self._interval(interval_ms), time.monotonic() + seconds))
+        self._ensure_sampler()
+        return profile
+
+    def arm_requests(self, route: str, requests: int, interval_ms: Optional[float] = None) -> Profile:
+        profile = self._add(Profile(next(self._ids), f"next {requests} requests to {route}", 'requests',
+                                    self._interval(interval_ms),
+                                    time.monotonic() + settings.PROFILING_MAX_SECONDS,
+                                    route=route, requests=requests))
+        with self._lock:
+            self.armed = self.armed + [profile]
+        return profile
+
+    @contextmanager
+    def capture(self, label: str, interval_ms: Optional[float] = None) -> Iterator[Profile]:
+        """Profile the calling thread for the duration of the block."""
+        profile = self._add(Profile(next(self._ids), label, 'capture', self._interval(interval_ms),
+                                    time.monotonic() + settings.PROFILING_MAX_SECONDS,
+                                    thread_id=threading.get_ident()))
+        profile.begin()
+        self._ensure_sampler()
+        try:
+            yield profile
+        finally:
+            profile.end()
+
+    def request_started(self, path: str) -> Optional[Profile]:
+        """Armed profile that wants this request (already counted in), if any."""
+        for profile in self.armed:
+            if profile.matches(path) and profile.begin():
+                self._ensure_sampler()
+                return profile
+        self._disarm_finished()
+        return None
+
+    def request_finished(self, profile: Profile) -> None:
+        profile.end()
+        self._disarm_finished()
+
+    def stop(self, profile_id: int) -> Optional[Profile]:
+        profile = self.get(profile_id)
+        if profile is not None:
+            profile.finish()
+            self._disarm_finished()
+        return profile
+
+    def _disarm_finished(self) -> None:
+        if any(p.finished for p in self.armed):
+            with self._lock:
+                self.armed = [p for p in self.armed if not p.finished]
+
+    # -- Reading profiles --------------------------------------------------
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [p.summary() for p in reversed(profiles)]
+
+    # -- Sampling ----------------------------------------------------------
+
+    def _ensure_sampler(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                profiles = list(self._profiles.values())
+            for profile in profiles:
+                if not profile.finished and now >= profile.deadline:
+                    profile.finish()
+            with self._lock:
+                # Checked under the lock so a profile starting now either is
+                # seen here or finds no sampler and starts a new one
+                collecting = [p for p in profiles if p.collecting(now)]
+                if not collecting:
+                    self._thread = None
+                    return
+            self._sample(collecting, me)
+            time.sleep(min(p.interval for p in collecting))
+
+    def _sample(self, profiles: List[Profile], sampler_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id:
+                continue
+            targets = [p for p in profiles if p.thread_id is None or p.thread_id == thread_id]
+            if not targets or _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            stack = tuple(stack)
+            thread_name = names.get(thread_id, str(thread_id))
+            for profile in targets:
+                profile.record(thread_name, stack)
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that counts requests in and out of armed `requests` profiles."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.armed or scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.request_started(scope.get('path', ''))
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished(profile)
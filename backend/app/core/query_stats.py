@@ -0,0 +1,236 @@
+"""
+Per-request database query accounting.
+
+`install()` wraps the postgrest query builders' `execute()` so every
+Supabase round trip feeds the supabase_call_* metrics and, while a
+`QueryStats` is active, is counted, timed and recorded under its query
+shape (method, table/RPC and filter operators, with values stripped). The
+same shape repeated many times in one request is the signature of an N+1
+loop.
+
+QueryStatsMiddleware activates a QueryStats per HTTP request, reports it in
+a `Server-Timing` header, and logs when a request goes over
+QUERY_BUDGET_PER_REQUEST queries or repeats one shape QUERY_REPEAT_THRESHOLD
+times. With QUERY_BUDGET_STRICT the check runs before the response starts
+and replaces an over-budget response with a 500. `track_queries()` does the same
+accounting for scheduler jobs, scripts and benchmarks.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from .config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Params whose value is part of the shape rather than a bound value
+_SHAPE_PARAMS = {'select', 'order', 'on_conflict', 'columns'}
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request goes over its query budget."""
+
+
+class QueryStats:
+    """Query count, database time and repeated shapes for one unit of work."""
+
+    def __init__(self, label: str = ''):
+        self.label = label
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, shape: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes executed at least `threshold` times, most frequent first."""
+        with self._lock:
+            return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def problems(self, budget: int, repeat_threshold: int) -> List[str]:
+        problems = []
+        if budget and self.count > budget:
+            problems.append(f"{self.count} queries (budget {budget})")
+        if repeat_threshold:
+            for shape, n in self.repeated(repeat_threshold):
+                problems.append(f"{n}x {shape}")
+        return problems
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header."""
+        top = self.shapes.most_common(1)
+        max_repeat = top[0][1] if top else 0
+        return (
+            f'db;dur={self.total_seconds * 1000:.1f};desc="{self.count} queries", '
+            f'db-repeat;desc="max {max_repeat} identical"'
+        )
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar('query_stats', default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def query_shape(builder) -> str:
+    """Method, path and filter operators of a postgrest request, without bound values."""
+    parts = []
+    params = getattr(builder, 'params', None)
+    for key, value in (params.multi_items() if params is not None else []):
+        if key in _SHAPE_PARAMS:
+            parts.append(f'{key}={value}')
+        elif key in ('limit', 'offset'):
+            parts.append(f'{key}=?')
+        else:
+            op = str(value).split('.', 1)[0] if '.' in str(value) else '?'
+            parts.append(f'{key}={op}')
+    path = getattr(builder, 'path', '')
+    return f"{getattr(builder, 'http_method', '?')} {path}" + (f"?{'&'.join(parts)}" if parts else '')
+
+
+_OPERATIONS = {'GET': 'select', 'HEAD': 'count', 'POST': 'insert', 'PATCH': 'update', 'DELETE': 'delete'}
+
+
+def _table_and_operation(builder) -> Tuple[str, str]:
+    path = str(getattr(builder, 'path', '')).rsplit('/rest/v1/', 1)[-1].strip('/')
+    if path.startswith('rpc/'):
+        return path[4:], 'rpc'
+    method = getattr(builder, 'http_method', '')
+    if method == 'POST' and 'resolution=' in str(getattr(builder, 'headers', {}).get('Prefer', '')):
+        return path, 'upsert'
+    return path, _OPERATIONS.get(method, method.lower())
+
+
+def _instrument(execute):
+    def execute_with_stats(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return execute(self, *args, **kwargs)
+        except Exception:
+            metrics.SUPABASE_CALL_ERRORS.inc(*_table_and_operation(self))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.SUPABASE_CALL_DURATION.observe(elapsed, *_table_and_operation(self))
+            stats = _current.get()
+            if stats is not None:
+                stats.record(query_shape(self), elapsed)
+    execute_with_stats.__wrapped__ = execute
+    return execute_with_stats
+
+
+_installed = False
+
+
+def install() -> bool:
+    """Wrap postgrest's sync `execute()` methods. Safe to call more than once."""
+    global _installed
+    if _installed:
+        return True
+    try:
+        from postgrest._sync.request_builder import SyncQueryRequestBuilder, SyncSingleRequestBuilder
+    except Exception as e:
+        logger.warning(f"Query stats disabled, postgrest not importable: {str(e)}")
+        return False
+    # MaybeSingle delegates to Single, so these two cover every request type.
+    for cls in (SyncQueryRequestBuilder, SyncSingleRequestBuilder):
+        cls.execute = _instrument(cls.execute)
+    _installed = True
+    return True
+
+
+def check_budget(stats: QueryStats, budget: Optional[int] = None,
+                 repeat_threshold: Optional[int] = None, strict: Optional[bool] = None) -> List[str]:
+    """
+    Log, or raise in strict mode, when `stats` is over budget.
+
+    Returns:
+        The list of problems found (empty when within budget)
+    """
+    budget = settings.QUERY_BUDGET_PER_REQUEST if budget is None else budget
+    repeat_threshold = settings.QUERY_REPEAT_THRESHOLD if repeat_threshold is None else repeat_threshold
+    strict = settings.QUERY_BUDGET_STRICT if strict is None else strict
+
+    problems = stats.problems(budget, repeat_threshold)
+    if problems:
+        message = f"Query budget exceeded for {stats.label or 'unit of work'}: {'; '.join(problems)}"
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return problems
+
+
+@contextmanager
+def track_queries(label: str = '', enforce: bool = False) -> Iterator[QueryStats]:
+    """Count the queries made inside the block; optionally apply the budget on exit."""
+    install()
+    stats = QueryStats(label)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    if enforce:
+        check_budget(stats)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware adding Server-Timing and budget checks to each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(f"{scope.get('method', '')} {scope.get('path', '')}")
+        token = _current.set(stats)
+        rejected = False
+
+        async def send_with_timing(message):
+            nonlocal rejected
+            if rejected:
+                # The over-budget response was replaced; drop the rest of its body
+                return
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                if settings.QUERY_BUDGET_STRICT:
+                    # Checked here, while the status can still change
+                    try:
+                        check_budget(stats, strict=True)
+                    except QueryBudgetExceeded as e:
+                        rejected = True
+                        logger.error(str(e))
+                        body = json.dumps({'detail': str(e)}).encode('utf-8')
+                        headers = [(b'content-type', b'application/json'),
+                                   (b'content-length', str(len(body)).encode('latin-1')),
+                                   (b'server-timing', stats.server_timing().encode('latin-1'))]
+                        await send({'type': 'http.response.start', 'status': 500, 'headers': headers})
+                        await send({'type': 'http.response.body', 'body': body})
+                        return
+                headers.append((b'server-timing', stats.server_timing().encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+        if not rejected:
+            # Queries made while a response streams can only be logged
+            check_budget(stats, strict=False)
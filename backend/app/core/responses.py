@@ -0,0 +1,73 @@
+"""
+Fast JSON responses for routes that return large nested payloads.
+
+FastAPI runs a returned dict through `jsonable_encoder` (a Python walk over
+every value) and then `json.dumps`. Routes that return
+`FastJSONResponse(result)` skip both: the content is encoded in one pass by
+orjson when it is installed, with datetimes, dates and UUIDs handled
+natively and Decimals, sets and Pydantic models through `_default`.
+Without orjson the stdlib encoder is used with the same conversions.
+
+Bodies of at least JSON_GZIP_MIN_BYTES are gzipped when the request's
+Accept-Encoding allows it.
+"""
+
+import gzip
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .static_files import accepted_encodings
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Values neither encoder handles natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    # Only reached on the stdlib path; orjson encodes these itself
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson and gzipped for clients that accept it."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+    async def __call__(self, scope, receive, send):
+        min_bytes = settings.JSON_GZIP_MIN_BYTES
+        if (min_bytes and len(self.body) >= min_bytes and 'content-encoding' not in self.headers
+                and 'gzip' in accepted_encodings(Headers(scope=scope).get('accept-encoding'))):
+            self.body = gzip.compress(self.body, compresslevel=settings.JSON_GZIP_LEVEL)
+            self.headers['content-encoding'] = 'gzip'
+            self.headers['content-length'] = str(len(self.body))
+            self.headers.append('vary', 'Accept-Encoding')
+        await super().__call__(scope, receive, send)
@@ -3,24 +3,87 @@ Scheduler service using APScheduler to run background tasks.
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.date import DateTrigger
+from datetime import datetime
 from ..services.interest_calculation_service import InterestCalculationService
+from ..services.retention_service import RetentionService
+from .config import settings
+from .due_date_timer import due_date_timer
+from .metrics import record_job
 import logging
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler()
 
 def run_interest_check():
-    """Job to run the interest check logic."""
+    """Hourly safety sweep over every due investor; the due-date timer handles the common case."""
+    started = time.perf_counter()
     try:
         logger.info("Scheduler: Running interest calculation job...")
         service = InterestCalculationService()
         result = service.check_and_process_all_due_dates()
         logger.info(f"Scheduler: Job finished. Result: {result}")
+        record_job('interest_check', time.perf_counter() - started, result)
     except Exception as e:
         logger.error(f"Scheduler: Job failed with error: {str(e)}")
+        record_job('interest_check', time.perf_counter() - started, failed=True)
+
+def run_due_date_sync():
+    """Job to initialise missing due dates and reload the due-date timer."""
+    started = time.perf_counter()
+    try:
+        logger.info("Scheduler: Running due date sync job...")
+        service = InterestCalculationService()
+        result = service.sync_unscheduled_investors()
+        logger.info(f"Scheduler: Due date sync finished. Result: {result}")
+
+        loaded = due_date_timer.load(service.load_upcoming_due_dates(due_date_timer.horizon_days))
+        logger.info(f"Scheduler: Due-date timer loaded {loaded} investors, next at {due_date_timer.next_due_at()}")
+        record_job('due_date_sync', time.perf_counter() - started, result)
+    except Exception as e:
+        logger.error(f"Scheduler: Due date sync failed with error: {str(e)}")
+        record_job('due_date_sync', time.perf_counter() - started, failed=True)
+
+def run_due_batch():
+    """Job armed by the due-date timer: pay the investors that just fell due."""
+    started = time.perf_counter()
+    try:
+        investor_ids = due_date_timer.pop_due()
+        if investor_ids:
+            logger.info(f"Scheduler: Processing {len(investor_ids)} investors from the due-date timer...")
+            result = InterestCalculationService().process_due_investors(investor_ids)
+            logger.info(f"Scheduler: Due batch finished. Result: {result}")
+            record_job('due_batch', time.perf_counter() - started, result)
+    except Exception as e:
+        logger.error(f"Scheduler: Due batch failed with error: {str(e)}")
+        record_job('due_batch', time.perf_counter() - started, failed=True)
+    finally:
+        due_date_timer.rearm()
+
+def _arm_due_batch(run_at: datetime):
+    scheduler.add_job(
+        run_due_batch,
+        trigger=DateTrigger(run_date=run_at),
+        id='due_batch_job',
+        name='Pay Due Investors',
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+def run_retention():
+    """Job to purge expired sessions, notifications and reset codes."""
+    started = time.perf_counter()
+    try:
+        logger.info("Scheduler: Running retention job...")
+        result = RetentionService().run()
+        deleted = {table: r.get('deleted', 0) for table, r in result['tables'].items()}
+        logger.info(f"Scheduler: Retention finished. Deleted: {deleted}")
+        record_job('retention', time.perf_counter() - started, result)
+    except Exception as e:
+        logger.error(f"Scheduler: Retention job failed with error: {str(e)}")
+        record_job('retention', time.perf_counter() - started, failed=True)
 
 def start_scheduler():
     """Start the background scheduler."""
@@ -35,13 +98,38 @@ def start_scheduler():
         name='Check Investment Due Dates',
         replace_existing=True
     )
+
+    scheduler.add_job(
+        run_due_date_sync,
+        trigger=IntervalTrigger(hours=settings.DUE_DATE_SYNC_INTERVAL_HOURS),
+        id='due_date_sync_job',
+        name='Initialise Missing Due Dates',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        # Also runs at startup to fill the due-date timer
+        next_run_time=datetime.now()
+    )
+
+    scheduler.add_job(
+        run_retention,
+        trigger=IntervalTrigger(minutes=settings.RETENTION_INTERVAL_MINUTES),
+        id='retention_job',
+        name='Purge Expired Rows',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
     
     if not scheduler.running:
         scheduler.start()
         logger.info("Scheduler started.")
 
+    due_date_timer.set_waker(_arm_due_batch)
+
 def shutdown_scheduler():
     """Shutdown the scheduler."""
+    due_date_timer.set_waker(None)
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler shut down.")
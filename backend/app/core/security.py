@@ -1,17 +1,17 @@
-from fastapi import Depends, HTTPException, Query
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Query
 import jwt
-from supabase import create_client, Client
 from datetime import datetime, timedelta, timezone
 from ..core.config import settings
+from ..core.clients import LazyClient
+from ..models.rows import Session, parse_datetime
 
-# Initialize Supabase client
-supabase_client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# Supabase client, created on first request
+supabase_client = LazyClient('SUPABASE_KEY')
 
 def is_session_valid(created_at):
     """Check if session is still valid (within 6 hours)"""
-    if isinstance(created_at, str):
-        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-    return datetime.now(created_at.tzinfo) < created_at + timedelta(hours=6)
+    return Session(created_at=parse_datetime(created_at)).is_valid()
 
 async def get_current_user_id(session_token: str = Query(..., description="Session token for authentication")):
     """Dependency to get current user ID from session token"""
@@ -64,3 +64,13 @@ def verify_access_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> dict:
+    """Dependency accepting only an admin JWT from routes/admin_auth.py; returns its claims."""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Admin token required")
+    payload = verify_access_token(authorization[len("Bearer "):])
+    if payload.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return payload
@@ -0,0 +1,287 @@
+"""
+Static asset and SPA shell serving for the React build.
+
+The build directory is scanned once at startup. For every file the bundle
+keeps its media type, a content-hash ETag, the stat result (so requests do
+not stat the disk again) and its compressed variants:
+
+- `<file>.br` / `<file>.gz` written next to it at build time are served
+  when the client accepts them (`python -m app.core.static_files static`
+  writes them; brotli is used when the package is installed);
+- compressible files without a `.gz` are gzipped in memory the first time
+  a client asks for gzip, so the scan itself stays cheap.
+
+Vite's hashed assets (`assets/index-D8xsnwzH.js`) are served with an
+immutable one-year Cache-Control; everything else, index.html and files
+copied from public/ included, is revalidated with If-None-Match and
+answered with 304 when unchanged.
+index.html is held in memory and returned for every SPA navigation.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Vite output under build.assetsDir: assets/<name>-<8 char content hash>.<ext>.
+# Names like apple-touch-icon.png outside assets/ are not hashed.
+_HASHED_ASSET = re.compile(r'^assets/[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+_COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json',
+                       'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon')
+_VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Preference order when the client accepts several encodings
+_ENCODINGS = ('br', 'gzip')
+# Files larger than this are not gzipped in memory
+MEMORY_GZIP_MAX_BYTES = 8 * 1024 * 1024
+_MIN_COMPRESS_BYTES = 512
+
+
+def _media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    return media_type or 'application/octet-stream'
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header: Optional[str]) -> Tuple[str, ...]:
+    """Encodings from an Accept-Encoding header that the client accepts (q > 0)."""
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token)
+    if '*' in accepted:
+        accepted.update(_ENCODINGS)
+    return tuple(e for e in _ENCODINGS if e in accepted)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(','):
+        value = candidate.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        # Any representation of the same content is still fresh
+        if value.strip('"').split('-', 1)[0] == base:
+            return True
+    return False
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    media_type: str
+    etag: str
+    stat: os.stat_result
+    cache_control: str
+    # encoding -> (path, stat) of precompressed files on disk
+    disk_variants: Dict[str, Tuple[str, os.stat_result]] = field(default_factory=dict)
+    # encoding -> body held in memory ('identity' for files kept whole)
+    memory_variants: Dict[str, bytes] = field(default_factory=dict)
+    # Gzip in memory on the first request that accepts it
+    gzip_on_demand: bool = False
+
+    @property
+    def has_variants(self) -> bool:
+        return (bool(self.disk_variants) or self.gzip_on_demand
+                or any(e != 'identity' for e in self.memory_variants))
+
+
+class StaticBundle:
+    """Index of a build directory, scanned once, that answers static requests."""
+
+    def __init__(self, directory: str, index_name: str = 'index.html'):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self.index: Optional[StaticAsset] = None
+        if os.path.isdir(directory):
+            self._scan(index_name)
+        logger.info(f"Static bundle {directory}: {len(self.assets)} files")
+
+    def _scan(self, index_name: str) -> None:
+        for root, _, files in os.walk(self.directory):
+            names = set(files)
+            for name in files:
+                if any(name.endswith(suffix) and name[:-len(suffix)] in names
+                       for suffix in _VARIANT_SUFFIXES.values()):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                asset = self._load(path, names, name, relative, keep_in_memory=relative == index_name)
+                self.assets[relative] = asset
+                if relative == index_name:
+                    self.index = asset
+
+    def _load(self, path: str, names: Iterable[str], name: str, relative: str,
+              keep_in_memory: bool) -> StaticAsset:
+        with open(path, 'rb') as f:
+            body = f.read()
+        media_type = _media_type(path)
+        hashed = _HASHED_ASSET.match(relative) is not None
+        asset = StaticAsset(
+            path=path,
+            media_type=media_type,
+            etag=f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"',
+            stat=os.stat(path),
+            cache_control=IMMUTABLE_CACHE if hashed else REVALIDATE_CACHE,
+        )
+        for encoding, suffix in _VARIANT_SUFFIXES.items():
+            if name + suffix in names:
+                variant = path + suffix
+                asset.disk_variants[encoding] = (variant, os.stat(variant))
+        if keep_in_memory:
+            asset.memory_variants['identity'] = body
+        asset.gzip_on_demand = ('gzip' not in asset.disk_variants and _is_compressible(media_type)
+                                and _MIN_COMPRESS_BYTES <= len(body) <= MEMORY_GZIP_MAX_BYTES)
+        return asset
+
+    def _compress(self, asset: StaticAsset) -> None:
+        # Concurrent first requests may both compress; the result is the same
+        body = asset.memory_variants.get('identity')
+        if body is None:
+            with open(asset.path, 'rb') as f:
+                body = f.read()
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        if len(compressed) < len(body):
+            asset.memory_variants['gzip'] = compressed
+        asset.gzip_on_demand = False
+
+    def get(self, relative_path: str) -> Optional[StaticAsset]:
+        return self.assets.get(relative_path.lstrip('/'))
+
+    def response(self, asset: StaticAsset, headers) -> Response:
+        """Response for `asset` given the request headers (Accept-Encoding, If-None-Match)."""
+        response_headers = {'cache-control': asset.cache_control}
+        if asset.has_variants:
+            response_headers['vary'] = 'Accept-Encoding'
+
+        encoding = None
+        accepted = accepted_encodings(headers.get('accept-encoding'))
+        if asset.gzip_on_demand and 'gzip' in accepted:
+            self._compress(asset)
+        for candidate in accepted:
+            if candidate in asset.disk_variants or candidate in asset.memory_variants:
+                encoding = candidate
+                break
+        base = asset.etag.strip('"')
+        response_headers['etag'] = f'"{base}-{encoding}"' if encoding else asset.etag
+
+        if _etag_matches(headers.get('if-none-match'), asset.etag):
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding:
+            response_headers['content-encoding'] = encoding
+        if encoding in asset.memory_variants:
+            return Response(asset.memory_variants[encoding], media_type=asset.media_type, headers=response_headers)
+        if encoding in asset.disk_variants:
+            path, stat = asset.disk_variants[encoding]
+            return FileResponse(path, stat_result=stat, media_type=asset.media_type, headers=response_headers)
+        if 'identity' in asset.memory_variants:
+            return Response(asset.memory_variants['identity'], media_type=asset.media_type, headers=response_headers)
+        return FileResponse(asset.path, stat_result=asset.stat, media_type=asset.media_type, headers=response_headers)
+
+    def index_response(self, headers) -> Optional[Response]:
+        """The in-memory SPA shell, or None when the build has no index.html."""
+        if self.index is None:
+            return None
+        return self.response(self.index, headers)
+
+
+class StaticAssets:
+    """ASGI app serving a StaticBundle; a drop-in for `StaticFiles` under `app.mount()`."""
+
+    def __init__(self, bundle: StaticBundle):
+        self.bundle = bundle
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] not in ('GET', 'HEAD'):
+            response = PlainTextResponse('Method Not Allowed', status_code=405, headers={'allow': 'GET, HEAD'})
+        else:
+            asset = self.bundle.get(_route_path(scope))
+            if asset is None:
+                response = PlainTextResponse('Not Found', status_code=404)
+            else:
+                response = self.bundle.response(asset, Headers(scope=scope))
+        await response(scope, receive, send)
+
+
+def _route_path(scope) -> str:
+    """Path below the mount point (what Starlette's StaticFiles resolves)."""
+    path, root_path = scope['path'], scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        return path[len(root_path):]
+    return path
+
+
+def precompress(directory: str, level: int = 9) -> int:
+    """
+    Write .gz (and, with brotli installed, .br) next to every compressible
+    file in `directory` that benefits from it. Run after each frontend build.
+
+    Returns:
+        Number of variant files written
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(tuple(_VARIANT_SUFFIXES.values())) or not _is_compressible(_media_type(name)):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                body = f.read()
+            if len(body) < _MIN_COMPRESS_BYTES:
+                continue
+            variants = {'.gz': gzip.compress(body, compresslevel=level, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(body, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(body):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompress a frontend build for StaticBundle.')
+    parser.add_argument('directory', nargs='?', default='static')
+    args = parser.parse_args()
+    count = precompress(args.directory)
+    print(f"Wrote {count} compressed files in {args.directory}"
+          + ('' if brotli is not None else ' (install brotli for .br variants)'))
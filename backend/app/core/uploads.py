@@ -0,0 +1,146 @@
+"""
+Bounded handling of multipart file uploads.
+
+Starlette's multipart parser already spools each file part to a temporary
+file once it passes 1 MB, so parsing does not hold an upload in memory.
+What it does not do is stop reading: without a limit a client can stream
+any amount of data to disk before the route runs. RequestSizeLimitMiddleware
+caps the request body of selected paths. A declared Content-Length over the
+cap is refused before anything is read, and a body that grows past it
+(chunked transfer, or a lying header) is cut off mid-stream with a 413.
+
+Routes then check the sniffed type of the file (its first bytes, not the
+client's Content-Type) and hand `upload_reader()` to the storage client,
+which streams the spooled file to the network in chunks.
+"""
+
+import os
+from contextlib import contextmanager
+from io import BufferedReader
+from typing import Dict, Iterator, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import PlainTextResponse
+
+# Multipart framing and the small text fields sent alongside a file
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Leading bytes of the image formats accepted as attachments
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/bmp': '.bmp',
+}
+SNIFF_BYTES = 16
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Media type of an image from its first SNIFF_BYTES bytes, or None if unrecognised."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, media_type in _SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    return None
+
+
+async def check_image_upload(upload: UploadFile, max_bytes: int) -> str:
+    """
+    Validate a parsed image upload without reading it into memory.
+
+    Returns:
+        The sniffed media type
+
+    Raises:
+        HTTPException: 413 when the file is over `max_bytes`, 415 when it is not a supported image
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Attachment larger than {max_bytes // (1024 * 1024)} MB")
+    await upload.seek(0)
+    head = await upload.read(SNIFF_BYTES)
+    await upload.seek(0)
+    media_type = sniff_image_type(head)
+    if media_type is None:
+        raise HTTPException(status_code=415, detail="Attachment must be a PNG, JPEG, GIF, WebP or BMP image")
+    return media_type
+
+
+@contextmanager
+def upload_reader(upload: UploadFile) -> Iterator[BufferedReader]:
+    """
+    The spooled upload as a BufferedReader (what storage3 streams from).
+
+    `fileno()` moves a small in-memory spool to its temporary file, so even
+    uploads under 1 MB are streamed from disk rather than copied.
+    """
+    upload.file.seek(0)
+    reader = open(upload.file.fileno(), 'rb', closefd=False)
+    try:
+        reader.seek(0)
+        yield reader
+    finally:
+        reader.close()
+
+
+class _BodyTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Request body larger than {max_bytes} bytes")
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware capping the request body size for the given paths."""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope.get('path', '')) if scope['type'] == 'http' else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get('headers', []):
+            if name == b'content-length':
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > max_bytes:
+                    response = PlainTextResponse(f"Request body larger than {max_bytes} bytes", status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > max_bytes:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through as-is
+                    raise _BodyTooLarge(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_limit(max_file_bytes: int) -> int:
+    """Request body cap for a form carrying one file of up to `max_file_bytes`."""
+    return max_file_bytes + FORM_OVERHEAD_BYTES
+
+
+def file_extension(media_type: str, file_name: Optional[str]) -> str:
+    """Extension for the stored object: from the sniffed type, else the client's name."""
+    return EXTENSIONS.get(media_type) or os.path.splitext(file_name or '')[1]
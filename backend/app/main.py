@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
+from typing import Optional
+import hmac
 import os
 import sys
 
+# Queue-backed JSON logging, before any module logs (see app/core/logging_config.py)
+from app.core.logging_config import RequestIdMiddleware, capture_server_loggers, setup_logging
+setup_logging()
+
 app = FastAPI(title="Blue Gold Investment Bank")
 
 # CORS middleware
@@ -13,8 +19,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+# Query count / N+1 accounting per request (see app/core/query_stats.py)
+from app.core.query_stats import QueryStatsMiddleware, install as install_query_stats
+app.add_middleware(QueryStatsMiddleware)
+install_query_stats()
+
+# Cap upload request bodies while they stream in (see app/core/uploads.py)
+from app.core.config import settings
+from app.core.uploads import RequestSizeLimitMiddleware, upload_limit
+app.add_middleware(RequestSizeLimitMiddleware, limits={
+    "/api/v1/customer-care/submit": upload_limit(settings.CUSTOMER_CARE_MAX_ATTACHMENT_BYTES),
+})
+
+# Armed "next N requests" profiles (see app/core/profiling.py); a no-op when none are
+from app.core.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware)
+
+# Request id for log records and the X-Request-ID response header
+app.add_middleware(RequestIdMiddleware)
+
+# Request latency and in-flight metrics. Added last, so it is the outermost
+# middleware and times everything above, size-limit rejections included
+from app.core import metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Import and include routers
 from app.routes.admin_auth import router as admin_auth_router
 from app.routes.admin import router as admin_router
@@ -27,6 +58,7 @@ from app.routes.investors import router as investors_router
 from app.routes.notifications import router as notifications_router
 from app.routes.payment import router as payment_router
 from app.routes.portfolio import router as portfolio_router
+from app.routes.profiling import router as profiling_router
 from app.routes.referral import router as referral_router
 from app.routes.topup import router as topup_router
 from app.routes.withdrawal import router as withdrawal_router
@@ -47,6 +79,7 @@ api_v1.include_router(investors_router)
 api_v1.include_router(notifications_router)
 api_v1.include_router(payment_router)
 api_v1.include_router(portfolio_router)
+api_v1.include_router(profiling_router)
 api_v1.include_router(referral_router)
 api_v1.include_router(topup_router)
 api_v1.include_router(withdrawal_router)
@@ -59,28 +92,38 @@ app.include_router(api_v1)
 async def health_check():
     return {"status": "ok"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    from app.core.config import settings
+    # Without a configured token the endpoint does not exist
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Scheduler Events
 from app.core.scheduler import start_scheduler, shutdown_scheduler
+from app.services.email_outbox_service import email_outbox
+from app.services.notification_writer import notification_writer
 
 @app.on_event("startup")
 async def startup_event():
+    capture_server_loggers()
     start_scheduler()
+    email_outbox.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     shutdown_scheduler()
+    email_outbox.stop()
+    notification_writer.close()
 
-# Serve index.html at root
-@app.get("/")
-async def read_index():
-    static_dir = 'static'
-    index_path = os.path.join(static_dir, 'index.html')
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    return {"detail": "Not Found"}
-
-# Mount static files, handling PyInstaller frozen state
-from fastapi.staticfiles import StaticFiles
+# Static build, handling PyInstaller frozen state. Scanned once at startup;
+# see app/core/static_files.py for compression and caching.
+from fastapi import Request
+from app.core.static_files import StaticAssets, StaticBundle
 
 if getattr(sys, 'frozen', False):
     # Running in PyInstaller bundle
@@ -89,14 +132,21 @@ else:
     # Running in development
     static_dir = 'static'
 
+static_bundle = StaticBundle(static_dir)
+
+# Serve index.html at root
+@app.get("/")
+async def read_index(request: Request):
+    return static_bundle.index_response(request.headers) or {"detail": "Not Found"}
+
 # Mount only if directory exists
 if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    app.mount("/static", StaticAssets(static_bundle), name="static")
 
 # SPA catch-all route - serves index.html for any non-API, non-static path
 # This allows React Router to handle routes like /dashboard, /login, etc.
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
+async def serve_spa(full_path: str, request: Request):
     """
     Catch-all route to serve index.html for SPA routing.
     This allows React Router to handle routes like /dashboard, /login, etc.
@@ -104,18 +154,8 @@ async def serve_spa(full_path: str):
     # Skip if it's an API route or static file request
     if full_path.startswith("api/") or full_path.startswith("static/"):
         return {"detail": "Not Found"}
-    
-    # Determine static directory
-    if getattr(sys, 'frozen', False):
-        static_path = os.path.join(sys._MEIPASS, 'static')
-    else:
-        static_path = 'static'
-    
-    index_path = os.path.join(static_path, 'index.html')
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    
-    return {"detail": "Not Found"}
+
+    return static_bundle.index_response(request.headers) or {"detail": "Not Found"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,162 @@
+"""
+Typed rows for the investors, transactions, spending_accounts and sessions tables.
+
+Supabase returns rows as dicts of JSON values, so timestamps arrive as ISO
+strings and numeric columns as strings or numbers. These slot dataclasses
+convert each column once, when the row is loaded, instead of at every use
+site. Only columns present in the row are converted, so a query can select
+just what it needs with `Model.columns(...)` and load the result with
+`Model.from_row()` / `Model.from_rows()`.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
+
+SESSION_LIFETIME = timedelta(hours=6)
+
+T = TypeVar('T', bound='_Row')
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """ISO string (with or without 'Z'), date or datetime to a datetime; None if empty."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def parse_amount(value: Any) -> float:
+    """Numeric column (number, numeric string or NULL) to a float; NULL is 0."""
+    return float(value) if value not in (None, '') else 0.0
+
+
+def parse_int(value: Any) -> int:
+    return int(value) if value not in (None, '') else 0
+
+
+_CONVERTERS: Dict[Any, Callable[[Any], Any]] = {
+    Optional[datetime]: parse_datetime,
+    float: parse_amount,
+    int: parse_int,
+}
+
+
+class _Row:
+    __slots__ = ()
+
+    # Filled in per class by _row_model: (field name, converter or None)
+    _fields: Tuple[Tuple[str, Optional[Callable[[Any], Any]]], ...] = ()
+
+    @classmethod
+    def from_row(cls: Type[T], row: Dict[str, Any]) -> T:
+        """Build from a Supabase row dict; columns missing from the row keep their defaults."""
+        values = {}
+        for name, convert in cls._fields:
+            if name in row:
+                value = row[name]
+                values[name] = convert(value) if convert else value
+        return cls(**values)
+
+    @classmethod
+    def from_rows(cls: Type[T], rows: Iterable[Dict[str, Any]]) -> List[T]:
+        return [cls.from_row(row) for row in rows or []]
+
+    @classmethod
+    def columns(cls, *names: str) -> str:
+        """Select list for the given fields (all fields when none are given)."""
+        known = {name for name, _ in cls._fields}
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown {cls.__name__} columns: {', '.join(unknown)}")
+        return ', '.join(names or [name for name, _ in cls._fields])
+
+
+def _row_model(cls):
+    cls = dataclass(slots=True)(cls)
+    cls._fields = tuple((f.name, _CONVERTERS.get(f.type)) for f in fields(cls))
+    return cls
+
+
+@_row_model
+class Investor(_Row):
+    id: Optional[str] = None
+    email: Optional[str] = None
+    first_name: Optional[str] = None
+    surname: Optional[str] = None
+    account_number: Optional[str] = None
+    portfolio_type: Optional[str] = None
+    investment_type: Optional[str] = None
+    initial_investment: float = 0.0
+    total_investment: float = 0.0
+    total_paid: float = 0.0
+    payment_counter: int = 0
+    current_week: int = 0
+    investment_start_date: Optional[datetime] = None
+    last_due_date: Optional[datetime] = None
+    next_due_date: Optional[datetime] = None
+    investment_expiry_date: Optional[datetime] = None
+    payment_status: Optional[str] = None
+    status: Optional[str] = None
+    investment_ended: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def start_date(self) -> Optional[datetime]:
+        """Investment start, falling back to the row's creation time."""
+        return self.investment_start_date or self.created_at
+
+    @property
+    def principal(self) -> float:
+        """Total invested (initial + top-ups), falling back to initial_investment for legacy rows."""
+        return self.total_investment or self.initial_investment
+
+
+@_row_model
+class Transaction(_Row):
+    id: Optional[str] = None
+    investor_id: Optional[str] = None
+    email: Optional[str] = None
+    transaction_id: Optional[str] = None
+    transaction_type: Optional[str] = None
+    amount: float = 0.0
+    withdrawal_amount: float = 0.0
+    withdrawal_requested: Optional[bool] = None
+    withdraw_status: Optional[str] = None
+    paystack_ref: Optional[str] = None
+    withdrawal_timestamp: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def is_sent_withdrawal(self) -> bool:
+        return self.transaction_type == 'withdrawal' and self.withdraw_status == 'sent'
+
+
+@_row_model
+class SpendingAccount(_Row):
+    id: Optional[str] = None
+    investor_id: Optional[str] = None
+    balance: float = 0.0
+    total_withdrawn: float = 0.0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+@_row_model
+class Session(_Row):
+    id: Optional[str] = None
+    user_id: Optional[str] = None
+    token: Optional[str] = None
+    created_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    def is_valid(self) -> bool:
+        """Sessions last SESSION_LIFETIME from creation."""
+        if self.created_at is None:
+            return False
+        return datetime.now(self.created_at.tzinfo) < self.created_at + SESSION_LIFETIME
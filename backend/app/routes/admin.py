@@ -2,11 +2,20 @@
 API routes for admin operations.
 """
 
-from fastapi import APIRouter, HTTPException, Header
+import itertools
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, Dict, Any, List
+from datetime import date, timedelta
+from ..core.config import settings
 from ..services.transaction_service import TransactionService
 from ..services.interest_calculation_service import InterestCalculationService
-from ..core.security import verify_access_token
+from ..services.withdrawal_payout_service import withdrawal_payout_service
+from ..core.security import require_admin, verify_access_token
+from ..core.profiling import profiler
+from ..core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -140,7 +149,7 @@ async def approve_withdrawal(
         result = transaction_service.update_withdrawal_status(transaction_id, 'sent')
 
         if not result['success']:
-            raise HTTPException(status_code=400, detail=result['error'])
+            raise HTTPException(status_code=result.get('status_code', 400), detail=result['error'])
 
         return {
             'success': True,
@@ -199,7 +208,7 @@ async def reject_withdrawal(
         )
 
         if not result['success']:
-            raise HTTPException(status_code=400, detail=result['error'])
+            raise HTTPException(status_code=result.get('status_code', 400), detail=result['error'])
 
         return {
             'success': True,
@@ -212,6 +221,36 @@ async def reject_withdrawal(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error rejecting withdrawal: {str(e)}")
 
+class BulkApprovalRequest(BaseModel):
+    transaction_ids: List[str] = Field(..., min_length=1)
+
+
+@router.post("/withdrawals/bulk-approve", status_code=202)
+async def bulk_approve_withdrawals(request: BulkApprovalRequest, admin: dict = Depends(require_admin)):
+    """
+    Approve and pay many pending withdrawals through Paystack bulk transfers.
+
+    Returns at once with the run; poll GET /admin/withdrawals/bulk-approve/{run_id}
+    for progress and the outcome of each withdrawal.
+    """
+    if len(request.transaction_ids) > settings.PAYOUT_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PAYOUT_MAX_ITEMS} withdrawals per run")
+    run = withdrawal_payout_service.start(request.transaction_ids, requested_by=admin.get('sub'))
+    return {'success': True, 'data': run.summary()}
+
+
+@router.get("/withdrawals/bulk-approve", dependencies=[Depends(require_admin)])
+async def list_bulk_approvals():
+    return {'success': True, 'data': withdrawal_payout_service.list()}
+
+
+@router.get("/withdrawals/bulk-approve/{run_id}", dependencies=[Depends(require_admin)])
+async def get_bulk_approval(run_id: int):
+    run = withdrawal_payout_service.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Payout run not found")
+    return {'success': True, 'data': run.to_dict()}
+
 @router.post("/process-due-dates")
 async def admin_process_due_dates(
     authorization: Optional[str] = Header(None)
@@ -267,10 +306,13 @@ async def admin_process_due_dates(
 @router.get("/investors")
 async def get_all_investors(
     search: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     authorization: Optional[str] = Header(None)
 ):
     """
-    Get all investors with due dates.
+    Get a page of investors with due dates, newest first.
+    Pass the returned next_cursor to fetch the following page.
     """
     # TODO: Refactor auth check into a dependency
     if not authorization:
@@ -279,18 +321,22 @@ async def get_all_investors(
     try:
         from ..services.admin_service import AdminService
         admin_service = AdminService()
-        result = admin_service.get_all_investors(search_query=search)
+        result = admin_service.get_all_investors(search_query=search, limit=limit, cursor=cursor)
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=result.get('status_code', 500), detail=result['error'])
             
-        return result
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/payments")
 async def get_payments_summary(
     search: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     authorization: Optional[str] = Header(None)
 ):
     """
@@ -302,18 +348,41 @@ async def get_payments_summary(
     try:
         from ..services.admin_service import AdminService
         admin_service = AdminService()
-        result = admin_service.get_payments_summary(search_query=search)
+        result = admin_service.get_payments_summary(search_query=search, limit=limit, cursor=cursor)
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=result.get('status_code', 500), detail=result['error'])
             
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/payments/totals", dependencies=[Depends(require_admin)])
+async def get_payments_totals():
+    """
+    Get book-wide payment totals (cached for a short TTL).
+    """
+    try:
+        from ..services.admin_service import AdminService
+        admin_service = AdminService()
+        result = admin_service.get_payments_totals()
+
+        if not result['success']:
+            raise HTTPException(status_code=500, detail=result['error'])
+
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/portfolio")
 async def get_portfolio_details(
     search: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     authorization: Optional[str] = Header(None)
 ):
     """
@@ -325,15 +394,59 @@ async def get_portfolio_details(
     try:
         from ..services.admin_service import AdminService
         admin_service = AdminService()
-        result = admin_service.get_portfolio_details(search_query=search)
+        result = admin_service.get_portfolio_details(search_query=search, limit=limit, cursor=cursor)
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=result.get('status_code', 500), detail=result['error'])
             
-        return result
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/export/{report}", dependencies=[Depends(require_admin)])
+async def export_report(
+    report: str,
+    format: str = Query('csv', pattern='^(csv|ndjson)$'),
+    columns: Optional[str] = Query(None, description="Comma-separated columns; defaults to all"),
+    search: Optional[str] = None,
+    created_from: Optional[date] = Query(None, description="Investors created on or after this date"),
+    created_to: Optional[date] = Query(None, description="Investors created on or before this date")
+):
+    """
+    Stream an investors, payments or portfolio report as CSV or NDJSON.
+    Rows are read and written one page at a time.
+    """
+    from ..services.admin_service import AdminService
+    from ..core.export import encode_export, EXPORT_MEDIA_TYPES
+
+    # Validate, and read the first page, before streaming: once the
+    # StreamingResponse has started, an error can only truncate a 200.
+    try:
+        admin_service = AdminService()
+        selected = admin_service.resolve_export_columns(report, columns)
+        pages = admin_service.iter_export_pages(
+            selected,
+            search_query=search,
+            created_from=created_from.isoformat() if created_from else None,
+            created_to=(created_to + timedelta(days=1)).isoformat() if created_to else None
+        )
+        first_page = next(pages, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if first_page is not None:
+        pages = itertools.chain([first_page], pages)
+    filename = f"{report}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        encode_export(pages, selected, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @router.put("/portfolio/{investor_id}")
 async def update_investor_portfolio(
     investor_id: str,
@@ -430,19 +543,28 @@ async def get_admin_config(
 
 @router.post("/cron/run-interest-payments")
 async def trigger_interest_payments(
-    authorization: Optional[str] = Header(None)
+    authorization: Optional[str] = Header(None),
+    profile: bool = Query(False, description="Capture a sampling profile of the run (admin JWT only)")
 ):
     """
     Manually trigger interest payment job.
+
+    With `profile=true` the run is sampled and the response carries a
+    `profile_id` for GET /admin/profiling/profiles/{profile_id}.
     """
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
-    
+    if profile:
+        require_admin(authorization)
+
     try:
         from ..services.admin_service import AdminService
         service = AdminService()
-        result = service.trigger_interest_payment_job()
-        return result
+        if not profile:
+            return service.trigger_interest_payment_job()
+        with profiler.capture("cron/run-interest-payments") as run_profile:
+            result = service.trigger_interest_payment_job()
+        return {**result, 'profile_id': run_profile.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -483,6 +605,26 @@ async def fix_integrity(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/retention/status", dependencies=[Depends(require_admin)])
+async def get_retention_status():
+    """
+    Get cumulative retention counters per table since the app started.
+    """
+    from ..services.retention_service import retention_metrics
+    return {'success': True, 'data': retention_metrics.snapshot()}
+
+@router.post("/retention/run", dependencies=[Depends(require_admin)])
+async def run_retention():
+    """
+    Manually run one retention pass over all tables.
+    """
+    try:
+        from ..services.retention_service import RetentionService
+        # The pass deletes in chunks and sleeps between them; keep it off the event loop
+        return await run_in_threadpool(RetentionService().run)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/missed-payments-summary")
 async def get_missed_payments_summary(
     authorization: Optional[str] = Header(None)
@@ -1,11 +1,12 @@
+import logging
 import os
 from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form
 from fastapi.responses import RedirectResponse
-from authlib.integrations.starlette_client import OAuth
 from starlette.requests import Request
 from starlette.config import Config
+from ..core.clients import LazyClient
 from ..core.config import settings
-from supabase import create_client, Client
+from ..models.rows import Session, parse_datetime
 from datetime import datetime, timedelta
 import uuid
 from passlib.hash import bcrypt
@@ -14,28 +15,35 @@ import random
 import string
 from ..services.referral_service import ReferralService
 from ..services.notification_service import NotificationService
-from ..services.email_service import EmailService
+from ..services.email_outbox_service import email_outbox
 from ..services.investors import InvestorService
 
+logger = logging.getLogger(__name__)
+
 # Create router
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-# Initialize Supabase client
-supabase_client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
-
-# OAuth configuration
-oauth = OAuth()
-
-# Register Google OAuth
-google_client = oauth.register(
-    name='google',
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
+# Supabase client, created on first request
+supabase_client = LazyClient('SUPABASE_SERVICE_ROLE_KEY')
+
+# Google OAuth client, registered on first use (authlib is slow to import)
+_google_client = None
+
+def get_google_client():
+    global _google_client
+    if _google_client is None:
+        from authlib.integrations.starlette_client import OAuth
+        oauth = OAuth()
+        _google_client = oauth.register(
+            name='google',
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={
+                'scope': 'openid email profile'
+            }
+        )
+    return _google_client
 
 def create_session_token():
     """Create a session token with 6-hour expiration"""
@@ -43,22 +51,20 @@ def create_session_token():
 
 def is_session_valid(created_at):
     """Check if session is still valid (within 6 hours)"""
-    if isinstance(created_at, str):
-        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-    return datetime.now(created_at.tzinfo) < created_at + timedelta(hours=6)
+    return Session(created_at=parse_datetime(created_at)).is_valid()
 
 @router.get("/google/login")
 async def google_login(request: Request):
     """Initiate Google OAuth login"""
     redirect_uri = settings.GOOGLE_REDIRECT_URI
-    return await google_client.authorize_redirect(request, redirect_uri)
+    return await get_google_client().authorize_redirect(request, redirect_uri)
 
 @router.get("/google/callback")
 async def google_callback(request: Request):
     """Handle Google OAuth callback"""
     try:
         # Get the token
-        token = await google_client.authorize_access_token(request)
+        token = await get_google_client().authorize_access_token(request)
         user_info = token.get('userinfo')
         
         if user_info:
@@ -104,7 +110,7 @@ async def google_callback(request: Request):
                     referral_result = referral_service.assign_referral_code_to_user(user_id)
                     if not referral_result['success']:
                         # Log error but don't fail OAuth signup
-                        print(f"Warning: Failed to assign referral code to Google OAuth user {user_id}: {referral_result['error']}")
+                        logger.warning(f"Failed to assign referral code to Google OAuth user {user_id}: {referral_result['error']}")
             
         # Create session
         session_token = create_session_token()
@@ -176,13 +182,12 @@ async def delete_account(session_token: str):
         # Delete the user, which will cascade to all related tables
         supabase_client.table('users').delete().eq('id', user_id).execute()
         
-        # Send account deletion notification email
+        # Queue account deletion notification email (sent by the outbox in the background)
         try:
-            email_service = EmailService()
-            email_service.send_account_deletion_email(user_email)
+            email_outbox.enqueue('account_deletion', user_email)
         except Exception as e:
             # Log error but don't fail the request
-            print(f"Failed to send account deletion email: {str(e)}")
+            logger.warning(f"Failed to queue account deletion email: {str(e)}")
         
         return {"message": "Account successfully deleted"}
     except HTTPException:
@@ -369,7 +374,7 @@ async def manual_signup(
         referral_result = referral_service.assign_referral_code_to_user(user_id)
         if not referral_result['success']:
             # Log error but don't fail signup
-            print(f"Warning: Failed to assign referral code to user {user_id}: {referral_result['error']}")
+            logger.warning(f"Failed to assign referral code to user {user_id}: {referral_result['error']}")
 
         # Record referral usage if referral code was provided
         if referrer_id:
@@ -437,13 +442,12 @@ async def request_password_reset(email: str = Form(...)):
         
         supabase_client.table('password_reset_codes').insert(reset_data).execute()
         
-        # Send the reset code via email using MailerSend
-        email_service = EmailService()
+        # Queue the reset code email; the outbox delivers it via MailerSend
         try:
-            email_service.send_password_reset_email(email, reset_code)
+            email_outbox.enqueue('password_reset', email, {'reset_code': reset_code})
         except Exception as e:
             # Log the error but don't fail the request
-            print(f"Failed to send email: {str(e)}")
+            logger.warning(f"Failed to queue email: {str(e)}")
         
         return {
             "message": "Reset code sent to your email address.",
@@ -547,13 +551,12 @@ async def reset_password(
             .eq('id', user['id'])\
             .execute()
         
-        # Send password reset success email
-        email_service = EmailService()
+        # Queue password reset success email
         try:
-            email_service.send_password_reset_success_email(email)
+            email_outbox.enqueue('password_reset_success', email)
         except Exception as e:
             # Log the error but don't fail the request
-            print(f"Failed to send success email: {str(e)}")
+            logger.warning(f"Failed to queue success email: {str(e)}")
         
         # Create notification
         notification = NotificationService.generate_account_updated_notification(
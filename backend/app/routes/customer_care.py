@@ -8,7 +8,9 @@ from fastapi.responses import JSONResponse
 from typing import Optional
 from fastapi import Form, Header
 from fastapi import Depends  
+from app.core.config import settings
 from app.core.security import get_current_user_id
+from app.core.uploads import check_image_upload, file_extension, upload_reader
 from app.services.customer_care_service import customer_care_service
 
 router = APIRouter(prefix="/customer-care", tags=["customer-care"])
@@ -53,18 +55,21 @@ async def submit_query(
         
         attachment_url = None
         
-        # Handle attachment upload if provided
+        # Handle attachment upload if provided. The request body is capped by
+        # RequestSizeLimitMiddleware and the file is spooled to disk while parsing;
+        # it is streamed from there to storage rather than read into memory.
         if attachment:
-            # Read file content
-            file_content = await attachment.read()
+            max_bytes = settings.CUSTOMER_CARE_MAX_ATTACHMENT_BYTES
+            media_type = await check_image_upload(attachment, max_bytes)
             
             # Upload to storage
-            upload_result = await customer_care_service.upload_attachment(
-                user_id=user_id,
-                file_content=file_content,
-                file_name=attachment.filename,
-                content_type=attachment.content_type
-            )
+            with upload_reader(attachment) as reader:
+                upload_result = await customer_care_service.upload_attachment(
+                    user_id=user_id,
+                    file=reader,
+                    file_name=f"attachment{file_extension(media_type, attachment.filename)}",
+                    content_type=media_type
+                )
             
             if not upload_result["success"]:
                 raise HTTPException(
@@ -97,6 +102,8 @@ async def submit_query(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -5,6 +5,7 @@ API routes for dashboard operations.
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional
 from pydantic import BaseModel
+from ..core.responses import FastJSONResponse
 from ..services.dashboard import DashboardService
 from ..services.transaction_service import TransactionService
 
@@ -42,7 +43,7 @@ async def get_dashboard_data(authorization: Optional[str] = Header(None)):
         if not result.get('success'):
             raise HTTPException(status_code=401, detail=result.get('error', 'Authentication failed'))
         
-        return result
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard data: {str(e)}")
 
@@ -15,6 +15,7 @@ from ..models.payment import (
 from ..services.paystack_service import paystack_service
 from ..services.investors import InvestorService  # Import InvestorService
 from ..services.transaction_service import TransactionService
+from ..services.payment_totals import invalidate_payment_totals
 from ..core.config import settings
 
 router = APIRouter(prefix="/payments", tags=["payments"])
@@ -130,6 +131,7 @@ async def verify_payment(verify_request: PaymentVerifyRequest):
                             'paystack_reference': verify_request.reference,
                             'payment_status': 'completed'
                         }).eq('id', investor_record['id']).execute()
+                        invalidate_payment_totals()
 
                         # Clean up pending investor data
                         del pending_investors[verify_request.reference]
@@ -217,6 +219,7 @@ async def payment_callback(request: Request, reference: str):
                             'paystack_reference': reference,
                             'payment_status': 'completed'
                         }).eq('id', investor_record['id']).execute()
+                        invalidate_payment_totals()
 
                         investor_created = True
 
@@ -242,7 +245,7 @@ async def payment_callback(request: Request, reference: str):
                                 }
                                 investor_service.supabase.table('sessions').insert(session_data).execute()
                         except Exception as session_error:
-                            print(f"Warning: Failed to create session for user after successful payment: {str(session_error)}")
+                            logger.warning(f"Failed to create session for user after successful payment: {str(session_error)}")
                             session_token = None
 
                         # Clean up pending investor data
@@ -250,7 +253,7 @@ async def payment_callback(request: Request, reference: str):
 
                 except Exception as e:
                     # Log error but still redirect (investor can be created manually)
-                    print(f"Error creating investor record: {str(e)}")
+                    logger.error(f"Error creating investor record: {str(e)}")
 
             # Redirect to success page with session token if created
             redirect_url = f"{settings.FRONTEND_URL}/dashboard?payment=success"
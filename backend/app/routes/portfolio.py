@@ -2,9 +2,14 @@
 API routes for portfolio operations.
 """
 
+import logging
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional
 from ..services.portfolio_service import PortfolioService
+from ..core.responses import FastJSONResponse
+from ..models.rows import Investor, Transaction
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
 
@@ -312,11 +317,11 @@ async def get_due_dates_data(
         investor_data = getattr(investor_response, 'data', [])
         
         if not investor_data:
-            print(f"DEBUG: No investor found for email {user['email']}")
+            logger.debug("No investor found for session user", extra={'user_id': user.get('id')})
             raise HTTPException(status_code=404, detail="Investor profile not found")
         
         investor_id = investor_data[0]['id']
-        print(f"DEBUG: Found investor_id {investor_id} for email {user['email']}")
+        logger.debug("Resolved investor for session user", extra={'investor_id': investor_id})
         
         # Get portfolio data which includes due dates information
         service = PortfolioService()
@@ -633,33 +638,26 @@ async def get_goals_data(
             raise HTTPException(status_code=401, detail="Invalid or expired session")
 
         # Get user's investor ID
-        investor_response = dashboard_service.supabase.table('investors').select('id, portfolio_type, investment_type, initial_investment, created_at').eq('email', user['email']).execute()
+        investor_response = dashboard_service.supabase.table('investors').select(Investor.columns(
+            'id', 'portfolio_type', 'investment_type', 'initial_investment', 'created_at'
+        )).eq('email', user['email']).execute()
         investor_data = getattr(investor_response, 'data', [])
 
         if not investor_data:
             raise HTTPException(status_code=404, detail="Investor profile not found")
 
-        investor = investor_data[0]
-        investor_id = investor['id']
-        portfolio_type = investor.get('portfolio_type')
-        investment_type = investor.get('investment_type')
-        initial_investment = float(investor.get('initial_investment', 0))
-        investment_start_date = investor.get('created_at')
-        
-        # Debug logging
-        print(f"DEBUG: investor_id={investor_id}")
-        print(f"DEBUG: portfolio_type={portfolio_type}")
-        print(f"DEBUG: investment_type={investment_type}")
-        print(f"DEBUG: initial_investment={initial_investment}")
-        print(f"DEBUG: investment_start_date={investment_start_date}")
+        investor = Investor.from_row(investor_data[0])
+        investor_id = investor.id
+        portfolio_type = investor.portfolio_type
+        investment_type = investor.investment_type
+        initial_investment = investor.initial_investment
+        investment_start_date = investor.created_at
+
 
         # Get investment rules
         from ..services.portfolio_service import PortfolioService
         portfolio_service = PortfolioService()
         requirements = portfolio_service.get_investment_requirements(portfolio_type, investment_type)
-        
-        # Debug logging
-        print(f"DEBUG: requirements={requirements}")
 
         if not requirements:
             raise HTTPException(status_code=400, detail=f"Invalid investment type {investment_type} for portfolio {portfolio_type}")
@@ -667,52 +665,47 @@ async def get_goals_data(
         weekly_rate = requirements["weekly_interest_rate"] / 100
         weekly_interest = initial_investment * weekly_rate
         duration_weeks = requirements["expiry_weeks"]
-        
-        # Debug logging
-        print(f"DEBUG: weekly_rate={weekly_rate}")
-        print(f"DEBUG: weekly_interest={weekly_interest}")
-        print(f"DEBUG: duration_weeks={duration_weeks}")
+        logger.debug("Analytics inputs", extra={
+            'investor_id': investor_id, 'portfolio_type': portfolio_type, 'investment_type': investment_type,
+            'initial_investment': initial_investment, 'investment_start_date': investment_start_date,
+            'weekly_rate': weekly_rate, 'weekly_interest': weekly_interest, 'duration_weeks': duration_weeks,
+        })
 
         # Get all transactions for this investor
-        transaction_response = dashboard_service.supabase.table('transactions').select('*').eq('investor_id', investor_id).execute()
-        transactions = getattr(transaction_response, 'data', [])
-        
-        # Debug logging
-        print(f"DEBUG: transactions count={len(transactions) if transactions else 0}")
-
-        # Filter withdrawal transactions
-        withdrawals = []
-        for transaction in transactions:
-            if (transaction.get('transaction_type') == 'withdrawal' and
-                transaction.get('withdraw_status') == 'sent'):
-                withdrawals.append({
-                    'id': transaction.get('id'),
-                    'amount': float(transaction.get('amount', 0)),
-                    'date': transaction.get('created_at'),
-                    'transaction_id': transaction.get('transaction_id')
-                })
+        transaction_response = dashboard_service.supabase.table('transactions').select(Transaction.columns(
+            'id', 'transaction_id', 'transaction_type', 'withdraw_status', 'amount', 'created_at'
+        )).eq('investor_id', investor_id).execute()
+        transactions = Transaction.from_rows(getattr(transaction_response, 'data', []))
 
         # Calculate timeline data
         from datetime import datetime, timedelta
-        import math
 
-        # Parse investment start date
-        if isinstance(investment_start_date, str):
-            start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-        else:
-            start_date = investment_start_date or datetime.now()
+        start_date = investment_start_date or datetime.now()
+
+        # Filter withdrawal transactions and bucket them by investment week
+        withdrawals = []
+        withdrawals_by_week = {}
+        for transaction in transactions:
+            if transaction.is_sent_withdrawal:
+                withdrawal = {
+                    'id': transaction.id,
+                    'amount': transaction.amount,
+                    'date': transaction.created_at.isoformat() if transaction.created_at else None,
+                    'transaction_id': transaction.transaction_id
+                }
+                withdrawals.append(withdrawal)
+                if transaction.created_at:
+                    week = (transaction.created_at - start_date).days // 7
+                    withdrawals_by_week.setdefault(week, []).append(withdrawal)
 
         # Calculate weeks elapsed
         now = datetime.now(start_date.tzinfo)
         weeks_elapsed = max(0, (now - start_date).days // 7)
         weeks_remaining = max(0, duration_weeks - weeks_elapsed)
-        
-        # Debug logging
-        print(f"DEBUG: start_date={start_date}")
-        print(f"DEBUG: now={now}")
-        print(f"DEBUG: weeks_elapsed={weeks_elapsed}")
-        print(f"DEBUG: weeks_remaining={weeks_remaining}")
-        print(f"DEBUG: duration_weeks={duration_weeks}")
+        logger.debug("Analytics timeline", extra={
+            'investor_id': investor_id, 'transactions': len(transactions), 'start_date': start_date,
+            'weeks_elapsed': weeks_elapsed, 'weeks_remaining': weeks_remaining,
+        })
 
         # Generate timeline data
         timeline = []
@@ -729,16 +722,8 @@ async def get_goals_data(
             if week > 0:  # No interest on week 0
                 cumulative_interest += weekly_interest
 
-            # Check if there were withdrawals this week
-            week_withdrawals = []
-            for withdrawal in withdrawals:
-                withdrawal_date = withdrawal['date']
-                if isinstance(withdrawal_date, str):
-                    withdrawal_date = datetime.fromisoformat(withdrawal_date.replace('Z', '+00:00'))
-
-                withdrawal_week = (withdrawal_date - start_date).days // 7
-                if withdrawal_week == week:
-                    week_withdrawals.append(withdrawal)
+            # Withdrawals made this week
+            week_withdrawals = withdrawals_by_week.get(week, [])
 
             # Calculate if renewable (when interest >= initial investment)
             is_renewable = cumulative_interest >= initial_investment
@@ -760,7 +745,7 @@ async def get_goals_data(
         # Calculate remaining balance
         remaining_balance = initial_investment + cumulative_interest - cumulative_withdrawals
 
-        return {
+        return FastJSONResponse({
             'success': True,
             'data': {
                 'investment': {
@@ -785,7 +770,7 @@ async def get_goals_data(
                 'withdrawals': withdrawals,
                 'timeline': timeline
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -818,7 +803,9 @@ async def get_analytics_data(
             raise HTTPException(status_code=401, detail="Invalid or expired session")
 
         # Get user's investor ID
-        investor_response = dashboard_service.supabase.table('investors').select('id, portfolio_type, investment_type, initial_investment, created_at').eq('email', user['email']).execute()
+        investor_response = dashboard_service.supabase.table('investors').select(Investor.columns(
+            'id', 'portfolio_type', 'investment_type', 'initial_investment', 'created_at'
+        )).eq('email', user['email']).execute()
         investor_data = getattr(investor_response, 'data', [])
 
         if not investor_data:
@@ -844,12 +831,12 @@ async def get_analytics_data(
                 }
             }
 
-        investor = investor_data[0]
-        investor_id = investor['id']
-        portfolio_type = investor.get('portfolio_type')
-        investment_type = investor.get('investment_type')
-        initial_investment = float(investor.get('initial_investment', 0))
-        investment_start_date = investor.get('created_at')
+        investor = Investor.from_row(investor_data[0])
+        investor_id = investor.id
+        portfolio_type = investor.portfolio_type
+        investment_type = investor.investment_type
+        initial_investment = investor.initial_investment
+        investment_start_date = investor.created_at
 
         # Get investment rules
         from ..services.portfolio_service import PortfolioService
@@ -896,20 +883,18 @@ async def get_analytics_data(
         duration_weeks = requirements["expiry_weeks"]
 
         # Get all transactions for this investor
-        transaction_response = dashboard_service.supabase.table('transactions').select('*').eq('investor_id', investor_id).execute()
-        transactions = getattr(transaction_response, 'data', [])
+        transaction_response = dashboard_service.supabase.table('transactions').select(Transaction.columns(
+            'id', 'transaction_id', 'transaction_type', 'withdraw_status', 'amount', 'created_at'
+        )).eq('investor_id', investor_id).execute()
+        transactions = Transaction.from_rows(getattr(transaction_response, 'data', []))
 
         # Get spending account balance
         from ..services.interest_calculation_service import InterestCalculationService
         interest_service = InterestCalculationService()
         spending_balance_result = interest_service.get_spending_account_balance(investor_id)
 
-        # Parse investment start date
         from datetime import datetime, timedelta
-        if isinstance(investment_start_date, str):
-            start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-        else:
-            start_date = investment_start_date or datetime.now()
+        start_date = investment_start_date or datetime.now()
 
         # Calculate weeks elapsed
         now = datetime.now(start_date.tzinfo)
@@ -943,22 +928,17 @@ async def get_analytics_data(
         }
 
         for transaction in transactions:
-            if (transaction.get('transaction_type') == 'withdrawal' and
-                transaction.get('withdraw_status') == 'sent'):
-                amount = float(transaction.get('amount', 0))
-                withdrawal_date = transaction.get('created_at')
-
-                if isinstance(withdrawal_date, str):
-                    withdrawal_date = datetime.fromisoformat(withdrawal_date.replace('Z', '+00:00'))
-
+            if transaction.is_sent_withdrawal:
+                amount = transaction.amount
+                withdrawal_date = transaction.created_at
                 withdrawal_week = (withdrawal_date - start_date).days // 7
 
                 withdrawals.append({
-                    'id': transaction.get('id'),
+                    'id': transaction.id,
                     'amount': amount,
                     'date': withdrawal_date.isoformat(),
                     'week': withdrawal_week,
-                    'transaction_id': transaction.get('transaction_id')
+                    'transaction_id': transaction.transaction_id
                 })
 
                 # Update stats
@@ -979,7 +959,7 @@ async def get_analytics_data(
         # Calculate summary statistics
         average_weekly_interest = weekly_interest if weeks_elapsed > 0 else 0
 
-        return {
+        return FastJSONResponse({
             'success': True,
             'data': {
                 'interest_trend': interest_trend,
@@ -1006,7 +986,7 @@ async def get_analytics_data(
                     'total_weeks': duration_weeks
                 }
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,73 @@
+"""
+Admin endpoints for on-demand profiling (see app/core/profiling.py).
+
+Every route requires the admin JWT issued by /admin/auth. Profiles are
+downloaded as speedscope JSON (open at https://www.speedscope.app) or as
+collapsed stacks for flamegraph.pl.
+"""
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+
+from ..core.profiling import profiler, to_collapsed, to_speedscope
+from ..core.security import require_admin
+
+router = APIRouter(prefix="/admin/profiling", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+class TimedProfileRequest(BaseModel):
+    seconds: float = Field(..., gt=0)
+    interval_ms: Optional[float] = Field(None, ge=1)
+
+
+class RequestProfileRequest(BaseModel):
+    # Request path, or a glob such as /api/v1/portfolio/*
+    route: str
+    requests: int = Field(1, ge=1, le=1000)
+    interval_ms: Optional[float] = Field(None, ge=1)
+
+
+@router.post("/start")
+async def start_timed_profile(request: TimedProfileRequest):
+    """Sample every thread for `seconds` (capped at PROFILING_MAX_SECONDS)."""
+    profile = profiler.start_timed(request.seconds, request.interval_ms)
+    return {'success': True, 'data': profile.summary()}
+
+
+@router.post("/requests")
+async def profile_next_requests(request: RequestProfileRequest):
+    """Sample while each of the next `requests` requests matching `route` is in flight."""
+    profile = profiler.arm_requests(request.route, request.requests, request.interval_ms)
+    return {'success': True, 'data': profile.summary()}
+
+
+@router.get("/profiles")
+async def list_profiles():
+    return {'success': True, 'data': profiler.list()}
+
+
+@router.post("/profiles/{profile_id}/stop")
+async def stop_profile(profile_id: int):
+    profile = profiler.stop(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {'success': True, 'data': profile.summary()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: int, format: str = Query('speedscope', pattern='^(speedscope|collapsed)$')):
+    """The profile's samples so far as a speedscope or collapsed-stack file."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == 'collapsed':
+        body, media_type, suffix = to_collapsed(profile), 'text/plain; charset=utf-8', 'folded'
+    else:
+        body, media_type, suffix = json.dumps(to_speedscope(profile)), 'application/json', 'speedscope.json'
+    return Response(body, media_type=media_type, headers={
+        'Content-Disposition': f'attachment; filename="profile-{profile.id}.{suffix}"',
+    })
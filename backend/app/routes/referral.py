@@ -178,8 +178,12 @@ async def redeem_points(
         raise HTTPException(status_code=500, detail=f"Error redeeming points: {str(e)}")
 
 @router.get("/downlines")
-async def get_downlines(authorization: Optional[str] = Header(None)):
-    """Get user's referral downlines."""
+async def get_downlines(
+    authorization: Optional[str] = Header(None),
+    limit: int = Query(50, ge=1, le=200, description="Downlines per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """Get one page of the user's referral downlines, newest first."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
 
@@ -196,9 +200,11 @@ async def get_downlines(authorization: Optional[str] = Header(None)):
             raise HTTPException(status_code=401, detail="Invalid session")
 
         referral_service = ReferralService()
-        result = referral_service.get_downlines(user['id'])
+        result = referral_service.get_downlines(user['id'], limit=limit, cursor=cursor)
 
         if not result['success']:
+            if result['error'] == 'Invalid cursor':
+                raise HTTPException(status_code=400, detail=result['error'])
             raise HTTPException(status_code=500, detail=result['error'])
 
         return result
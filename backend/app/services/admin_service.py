@@ -3,10 +3,14 @@ Admin Service
 Handles business logic for admin operations.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime
 from ..core.config import settings
+from ..core.due_date_timer import due_date_timer
+from ..core.pagination import decode_cursor, clamp_page_size, descending_keyset_filter, split_page
+from ..models.rows import Investor
 from .interest_calculation_service import InterestCalculationService
+from .payment_totals import payment_totals_cache, invalidate_payment_totals, TOTALS_KEY
 
 try:
     from supabase import create_client
@@ -21,102 +25,242 @@ class AdminService:
             raise RuntimeError("Supabase config missing in settings")
         self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
-    def get_all_investors(self, search_query: Optional[str] = None) -> Dict[str, Any]:
+    # Columns the investor list pages are keyset-paginated on
+    PAGE_SORT_COLUMN = 'created_at'
+    EXPORT_PAGE_SIZE = 1000
+
+    # Columns each admin report may export, in default output order
+    EXPORT_COLUMNS = {
+        'investors': [
+            'id', 'first_name', 'surname', 'email', 'investment_type', 'portfolio_type',
+            'investment_start_date', 'last_due_date', 'next_due_date', 'investment_expiry_date',
+            'current_week', 'created_at'
+        ],
+        'payments': [
+            'id', 'first_name', 'surname', 'email', 'initial_investment', 'total_investment',
+            'total_paid', 'payment_status', 'paystack_reference', 'created_at'
+        ],
+        'portfolio': [
+            'id', 'first_name', 'surname', 'email', 'phone', 'investment_type', 'portfolio_type',
+            'account_number', 'bank_account_number', 'bank_account_name', 'bank_name',
+            'identity_type', 'identity_number', 'created_at'
+        ],
+    }
+
+    @staticmethod
+    def _search_pattern(search_query: str) -> str:
+        """ILIKE pattern for the trigram-indexed search_text column."""
+        term = search_query.strip().lower()
+        for char in ('\\', '%', '_'):
+            term = term.replace(char, '\\' + char)
+        return f'%{term}%'
+
+    def _page_investors(self, columns: str, search_query: Optional[str] = None,
+                        limit: Optional[int] = None, cursor: Optional[str] = None,
+                        created_from: Optional[str] = None, created_to: Optional[str] = None,
+                        with_count: bool = True, table: str = 'investors') -> Dict[str, Any]:
+        """
+        Fetch one keyset page of investors, newest first.
+
+        Search matches email, name and account number through the
+        idx_investors_search_trgm index. The total is PostgREST's planner
+        estimate and is only computed for the first page.
+
+        Args:
+            columns: Columns to select (id and created_at are always included)
+            search_query: Optional free-text search
+            limit: Page size (clamped to the pagination maximum)
+            cursor: next_cursor from the previous page
+            created_from: Only investors created on or after this ISO date/time
+            created_to: Only investors created before this ISO date/time
+            with_count: Include the estimated total on the first page
+            table: investors, or a view over it that keeps search_text and created_at
+
+        Returns:
+            Dict containing the rows, next_cursor and total_estimate
+        """
+        limit = clamp_page_size(limit, maximum=self.EXPORT_PAGE_SIZE)
+        after = decode_cursor(cursor)
+
+        selected = [c.strip() for c in columns.split(',') if c.strip()]
+        if '*' not in selected:
+            selected += [c for c in ('id', self.PAGE_SORT_COLUMN) if c not in selected]
+        count = 'estimated' if with_count and not after else None
+        query = self.supabase.table(table).select(', '.join(selected), count=count)
+
+        if search_query and search_query.strip():
+            query = query.ilike('search_text', self._search_pattern(search_query))
+        if created_from:
+            query = query.gte(self.PAGE_SORT_COLUMN, created_from)
+        if created_to:
+            query = query.lt(self.PAGE_SORT_COLUMN, created_to)
+        if after:
+            query = query.or_(descending_keyset_filter(
+                self.PAGE_SORT_COLUMN, after[self.PAGE_SORT_COLUMN], 'id', after['id']
+            ))
+
+        response = query.order(self.PAGE_SORT_COLUMN, desc=True)\
+            .order('id', desc=True)\
+            .limit(limit + 1)\
+            .execute()
+        rows, next_cursor = split_page(getattr(response, 'data', []) or [], limit, self.PAGE_SORT_COLUMN)
+
+        return {
+            'rows': rows,
+            'next_cursor': next_cursor,
+            'total_estimate': getattr(response, 'count', None)
+        }
+
+    @staticmethod
+    def _page_result(page: Dict[str, Any], data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'data': data,
+            'count': len(data),
+            'total_estimate': page['total_estimate'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['next_cursor'] is not None
+        }
+
+    def resolve_export_columns(self, report: str, columns: Optional[str] = None) -> List[str]:
+        """
+        Validate a report name and comma-separated column selection.
+
+        Raises:
+            ValueError: Unknown report or column
+        """
+        if report not in self.EXPORT_COLUMNS:
+            raise ValueError(f"Unknown report '{report}'")
+        allowed = self.EXPORT_COLUMNS[report]
+        if not columns:
+            return list(allowed)
+        selected = [c.strip() for c in columns.split(',') if c.strip()]
+        unknown = [c for c in selected if c not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown columns for {report}: {', '.join(unknown)}")
+        return selected
+
+    def iter_export_pages(self, columns: List[str], search_query: Optional[str] = None,
+                          created_from: Optional[str] = None,
+                          created_to: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield every matching investor, one keyset page of EXPORT_PAGE_SIZE rows at a time.
+
+        Only one page is held in memory, so full-book exports run in constant memory.
         """
-        Fetch all investors with their due dates and status.
-        Supports search by email.
+        cursor = None
+        while True:
+            page = self._page_investors(
+                ', '.join(columns), search_query, self.EXPORT_PAGE_SIZE, cursor,
+                created_from=created_from, created_to=created_to, with_count=False
+            )
+            if page['rows']:
+                yield [{c: row.get(c) for c in columns} for row in page['rows']]
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def get_all_investors(self, search_query: Optional[str] = None,
+                          limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch a page of investors with their due dates and status.
+        Supports search by email, name or account number.
         """
         try:
-            query = self.supabase.table('investors').select('*')
-            
-            if search_query:
-                # Efficient search using ILIKE
-                query = query.ilike('email', f'%{search_query}%')
-            
-            response = query.order('created_at', desc=True).execute()
-            investors = getattr(response, 'data', [])
-            
-            # Enrich with due date info if needed, though it's in the table
-            # We might want to calculate "current week" dynamically if it's not up to date,
-            # but for admin view, raw DB data is usually preferred unless we trigger an update.
-            
-            return {
-                'success': True,
-                'data': investors,
-                'count': len(investors)
-            }
+            page = self._page_investors(
+                'id, first_name, surname, email, investment_type, investment_start_date, created_at, '
+                'last_due_date, next_due_date, investment_expiry_date, current_week',
+                search_query, limit, cursor
+            )
+            return self._page_result(page, page['rows'])
+        except ValueError as e:
+            return {'success': False, 'error': str(e), 'status_code': 400}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def get_payments_summary(self, search_query: Optional[str] = None) -> Dict[str, Any]:
+    def get_payments_totals(self) -> Dict[str, Any]:
         """
-        Fetch investment totals and payment status for each investor.
+        Book-wide payment totals, aggregated in the database.
+
+        Served from payment_totals_cache for PAYMENT_TOTALS_CACHE_TTL_SECONDS;
+        writers of investor money columns call invalidate_payment_totals().
+
+        Returns:
+            Dict containing total_invested, total_paid, total_pending, their
+            counts, and by_portfolio / by_investment_type breakdowns
+        """
+        def load() -> Dict[str, Any]:
+            try:
+                response = self.supabase.rpc('admin_payments_totals', {}).execute()
+                return {'success': True, 'data': getattr(response, 'data', None) or {}}
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+
+        return payment_totals_cache.get_or_set(
+            TOTALS_KEY, load, should_cache=lambda result: result['success']
+        )
+
+    def get_payments_summary(self, search_query: Optional[str] = None,
+                             limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch investment totals and payment status for a page of investors.
+
+        Rows come from the investor_payment_totals view, which already
+        normalises the money columns. The first page also carries the
+        book-wide `totals`.
         """
         try:
-            query = self.supabase.table('investors').select(
-                'id, first_name, surname, email, initial_investment, total_investment, total_paid, paystack_reference, payment_status'
+            page = self._page_investors(
+                'id, first_name, surname, email, initial_investment, total_investment, total_paid, '
+                'pending_amount, paystack_reference, payment_status',
+                search_query, limit, cursor, table='investor_payment_totals'
             )
-            
-            if search_query:
-                query = query.ilike('email', f'%{search_query}%')
-                
-            response = query.order('created_at', desc=True).execute()
-            investors = getattr(response, 'data', [])
-            
-            summary = []
-            for inv in investors:
-                summary.append({
-                    'id': inv.get('id'),
-                    'name': f"{inv.get('first_name', '')} {inv.get('surname', '')}",
-                    'email': inv.get('email'),
-                    'initial_investment': float(inv.get('initial_investment', 0)),
-                    'total_investment': float(inv.get('total_investment', 0) or inv.get('initial_investment', 0)),
-                    'total_paid': float(inv.get('total_paid', 0)),
-                    'payment_status': inv.get('payment_status'),
-                    'paystack_ref': inv.get('paystack_reference')
-                })
-                
-            return {
-                'success': True,
-                'data': summary,
-                'count': len(summary)
-            }
+
+            summary = [{
+                'id': inv.get('id'),
+                'name': f"{inv.get('first_name', '')} {inv.get('surname', '')}",
+                'email': inv.get('email'),
+                'initial_investment': inv.get('initial_investment'),
+                'total_investment': inv.get('total_investment'),
+                'total_paid': inv.get('total_paid'),
+                'pending_amount': inv.get('pending_amount'),
+                'payment_status': inv.get('payment_status'),
+                'paystack_ref': inv.get('paystack_reference')
+            } for inv in page['rows']]
+
+            result = self._page_result(page, summary)
+            if not cursor:
+                totals = self.get_payments_totals()
+                result['totals'] = totals['data'] if totals['success'] else None
+            return result
+        except ValueError as e:
+            return {'success': False, 'error': str(e), 'status_code': 400}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def get_portfolio_details(self, search_query: Optional[str] = None) -> Dict[str, Any]:
+    def get_portfolio_details(self, search_query: Optional[str] = None,
+                              limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
         """
-        Fetch detailed portfolio info for investors.
+        Fetch detailed portfolio info for a page of investors.
         """
         try:
-            query = self.supabase.table('investors').select(
+            page = self._page_investors(
                 'id, first_name, surname, email, phone, '
                 'investment_type, portfolio_type, '
                 'account_number, bank_account_number, bank_account_name, bank_name, '
-                'identity_type, identity_number'
+                'identity_type, identity_number',
+                search_query, limit, cursor
             )
             
-            if search_query:
-                query = query.ilike('email', f'%{search_query}%')
-                
-            response = query.order('created_at', desc=True).execute()
-            investors = getattr(response, 'data', [])
-            
-            # Map 'phone' to 'phone_number' for frontend consistency if needed, or just pass as is
-            # The frontend expects 'phone_number' in the table display? 
-            # Let's check AdminPortfolio.js: it uses `p.phone_number`.
-            # So we should map it.
-            
+            # AdminPortfolio.jsx reads `phone_number`
             mapped_investors = []
-            for inv in investors:
-                inv['phone_number'] = inv.get('phone') # Map for frontend
+            for inv in page['rows']:
+                inv['phone_number'] = inv.get('phone')
                 mapped_investors.append(inv)
             
-            return {
-                'success': True,
-                'data': mapped_investors,
-                'count': len(mapped_investors)
-            }
+            return self._page_result(page, mapped_investors)
+        except ValueError as e:
+            return {'success': False, 'error': str(e), 'status_code': 400}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -148,6 +292,8 @@ class AdminService:
             updated_data = getattr(response, 'data', [])
             
             if updated_data:
+                # Portfolio / investment type counts are part of the totals
+                invalidate_payment_totals()
                 # Map back for response
                 res_data = updated_data[0]
                 res_data['phone_number'] = res_data.get('phone')
@@ -255,24 +401,25 @@ class AdminService:
         4. investment_expiry_date missing
         """
         try:
-            response = self.supabase.table('investors').select('*').execute()
-            investors = getattr(response, 'data', [])
+            response = self.supabase.table('investors').select(Investor.columns(
+                'id', 'email', 'initial_investment', 'total_investment', 'investment_type',
+                'investment_start_date', 'last_due_date', 'investment_expiry_date', 'current_week'
+            )).execute()
+            investors = Investor.from_rows(getattr(response, 'data', []))
 
             issues = []
             now = datetime.now()
 
             for investor in investors:
-                investor_id = investor['id']
-                email = investor.get('email')
-                initial = float(investor.get('initial_investment', 0) or 0)
-                total = float(investor.get('total_investment', 0) or 0)
-                portfolio_type = investor.get('portfolio_type')
-                investment_type = investor.get('investment_type')
-                start_date_str = investor.get('investment_start_date')
-                last_due_date = investor.get('last_due_date')
-                next_due_date = investor.get('next_due_date')
-                expiry_date = investor.get('investment_expiry_date')
-                current_week = int(investor.get('current_week', 0))
+                investor_id = investor.id
+                email = investor.email
+                initial = investor.initial_investment
+                total = investor.total_investment
+                investment_type = investor.investment_type
+                start_date = investor.investment_start_date
+                last_due_date = investor.last_due_date
+                expiry_date = investor.investment_expiry_date
+                current_week = investor.current_week
 
                 # Check 1: Total Investment Missing
                 if initial > 0 and total <= 0:
@@ -285,24 +432,15 @@ class AdminService:
                     continue
 
                 # Skip further checks if no active investment
-                if not investment_type or not start_date_str:
+                if not investment_type or not start_date:
                     continue
 
-                # Parse start date
-                # Handle potential timezone formats
-                if isinstance(start_date_str, str):
-                    start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-                    # Ensure offset-naive for simple calculation if needed, or keep aware.
-                    # Standardizing on offset-naive for 'now' diff usually easier if we stick to one convention.
-                    # But better to make 'now' aware or 'start_date' naive.
-                    # Let's make 'now' aware if start_date is aware.
-                    if start_date.tzinfo:
-                         now_aware = datetime.now(start_date.tzinfo)
-                         days_diff = (now_aware - start_date).days
-                    else:
-                         days_diff = (now - start_date).days
+                # Make 'now' aware if start_date is aware.
+                if start_date.tzinfo:
+                     now_aware = datetime.now(start_date.tzinfo)
+                     days_diff = (now_aware - start_date).days
                 else:
-                    days_diff = 0 # Should not happen if str
+                     days_diff = (now - start_date).days
                 
                 calculated_weeks_elapsed = days_diff // 7
 
@@ -410,6 +548,8 @@ class AdminService:
             if updates:
                 updates['updated_at'] = datetime.now().isoformat()
                 self.supabase.table('investors').update(updates).eq('id', investor_id).execute()
+                if 'next_due_date' in updates:
+                    due_date_timer.schedule(investor_id, updates['next_due_date'])
                 return {'success': True, 'updates': updates}
             else:
                 return {'success': True, 'message': 'No updates needed'}
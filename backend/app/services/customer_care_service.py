@@ -4,19 +4,19 @@ Handles customer queries and support requests
 """
 
 import os
-from typing import Dict, Any, Optional
-from supabase import create_client, Client
-from app.core.config import settings
+import uuid
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.clients import LazyClient
 
 class CustomerCareService:
     def __init__(self):
         """Initialize the Customer Care service with Supabase client"""
-        # Use service role key to bypass RLS policies for backend operations
-        key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
-        self.supabase: Client = create_client(
-            settings.SUPABASE_URL,
-            key
-        )
+        # Use service role key to bypass RLS policies for backend operations.
+        # The service is a module-level singleton, so the client is created on first use.
+        self.supabase = LazyClient('SUPABASE_SERVICE_ROLE_KEY')
         self.storage_bucket = "customer-attachments"
 
     async def submit_query(
@@ -106,55 +106,58 @@ class CustomerCareService:
     async def upload_attachment(
         self,
         user_id: str,
-        file_content: bytes,
+        file: Union[BinaryIO, bytes],
         file_name: str,
         content_type: str
     ) -> Dict[str, Any]:
         """
         Upload an attachment to Supabase Storage
         
+        The storage client is synchronous, so the upload runs in the
+        threadpool; a file object is streamed in chunks rather than read
+        into memory.
+        
         Args:
             user_id (str): The user ID
-            file_content (bytes): File content
-            file_name (str): Original file name
+            file (BinaryIO | bytes): Open file (e.g. core.uploads.upload_reader) or file content
+            file_name (str): Stored file name; only its extension is kept
             content_type (str): MIME type of the file
             
         Returns:
             Dict[str, Any]: Upload result with URL
         """
         try:
-            # Generate unique file name
-            import uuid
-            file_ext = os.path.splitext(file_name)[1]
-            unique_filename = f"{user_id}/{uuid.uuid4()}{file_ext}"
-            
-            # Upload to storage
-            result = self.supabase.storage.from_(self.storage_bucket)\
-                .upload(unique_filename, file_content, {
-                    "content-type": content_type,
-                    "upsert": False
-                })
-            
-            if result:
-                # Get public URL
-                public_url = self.supabase.storage.from_(self.storage_bucket)\
-                    .get_public_url(unique_filename)
-                
-                return {
-                    "success": True,
-                    "url": public_url
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "Failed to upload attachment"
-                }
-                
+            return await run_in_threadpool(self._upload_attachment, user_id, file, file_name, content_type)
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
 
+    def _upload_attachment(self, user_id: str, file: Union[BinaryIO, bytes],
+                           file_name: str, content_type: str) -> Dict[str, Any]:
+        # Generate unique file name
+        file_ext = os.path.splitext(file_name)[1]
+        unique_filename = f"{user_id}/{uuid.uuid4()}{file_ext}"
+
+        # Upload to storage
+        bucket = self.supabase.storage.from_(self.storage_bucket)
+        result = bucket.upload(unique_filename, file, {
+            "content-type": content_type,
+            "upsert": False
+        })
+
+        if not result:
+            return {
+                "success": False,
+                "error": "Failed to upload attachment"
+            }
+
+        # Get public URL
+        return {
+            "success": True,
+            "url": bucket.get_public_url(unique_filename)
+        }
+
 # Create singleton instance
 customer_care_service = CustomerCareService()
\ No newline at end of file
@@ -6,8 +6,10 @@ Handles fetching user info, investment balance, and related data.
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from ..core.config import settings
+from ..models.rows import Investor, Session, SpendingAccount, Transaction, parse_datetime
 from .transaction_service import TransactionService
 from .interest_calculation_service import InterestCalculationService
+from .spending_accounts import spending_accounts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,49 +36,47 @@ class DashboardService:
         """Get user data from session token."""
         try:
             # Get session
-            session_response = self.supabase.table('sessions').select('*').eq('token', session_token).execute()
+            session_response = self.supabase.table('sessions').select(
+                Session.columns('user_id', 'created_at')
+            ).eq('token', session_token).execute()
             session_data = getattr(session_response, 'data', [])
 
             if not session_data or len(session_data) == 0:
                 logger.warning(f"Session token not found: {session_token[:8]}...")
                 return None
 
-            session = session_data[0]
-            created_at = session.get('created_at')
+            session = Session.from_row(session_data[0])
 
             # Check if session is expired (6 hours from creation)
-            if not self._is_session_valid(created_at):
+            if not self._is_session_valid(session):
                 # Session expired, delete it
                 self.supabase.table('sessions').delete().eq('token', session_token).execute()
-                logger.info(f"Session expired and deleted: {session_token[:8]}... (created at: {created_at})")
+                logger.info(f"Session expired and deleted: {session_token[:8]}... (created at: {session.created_at})")
                 return None
 
             # Get user
-            user_response = self.supabase.table('users').select('*').eq('id', session['user_id']).execute()
+            user_response = self.supabase.table('users').select('*').eq('id', session.user_id).execute()
             user_data = getattr(user_response, 'data', [])
 
             if user_data and len(user_data) > 0:
                 return user_data[0]
 
-            logger.warning(f"User not found for session user_id: {session['user_id']}")
+            logger.warning(f"User not found for session user_id: {session.user_id}")
             return None
         except Exception as e:
             logger.error(f"Error getting user by session: {str(e)}")
             return None
 
-    def _is_session_valid(self, created_at) -> bool:
+    def _is_session_valid(self, session: Session) -> bool:
         """Check if session is still valid (within 6 hours)."""
-        if not created_at:
+        if not session.created_at:
             logger.warning("Session created_at is null")
             return False
 
         try:
-            if isinstance(created_at, str):
-                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            now = datetime.now(created_at.tzinfo) if hasattr(created_at, 'tzinfo') else datetime.now()
-            is_valid = now < created_at + timedelta(hours=6)
+            is_valid = session.is_valid()
             if not is_valid:
-                logger.debug(f"Session expired. Created: {created_at}, Now: {now}")
+                logger.debug(f"Session expired. Created: {session.created_at}")
             return is_valid
         except Exception as e:
             logger.error(f"Error checking session validity: {str(e)}")
@@ -105,7 +105,7 @@ class DashboardService:
 
             return total_due
         except Exception as e:
-            print(f"Error calculating total amount due: {e}")
+            logger.error(f"Error calculating total amount due: {e}")
             return 0.0
 
     def get_user_investments(self, user_email: str, investments_data: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -147,13 +147,11 @@ class DashboardService:
             spending_balance = 0
             if investments_data:
                 investor_id = investments_data[0]['id']
-                # Optimization: We could pre-fetch this too, but for now let's keep it as is 
-                # or rely on the fact that we might fetch it in the main method if needed.
-                # For now, let's keep the call but it's one call per dashboard load, not per investment.
-                interest_service = InterestCalculationService()
-                balance_result = interest_service.get_spending_account_balance(investor_id)
-                if balance_result['success']:
-                    spending_balance = balance_result['balance']
+                # Served from the per-process spending-account cache on repeat loads
+                try:
+                    spending_balance = SpendingAccount.from_row(spending_accounts.get(investor_id)).balance
+                except Exception as e:
+                    logger.warning(f"Could not load spending account for {investor_id}: {e}")
 
             # Get primary investment (first one for now)
             primary = investments[0] if investments else None
@@ -166,7 +164,7 @@ class DashboardService:
                 'primary_investment': primary
             }
         except Exception as e:
-            print(f"Error getting user investments: {e}")
+            logger.error(f"Error getting user investments: {e}")
             return {
                 'total_balance': 0,
                 'total_due': 0,
@@ -190,7 +188,7 @@ class DashboardService:
             else:
                 return []
         except Exception as e:
-            print(f"Error getting recent transactions: {e}")
+            logger.error(f"Error getting recent transactions: {e}")
             return []
 
     def get_dashboard_data(self, session_token: str) -> Dict[str, Any]:
@@ -209,7 +207,7 @@ class DashboardService:
             investor_response = self.supabase.table('investors').select('*').eq('email', user['email']).execute()
             investor_data = getattr(investor_response, 'data', [])
         except Exception as e:
-            print(f"Error fetching investor data: {e}")
+            logger.error(f"Error fetching investor data: {e}")
             investor_data = []
 
         investor_id = investor_data[0]['id'] if investor_data else None
@@ -223,14 +221,14 @@ class DashboardService:
         #         # Use centralized check
         #         interest_service.process_investor_due_date_check(investor_id)
         #     except Exception as e:
-        #         print(f"Error checking due dates: {e}")
+        #         logger.error(f"Error checking due dates: {e}")
 
         # Background update: populate NULL values for current_week and investment_expiry_date
         # This ensures backward compatibility for existing investors when columns were added
         try:
             self._populate_missing_investor_fields_background()
         except Exception as e:
-            print(f"Error in background field population: {e}")
+            logger.error(f"Error in background field population: {e}")
 
         # Get investment data using pre-fetched investor data
         investment_data = self.get_user_investments(user['email'], investor_data)
@@ -255,7 +253,7 @@ class DashboardService:
                 if requirements:
                     interest_rate = requirements.get('weekly_interest_rate', 0)
             except Exception as e:
-                print(f"Error getting investor profile for available investments: {e}")
+                logger.error(f"Error getting investor profile for available investments: {e}")
                 available_investments = []
 
         # Get analytics summary
@@ -264,11 +262,10 @@ class DashboardService:
             try:
                 from .portfolio_service import PortfolioService
                 portfolio_service = PortfolioService()
-                investor = investor_data[0]
-                portfolio_type = investor.get('portfolio_type')
-                investment_type = investor.get('investment_type')
-                initial_investment = float(investor.get('initial_investment', 0))
-                investment_start_date = investor.get('created_at')
+                investor = Investor.from_row(investor_data[0])
+                portfolio_type = investor.portfolio_type
+                investment_type = investor.investment_type
+                initial_investment = investor.initial_investment
 
                 requirements = portfolio_service.get_investment_requirements(portfolio_type, investment_type)
 
@@ -277,12 +274,8 @@ class DashboardService:
                     weekly_interest = initial_investment * weekly_rate
                     duration_weeks = requirements["expiry_weeks"]
 
-                    # Parse investment start date
                     from datetime import datetime
-                    if isinstance(investment_start_date, str):
-                        start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-                    else:
-                        start_date = investment_start_date or datetime.now()
+                    start_date = investor.created_at or datetime.now()
 
                     # Calculate weeks elapsed
                     now = datetime.now(start_date.tzinfo)
@@ -296,17 +289,19 @@ class DashboardService:
                     # But here we need ALL transactions for stats.
                     
                     # Optimization: Fetch all transactions for this investor once for analytics and goals
-                    transaction_response = self.supabase.table('transactions').select('*').eq('investor_id', investor_id).execute()
-                    all_transactions = getattr(transaction_response, 'data', [])
+                    # Only the columns analytics and goals use, parsed once for both.
+                    transaction_response = self.supabase.table('transactions').select(Transaction.columns(
+                        'id', 'transaction_id', 'transaction_type', 'withdraw_status', 'amount', 'created_at'
+                    )).eq('investor_id', investor_id).execute()
+                    all_transactions = Transaction.from_rows(getattr(transaction_response, 'data', []))
 
                     total_withdrawn = 0
                     withdrawal_count = 0
                     largest_withdrawal = 0
 
                     for transaction in all_transactions:
-                        if (transaction.get('transaction_type') == 'withdrawal' and
-                            transaction.get('withdraw_status') == 'sent'):
-                            amount = float(transaction.get('amount', 0))
+                        if transaction.is_sent_withdrawal:
+                            amount = transaction.amount
                             total_withdrawn += amount
                             withdrawal_count += 1
                             largest_withdrawal = max(largest_withdrawal, amount)
@@ -321,7 +316,7 @@ class DashboardService:
                         'total_weeks': duration_weeks
                     }
             except Exception as e:
-                print(f"Error getting analytics summary: {e}")
+                logger.error(f"Error getting analytics summary: {e}")
                 analytics_summary = {}
         else:
             all_transactions = [] # Empty if no investor
@@ -332,11 +327,10 @@ class DashboardService:
             try:
                 from .portfolio_service import PortfolioService
                 portfolio_service = PortfolioService()
-                investor = investor_data[0]
-                portfolio_type = investor.get('portfolio_type')
-                investment_type = investor.get('investment_type')
-                initial_investment = float(investor.get('initial_investment', 0))
-                investment_start_date = investor.get('created_at')
+                investor = Investor.from_row(investor_data[0])
+                portfolio_type = investor.portfolio_type
+                investment_type = investor.investment_type
+                initial_investment = investor.initial_investment
 
                 # Get investment rules
                 requirements = portfolio_service.get_investment_requirements(portfolio_type, investment_type)
@@ -347,27 +341,26 @@ class DashboardService:
 
                     # Use pre-fetched all_transactions
                     
-                    # Filter withdrawal transactions
-                    withdrawals = []
-                    for transaction in all_transactions:
-                        if (transaction.get('transaction_type') == 'withdrawal' and
-                            transaction.get('withdraw_status') == 'sent'):
-                            withdrawals.append({
-                                'id': transaction.get('id'),
-                                'amount': float(transaction.get('amount', 0)),
-                                'date': transaction.get('created_at'),
-                                'transaction_id': transaction.get('transaction_id')
-                            })
-
                     # Calculate timeline data
                     from datetime import datetime, timedelta
-                    import math
 
-                    # Parse investment start date
-                    if isinstance(investment_start_date, str):
-                        start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-                    else:
-                        start_date = investment_start_date or datetime.now()
+                    start_date = investor.created_at or datetime.now()
+
+                    # Filter withdrawal transactions and bucket them by investment week
+                    withdrawals = []
+                    withdrawals_by_week = {}
+                    for transaction in all_transactions:
+                        if transaction.is_sent_withdrawal:
+                            withdrawal = {
+                                'id': transaction.id,
+                                'amount': transaction.amount,
+                                'date': transaction.created_at.isoformat() if transaction.created_at else None,
+                                'transaction_id': transaction.transaction_id
+                            }
+                            withdrawals.append(withdrawal)
+                            if transaction.created_at:
+                                week = (transaction.created_at - start_date).days // 7
+                                withdrawals_by_week.setdefault(week, []).append(withdrawal)
 
                     # Calculate weeks elapsed
                     now = datetime.now(start_date.tzinfo)
@@ -388,16 +381,8 @@ class DashboardService:
                         if week > 0:  # No interest on week 0
                             cumulative_interest += weekly_interest
 
-                        # Check if there were withdrawals this week
-                        week_withdrawals = []
-                        for withdrawal in withdrawals:
-                            withdrawal_date = withdrawal['date']
-                            if isinstance(withdrawal_date, str):
-                                withdrawal_date = datetime.fromisoformat(withdrawal_date.replace('Z', '+00:00'))
-
-                            withdrawal_week = (withdrawal_date - start_date).days // 7
-                            if withdrawal_week == week:
-                                week_withdrawals.append(withdrawal)
+                        # Withdrawals made this week
+                        week_withdrawals = withdrawals_by_week.get(week, [])
 
                         # Calculate if renewable (when interest >= initial investment)
                         is_renewable = cumulative_interest >= initial_investment
@@ -443,7 +428,7 @@ class DashboardService:
                         'timeline': timeline
                     }
             except Exception as e:
-                print(f"Error getting goals data for dashboard: {e}")
+                logger.error(f"Error getting goals data for dashboard: {e}")
                 goals_data = {}
 
         # Get member since date from pre-fetched investor data
@@ -460,7 +445,7 @@ class DashboardService:
             if points_result['success']:
                 user_points = points_result
         except Exception as e:
-            print(f"Error getting user points for dashboard: {e}")
+            logger.error(f"Error getting user points for dashboard: {e}")
             user_points = {}
 
         # Get notifications
@@ -482,13 +467,13 @@ class DashboardService:
                 if notifications_result['success']:
                     notifications = notifications_result['data']
                 else:
-                    print(f"Error fetching notifications: {notifications_result.get('error', 'Unknown error')}")
+                    logger.error(f"Error fetching notifications: {notifications_result.get('error', 'Unknown error')}")
                     notifications = self._get_fallback_notifications(user, investor_id)
             else:
                 # Fallback if no investor ID
                 notifications = []
         except Exception as e:
-            print(f"Error getting notifications: {e}")
+            logger.error(f"Error getting notifications: {e}")
             notifications = []
 
         # Get server events for dashboard carousel
@@ -510,7 +495,7 @@ class DashboardService:
                 server_events = {'events': [], 'count': 0}
                 events_update_flag = False
         except Exception as e:
-            print(f"Error fetching server events for dashboard: {e}")
+            logger.error(f"Error fetching server events for dashboard: {e}")
             server_events = {'events': [], 'count': 0}
             events_update_flag = False
 
@@ -578,7 +563,7 @@ class DashboardService:
 
             return notifications
         except Exception as e:
-            print(f"Error in fallback notification generation: {e}")
+            logger.error(f"Error in fallback notification generation: {e}")
             return []
 
     def update_user_profile(self, user_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -614,7 +599,7 @@ class DashboardService:
                     'error': 'Failed to retrieve updated user data'
                 }
         except Exception as e:
-            print(f"Error updating user profile: {e}")
+            logger.error(f"Error updating user profile: {e}")
             return {
                 'success': False,
                 'error': f"Error updating profile: {str(e)}"
@@ -661,10 +646,7 @@ class DashboardService:
 
                     if requirements and requirements.get('expiry_weeks'):
                         # Calculate expiry date: start_date + duration_weeks
-                        if isinstance(investment_start_date, str):
-                            start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-                        else:
-                            start_date = investment_start_date
+                        start_date = parse_datetime(investment_start_date)
 
                         expiry_weeks = requirements['expiry_weeks']
                         expiry_date = start_date + timedelta(weeks=expiry_weeks)
@@ -697,14 +679,15 @@ class DashboardService:
                             update_data_result = getattr(update_response, 'data', [])
                             if update_data_result:
                                 processed_count += 1
-                                print(f"Updated missing fields for investor {investor_id}: {update_data}")
+                                logger.debug("Populated missing investor fields",
+                                             extra={'investor_id': investor_id, 'fields': sorted(update_data)})
 
                 except Exception as e:
-                    print(f"Error updating investor {investor_id}: {str(e)}")
+                    logger.error(f"Error updating investor {investor_id}: {str(e)}")
                     continue
 
             if processed_count > 0:
-                print(f"Background service populated missing fields for {processed_count} investors")
+                logger.info(f"Background service populated missing fields for {processed_count} investors")
 
         except Exception as e:
-            print(f"Error in background field population service: {str(e)}")
+            logger.error(f"Error in background field population service: {str(e)}")
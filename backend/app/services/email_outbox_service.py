@@ -0,0 +1,408 @@
+"""
+Email outbox for sending transactional emails off the request path.
+
+Request handlers call `email_outbox.enqueue(...)`, which writes the message
+to the `email_outbox` table and returns without waiting on the provider. A
+background sender thread drains the outbox in batches through MailerSend's
+bulk endpoint, retries failed batches with exponential backoff, caps the
+send rate and records each message's status on its row. Messages still
+queued or retrying when the process stops are reloaded by the next start().
+
+MailerSend accepts a batch and delivers it asynchronously, so a message the
+provider took is recorded as 'accepted' with the provider's message or bulk
+id, not as delivered.
+
+Set EMAIL_PROVIDER=fake to swap MailerSend for an in-memory provider when
+running locally.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from supabase import create_client
+except Exception:
+    create_client = None
+
+
+WAITING_STATUSES = ('queued', 'retrying')
+
+
+@dataclass
+class OutboxMessage:
+    """A queued email. `data` holds template variables, persisted only while the message waits."""
+    template: str
+    recipient: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = 'queued'
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    accepted_at: Optional[str] = None
+    provider_id: Optional[str] = None
+
+
+class MailerSendProvider:
+    """Sends batches through MailerSend, using the bulk endpoint for more than one message."""
+
+    def __init__(self):
+        from .email_service import EmailService
+        self.email_service = EmailService()
+
+    def send_batch(self, messages: List[OutboxMessage]) -> Optional[str]:
+        """Hand the batch to MailerSend; returns the message id or bulk_email_id."""
+        requests = [
+            self.email_service.build_email_request(m.template, m.recipient, m.data)
+            for m in messages
+        ]
+        if len(requests) == 1:
+            response = self.email_service.client.emails.send(requests[0])
+            key = 'id'
+        else:
+            response = self.email_service.send_bulk(requests)
+            key = 'bulk_email_id'
+        data = getattr(response, 'data', None)
+        return data.get(key) if isinstance(data, dict) else None
+
+
+class FakeEmailProvider:
+    """In-memory provider for local runs. Set `fail_next` to simulate provider outages."""
+
+    def __init__(self):
+        self.sent: List[OutboxMessage] = []
+        self.batches: List[int] = []
+        self.fail_next = 0
+
+    def send_batch(self, messages: List[OutboxMessage]) -> Optional[str]:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RuntimeError("Simulated provider failure")
+        self.sent.extend(messages)
+        self.batches.append(len(messages))
+        return f'fake-bulk-{len(self.batches)}'
+
+
+def _outbox_row(message: OutboxMessage) -> Dict[str, Any]:
+    return {
+        'id': message.id,
+        'template': message.template,
+        'recipient': message.recipient,
+        'status': message.status,
+        'attempts': message.attempts,
+        'last_error': message.last_error,
+        # Template variables may be secrets (reset codes); keep them only while needed
+        'payload': message.data if message.status in WAITING_STATUSES else None,
+        'provider_id': message.provider_id,
+        'created_at': message.created_at,
+        'accepted_at': message.accepted_at,
+        'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def _message_from_row(row: Dict[str, Any]) -> OutboxMessage:
+    return OutboxMessage(
+        template=row['template'],
+        recipient=row['recipient'],
+        data=row.get('payload') or {},
+        id=row['id'],
+        status=row['status'],
+        attempts=row.get('attempts') or 0,
+        last_error=row.get('last_error'),
+        created_at=row.get('created_at') or datetime.utcnow().isoformat()
+    )
+
+
+class SupabaseDeliveryLog:
+    """The `email_outbox` table: one insert per enqueue, one upsert per batch."""
+
+    def __init__(self):
+        if create_client is None:
+            raise RuntimeError("supabase package not installed")
+
+        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+            raise RuntimeError("Supabase config missing in settings")
+
+        self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+
+    def insert(self, message: OutboxMessage) -> None:
+        self.supabase.table('email_outbox').insert(_outbox_row(message)).execute()
+
+    def record(self, messages: List[OutboxMessage]) -> None:
+        self.supabase.table('email_outbox').upsert([_outbox_row(m) for m in messages]).execute()
+
+    def load_waiting(self) -> List[OutboxMessage]:
+        """Messages left queued or retrying by a previous process, oldest first."""
+        response = self.supabase.table('email_outbox') \
+            .select('*') \
+            .in_('status', list(WAITING_STATUSES)) \
+            .order('created_at') \
+            .execute()
+        return [_message_from_row(row) for row in getattr(response, 'data', None) or []]
+
+
+class InMemoryDeliveryLog:
+    """Keeps outbox rows in a dict; paired with FakeEmailProvider."""
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def insert(self, message: OutboxMessage) -> None:
+        self.rows[message.id] = _outbox_row(message)
+
+    def record(self, messages: List[OutboxMessage]) -> None:
+        for m in messages:
+            self.rows[m.id] = _outbox_row(m)
+
+    def load_waiting(self) -> List[OutboxMessage]:
+        rows = sorted((r for r in self.rows.values() if r['status'] in WAITING_STATUSES),
+                      key=lambda r: r['created_at'])
+        return [_message_from_row(row) for row in rows]
+
+
+class _RateLimiter:
+    """Token bucket capping messages per second."""
+
+    def __init__(self, rate_per_second: float):
+        self.rate = max(rate_per_second, 0.001)
+        self.capacity = max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def acquire(self, count: int, stop_event: threading.Event) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count or count > self.capacity and self.tokens >= self.capacity:
+                self.tokens -= count
+                return
+            wait = (min(count, self.capacity) - self.tokens) / self.rate
+            if stop_event.wait(wait):
+                # Shutting down: don't hold the drain back on the rate cap.
+                return
+
+
+class EmailOutbox:
+    """Batching, retrying email sender running on a daemon thread."""
+
+    STATUS_HISTORY_SIZE = 1000
+
+    def __init__(self, provider=None, delivery_log=None,
+                 batch_size: Optional[int] = None,
+                 max_attempts: Optional[int] = None,
+                 rate_per_second: Optional[float] = None,
+                 backoff_base_seconds: float = 2.0,
+                 poll_interval_seconds: float = 1.0):
+        self._provider = provider
+        self._delivery_log = delivery_log
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        self.rate_per_second = rate_per_second or settings.EMAIL_OUTBOX_RATE_PER_SECOND
+        self.backoff_base_seconds = backoff_base_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+        self._pending: List[OutboxMessage] = []
+        self._statuses: "OrderedDict[str, OutboxMessage]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._recovered = False
+
+    # -- public API -------------------------------------------------------
+
+    def enqueue(self, template: str, recipient: str, data: Optional[Dict[str, Any]] = None) -> str:
+        """Queue an email and return its outbox id. Never blocks on the provider."""
+        message = OutboxMessage(template=template, recipient=recipient, data=data or {})
+        try:
+            # Persisted before the sender can see it, so a crash can't lose it
+            self.delivery_log.insert(message)
+        except Exception as e:
+            logger.error(f"Failed to persist queued email {message.id}, sending from memory only: {str(e)}")
+        with self._condition:
+            self._pending.append(message)
+            self._remember(message)
+            self._condition.notify()
+        self.start()
+        return message.id
+
+    def get_status(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Return the last known delivery status for a recently queued message."""
+        with self._condition:
+            message = self._statuses.get(message_id)
+            if not message:
+                return None
+            return {
+                'id': message.id,
+                'status': message.status,
+                'attempts': message.attempts,
+                'last_error': message.last_error,
+                'provider_id': message.provider_id,
+                'accepted_at': message.accepted_at
+            }
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._pending) + self._in_flight
+
+    def start(self) -> None:
+        """Start the sender thread if it isn't running, first reloading messages a previous process left."""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            if not self._recovered:
+                self._recover()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+            logger.info("Email outbox started.")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the sender, making one final attempt at anything still queued."""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        if self._pending:
+            logger.warning(f"Email outbox stopped with {len(self._pending)} messages waiting; "
+                           f"they stay in email_outbox and are sent on the next start")
+        logger.info("Email outbox shut down.")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything currently queued has been attempted. Mainly for local runs."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+        while time.monotonic() < deadline:
+            with self._condition:
+                ready = [m for m in self._pending if m.attempts == 0]
+                if not ready and self._in_flight == 0:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    # -- sender loop --------------------------------------------------------
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            if settings.EMAIL_PROVIDER == 'fake':
+                self._provider = FakeEmailProvider()
+            else:
+                self._provider = MailerSendProvider()
+        return self._provider
+
+    @property
+    def delivery_log(self):
+        if self._delivery_log is None:
+            if settings.EMAIL_PROVIDER == 'fake':
+                self._delivery_log = InMemoryDeliveryLog()
+            else:
+                self._delivery_log = SupabaseDeliveryLog()
+        return self._delivery_log
+
+    def _recover(self) -> None:
+        """Queue the waiting rows of a previous process. Called once, holding the condition."""
+        self._recovered = True
+        try:
+            waiting = self.delivery_log.load_waiting()
+        except Exception as e:
+            logger.error(f"Failed to load waiting emails from the outbox: {str(e)}")
+            return
+        queued = {m.id for m in self._pending}
+        recovered = [m for m in waiting if m.id not in queued]
+        for message in recovered:
+            self._pending.append(message)
+            self._remember(message)
+        if recovered:
+            logger.info(f"Email outbox reloaded {len(recovered)} waiting messages")
+
+    def _remember(self, message: OutboxMessage) -> None:
+        self._statuses[message.id] = message
+        self._statuses.move_to_end(message.id)
+        while len(self._statuses) > self.STATUS_HISTORY_SIZE:
+            self._statuses.popitem(last=False)
+
+    def _next_batch(self) -> List[OutboxMessage]:
+        with self._condition:
+            while True:
+                stopping = self._stop_event.is_set()
+                now = time.monotonic()
+                ready = [m for m in self._pending if stopping or m.next_attempt_at <= now]
+                if ready:
+                    batch = ready[:self.batch_size]
+                    batch_ids = {m.id for m in batch}
+                    self._pending = [m for m in self._pending if m.id not in batch_ids]
+                    self._in_flight = len(batch)
+                    return batch
+                if stopping:
+                    return []
+                waits = [m.next_attempt_at - now for m in self._pending]
+                timeout = min(waits + [self.poll_interval_seconds])
+                self._condition.wait(max(timeout, 0.01))
+
+    def _run(self) -> None:
+        limiter = _RateLimiter(self.rate_per_second)
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            limiter.acquire(len(batch), self._stop_event)
+            self._deliver(batch)
+
+    def _deliver(self, batch: List[OutboxMessage]) -> None:
+        for message in batch:
+            message.attempts += 1
+        try:
+            provider_id = self.provider.send_batch(batch)
+            accepted_at = datetime.utcnow().isoformat()
+            for message in batch:
+                message.status = 'accepted'
+                message.accepted_at = accepted_at
+                message.provider_id = provider_id
+                message.last_error = None
+        except Exception as e:
+            logger.warning(f"Email batch of {len(batch)} failed: {str(e)}")
+            retry = []
+            for message in batch:
+                message.last_error = str(e)
+                if message.attempts >= self.max_attempts:
+                    message.status = 'failed'
+                else:
+                    message.status = 'retrying'
+                    backoff = self.backoff_base_seconds * (2 ** (message.attempts - 1))
+                    message.next_attempt_at = time.monotonic() + backoff + random.uniform(0, backoff / 2)
+                    # While stopping, the row stays 'retrying' for the next start to pick up
+                    if not self._stop_event.is_set():
+                        retry.append(message)
+            with self._condition:
+                self._pending.extend(retry)
+
+        with self._condition:
+            self._in_flight = 0
+
+        try:
+            self.delivery_log.record(batch)
+        except Exception as e:
+            logger.error(f"Failed to record email delivery status: {str(e)}")
+
+
+# Shared outbox used by the request handlers; started with the app.
+email_outbox = EmailOutbox()
@@ -1,6 +1,30 @@
-import inspect
+from typing import Dict, Any, List, Optional
 from mailersend import MailerSendClient, EmailRequest, EmailContact
 from ..core.config import settings
+from ..core.metrics import external_call
+
+SENDER_EMAIL = "bmvcustomerservice92@gmail.com"
+SENDER_NAME = "Blue Gold Investments"
+
+# MailerSend templates keyed by the name the rest of the app uses.
+EMAIL_TEMPLATES: Dict[str, Dict[str, str]] = {
+    'password_reset': {
+        'subject': "Password Reset Code",
+        'template_id': "z3m5jgreopoldpyo",
+        'to_name': "Dear User",
+    },
+    'account_deletion': {
+        'subject': "Account Deletion Confirmation",
+        'template_id': "123456789",  # Placeholder string template ID
+        'to_name': "User",
+    },
+    'password_reset_success': {
+        'subject': "Password Reset Successful",
+        'template_id': "123456789",  # Placeholder string template ID
+        'to_name': "User",
+    },
+}
+
 
 class EmailService:
     """Service for sending emails using MailerSend."""
@@ -8,43 +32,70 @@ class EmailService:
     def __init__(self):
         self.client = MailerSendClient(settings.MAILERSEND_API)
 
-    def send_password_reset_email(self, recipient_email: str, reset_code: str):
+    def build_email_request(self, template: str, recipient_email: str,
+                            data: Optional[Dict[str, Any]] = None) -> EmailRequest:
         """
-        Send password reset email with reset code.
+        Build a MailerSend request for one of the known templates.
 
         Args:
+            template: Key into EMAIL_TEMPLATES
             recipient_email: The email address of the recipient
-            reset_code: The 6-digit reset code to send
+            data: Personalization variables for the template
         """
+        if template not in EMAIL_TEMPLATES:
+            raise ValueError(f"Unknown email template: {template}")
+
+        spec = EMAIL_TEMPLATES[template]
+        personalization = [
+            {
+                "email": recipient_email,
+                "data": {"email": recipient_email, **(data or {})}
+            }
+        ]
+
+        return EmailRequest(
+            **{
+                "from": EmailContact(email=SENDER_EMAIL, name=SENDER_NAME),
+                "to": [EmailContact(email=recipient_email, name=spec['to_name'])],
+                "subject": spec['subject'],
+                "template_id": spec['template_id'],
+                "personalization": personalization
+            }
+        )
+
+    def send(self, template: str, recipient_email: str, data: Optional[Dict[str, Any]] = None):
+        """Send a single templated email synchronously."""
         try:
-            personalization = [
-                {
-                    "email": recipient_email,
-                    "data": {
-                        "reset_code": reset_code,
-                        "email": recipient_email
-                    }
-                }
-            ]
-
-            email_request = EmailRequest(
-                **{
-                    "from": EmailContact(
-                        email="bmvcustomerservice92@gmail.com",
-                        name="Blue Gold Investments"
-                    ),
-                    "to": [EmailContact(email=recipient_email, name="Dear User")],
-                    "subject": "Password Reset Code",
-                    "template_id": "z3m5jgreopoldpyo",
-                    "personalization": personalization
-                }
-            )
-
-            response = self.client.emails.send(email_request)
+            email_request = self.build_email_request(template, recipient_email, data)
+            with external_call('mailersend', 'send'):
+                response = self.client.emails.send(email_request)
             return response
         except Exception as e:
             raise Exception(f"Failed to send email: {str(e)}")
 
+    def send_bulk(self, email_requests: List[EmailRequest]):
+        """
+        Send several prepared requests through MailerSend's bulk endpoint.
+
+        MailerSend accepts the whole batch in one API call and delivers it
+        asynchronously; the response carries a bulk_email_id.
+        """
+        try:
+            with external_call('mailersend', 'send_bulk'):
+                return self.client.emails.send_bulk(email_requests)
+        except Exception as e:
+            raise Exception(f"Failed to send bulk email: {str(e)}")
+
+    def send_password_reset_email(self, recipient_email: str, reset_code: str):
+        """
+        Send password reset email with reset code.
+
+        Args:
+            recipient_email: The email address of the recipient
+            reset_code: The 6-digit reset code to send
+        """
+        return self.send('password_reset', recipient_email, {"reset_code": reset_code})
+
     def send_account_deletion_email(self, recipient_email: str):
         """
         Send account deletion confirmation email.
@@ -52,33 +103,7 @@ class EmailService:
         Args:
             recipient_email: The email address of the recipient
         """
-        try:
-            personalization = [
-                {
-                    "email": recipient_email,
-                    "data": {
-                        "email": recipient_email
-                    }
-                }
-            ]
-
-            email_request = EmailRequest(
-                **{
-                    "from": EmailContact(
-                        email="bmvcustomerservice92@gmail.com",
-                        name="Blue Gold Investments"
-                    ),
-                    "to": [EmailContact(email=recipient_email, name="User")],
-                    "subject": "Account Deletion Confirmation",
-                    "template_id": "123456789",  # Placeholder string template ID
-                    "personalization": personalization
-                }
-            )
-
-            response = self.client.emails.send(email_request)
-            return response
-        except Exception as e:
-            raise Exception(f"Failed to send email: {str(e)}")
+        return self.send('account_deletion', recipient_email)
 
     def send_password_reset_success_email(self, recipient_email: str):
         """
@@ -87,30 +112,4 @@ class EmailService:
         Args:
             recipient_email: The email address of the recipient
         """
-        try:
-            personalization = [
-                {
-                    "email": recipient_email,
-                    "data": {
-                        "email": recipient_email
-                    }
-                }
-            ]
-
-            email_request = EmailRequest(
-                **{
-                    "from": EmailContact(
-                        email="bmvcustomerservice92@gmail.com",
-                        name="Blue Gold Investments"
-                    ),
-                    "to": [EmailContact(email=recipient_email, name="User")],
-                    "subject": "Password Reset Successful",
-                    "template_id": "123456789",  # Placeholder string template ID
-                    "personalization": personalization
-                }
-            )
-
-            response = self.client.emails.send(email_request)
-            return response
-        except Exception as e:
-            raise Exception(f"Failed to send email: {str(e)}")
\ No newline at end of file
+        return self.send('password_reset_success', recipient_email)
@@ -0,0 +1,162 @@
+"""
+Collision-free allocation of referral codes and investor account numbers.
+
+Identifiers come from a database counter instead of random draws. Each
+process reserves a block of counter values with one atomic
+`reserve_id_block` call and hands them out locally, so issuing an id costs
+no round trip most of the time and never needs a "does this exist?" probe.
+
+Counter values go through a fixed bijection before encoding, so consecutive
+signups don't get visibly consecutive codes while uniqueness is preserved:
+
+- Referral codes: 7 Crockford base32 characters plus one check character
+  (8 characters, the width of users.referral_code).
+- Account numbers: "INV" + 10 digits + a Luhn check digit. Legacy random
+  account numbers have at most 10 digits, so the two ranges can't overlap.
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from supabase import create_client
+except Exception:
+    create_client = None
+
+
+CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+REFERRAL_PAYLOAD_LENGTH = 7
+REFERRAL_SPACE = 32 ** REFERRAL_PAYLOAD_LENGTH          # 2**35
+ACCOUNT_DIGITS = 10
+ACCOUNT_SPACE = 10 ** ACCOUNT_DIGITS
+
+# Odd multipliers are invertible modulo powers of two; multipliers coprime to
+# 10 are invertible modulo powers of ten. Both maps are therefore bijections.
+_REFERRAL_MULTIPLIER = 0x5DEECE66D % REFERRAL_SPACE | 1
+_REFERRAL_OFFSET = 0x2F6A7B3C1
+_ACCOUNT_MULTIPLIER = 7_919_113_977
+_ACCOUNT_OFFSET = 1_000_000_007
+
+
+def _referral_check_char(payload: str) -> str:
+    # Odd weights are invertible mod 32, so any single mistyped character
+    # changes the check character.
+    total = sum((2 * i + 1) * CROCKFORD_ALPHABET.index(c) for i, c in enumerate(payload))
+    return CROCKFORD_ALPHABET[total % 32]
+
+
+def encode_referral_code(value: int) -> str:
+    """Map a counter value to an 8-character referral code."""
+    scrambled = (value * _REFERRAL_MULTIPLIER + _REFERRAL_OFFSET) % REFERRAL_SPACE
+    chars = []
+    for _ in range(REFERRAL_PAYLOAD_LENGTH):
+        scrambled, digit = divmod(scrambled, 32)
+        chars.append(CROCKFORD_ALPHABET[digit])
+    payload = ''.join(reversed(chars))
+    return payload + _referral_check_char(payload)
+
+
+def is_valid_referral_code(code: str) -> bool:
+    """True if `code` was produced by encode_referral_code (format and check character)."""
+    if len(code) != REFERRAL_PAYLOAD_LENGTH + 1 or any(c not in CROCKFORD_ALPHABET for c in code):
+        return False
+    return _referral_check_char(code[:-1]) == code[-1]
+
+
+def _luhn_check_digit(digits: str) -> str:
+    total = 0
+    for i, c in enumerate(reversed(digits)):
+        d = int(c)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return str((10 - total % 10) % 10)
+
+
+def encode_account_number(value: int) -> str:
+    """Map a counter value to an INV account number with a Luhn check digit."""
+    scrambled = (value * _ACCOUNT_MULTIPLIER + _ACCOUNT_OFFSET) % ACCOUNT_SPACE
+    digits = f"{scrambled:0{ACCOUNT_DIGITS}d}"
+    return f"INV{digits}{_luhn_check_digit(digits)}"
+
+
+def is_valid_account_number(account_number: str) -> bool:
+    """True if `account_number` has the allocated INV format and a correct check digit."""
+    body = account_number[3:]
+    if not account_number.startswith('INV') or len(body) != ACCOUNT_DIGITS + 1 or not body.isdigit():
+        return False
+    return _luhn_check_digit(body[:-1]) == body[-1]
+
+
+class SupabaseBlockSource:
+    """Reserves counter blocks through the `reserve_id_block` database function."""
+
+    def __init__(self):
+        if create_client is None:
+            raise RuntimeError("supabase package not installed")
+
+        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+            raise RuntimeError("Supabase config missing in settings")
+
+        self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+
+    def __call__(self, name: str, size: int) -> int:
+        response = self.supabase.rpc('reserve_id_block', {'p_name': name, 'p_size': size}).execute()
+        data = getattr(response, 'data', None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if isinstance(data, dict):
+            data = next(iter(data.values()), None)
+        if data is None:
+            raise RuntimeError(f"Failed to reserve id block for {name}")
+        return int(data)
+
+
+class IdAllocator:
+    """
+    Issues unique identifiers from locally held counter blocks.
+
+    Args:
+        name: Counter name in the id_blocks table
+        encode: Maps a counter value to the identifier string
+        block_size: Values reserved per database call
+        block_source: Callable(name, size) returning the first value of a fresh block
+    """
+
+    def __init__(self, name: str, encode: Callable[[int], str], block_size: Optional[int] = None,
+                 block_source: Optional[Callable[[str, int], int]] = None):
+        self.name = name
+        self.encode = encode
+        self.block_size = block_size or settings.ID_BLOCK_SIZE
+        self._block_source = block_source
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def block_source(self) -> Callable[[str, int], int]:
+        if self._block_source is None:
+            self._block_source = SupabaseBlockSource()
+        return self._block_source
+
+    def next_value(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                start = self.block_source(self.name, self.block_size)
+                self._next, self._end = start, start + self.block_size
+            value = self._next
+            self._next += 1
+            return value
+
+    def next_id(self) -> str:
+        return self.encode(self.next_value())
+
+
+referral_code_allocator = IdAllocator('referral_code', encode_referral_code)
+account_number_allocator = IdAllocator('account_number', encode_account_number)
@@ -3,9 +3,20 @@ Interest Calculation Service for managing interest calculations and database upd
 Handles interest calculation based on investment start date, portfolio type, and investment type.
 """
 
-from typing import Dict, Any, Optional
+import logging
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta, date
 from ..core.config import settings
+from ..core.pagination import ascending_keyset_filter
+from ..core.due_date_timer import due_date_timer
+from ..models.rows import Investor, SpendingAccount, parse_datetime
+from .notification_service import NotificationService
+from .notification_writer import notification_writer
+from .payment_totals import invalidate_payment_totals
+from .spending_accounts import spending_accounts
+from .versioned_rows import investor_rows
+
+logger = logging.getLogger(__name__)
 
 try:
     from supabase import create_client
@@ -42,39 +53,12 @@ class InterestCalculationService:
         return weekly_interest
 
     def get_investor_spending_account(self, investor_id: str) -> Dict[str, Any]:
-        """Get or create spending account for an investor."""
+        """Get or create spending account for an investor (cached, see spending_accounts)."""
         try:
-            # Check if spending account exists
-            response = self.supabase.table('spending_accounts').select('*').eq('investor_id', investor_id).execute()
-            data = getattr(response, 'data', [])
-            
-            if data:
-                return {
-                    'success': True,
-                    'account': data[0]
-                }
-            
-            # Create new spending account if it doesn't exist
-            new_account = {
-                'investor_id': investor_id,
-                'balance': 0,
-                'total_withdrawn': 0
+            return {
+                'success': True,
+                'account': spending_accounts.get(investor_id)
             }
-            
-            create_response = self.supabase.table('spending_accounts').insert(new_account).execute()
-            create_data = getattr(create_response, 'data', [])
-            
-            if create_data:
-                return {
-                    'success': True,
-                    'account': create_data[0]
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'Failed to create spending account'
-                }
-                
         except Exception as e:
             return {
                 'success': False,
@@ -87,7 +71,10 @@ class InterestCalculationService:
         """
         try:
             # Get investor details
-            investor_response = self.supabase.table('investors').select('*').eq('id', investor_id).execute()
+            investor_response = self.supabase.table('investors').select(Investor.columns(
+                'portfolio_type', 'investment_type', 'initial_investment', 'total_investment',
+                'investment_start_date', 'payment_counter'
+            )).eq('id', investor_id).execute()
             investor_data = getattr(investor_response, 'data', [])
 
             if not investor_data:
@@ -96,27 +83,21 @@ class InterestCalculationService:
                     'error': 'Investor not found'
                 }
 
-            investor = investor_data[0]
-            portfolio_type = investor.get('portfolio_type')
-            investment_type = investor.get('investment_type')
-            # Fallback to initial_investment if total_investment is 0 or missing (Fix for legacy data)
-            total_investment = float(investor.get('total_investment', 0) or investor.get('initial_investment', 0) or 0)
-            investment_start_date = investor.get('investment_start_date')
+            investor = Investor.from_row(investor_data[0])
+            portfolio_type = investor.portfolio_type
+            investment_type = investor.investment_type
+            # Falls back to initial_investment if total_investment is 0 or missing (legacy data)
+            total_investment = investor.principal
+            start_date = investor.investment_start_date
 
             # If no investment type or start date or zero total investment, no interest
-            if not investment_type or not investment_start_date or total_investment <= 0:
+            if not investment_type or not start_date or total_investment <= 0:
                 return {
                     'success': True,
                     'interest_amount': 0,
                     'weeks_elapsed': 0
                 }
 
-            # Parse investment start date
-            if isinstance(investment_start_date, str):
-                start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-            else:
-                start_date = investment_start_date
-
             # Calculate weeks elapsed since investment start
             weeks_elapsed = (datetime.now(start_date.tzinfo) - start_date).days // 7
 
@@ -133,9 +114,9 @@ class InterestCalculationService:
                 'success': True,
                 'interest_amount': weekly_interest,
                 'weeks_elapsed': weeks_elapsed,
-                'investment_start_date': investment_start_date,
+                'investment_start_date': investor_data[0]['investment_start_date'],
                 'total_investment': total_investment,
-                'payment_counter': int(investor.get('payment_counter', 0) or 0)
+                'payment_counter': investor.payment_counter
             }
 
         except Exception as e:
@@ -177,94 +158,51 @@ class InterestCalculationService:
     def update_spending_account(self, investor_id: str, interest_amount: float) -> Dict[str, Any]:
         """Add interest to investor's spending account."""
         try:
-            # Get or create spending account
-            account_result = self.get_investor_spending_account(investor_id)
-            if not account_result['success']:
-                return account_result
-            
-            account = account_result['account']
-            current_balance = float(account.get('balance', 0))
-            new_balance = current_balance + interest_amount
-            
-            # Update spending account balance
-            update_data = {
-                'balance': new_balance,
-                'updated_at': datetime.now().isoformat()
+            # Applied as a delta server-side, so concurrent credits cannot overwrite each other
+            account = spending_accounts.credit(investor_id, interest_amount)
+            return {
+                'success': True,
+                'new_balance': SpendingAccount.from_row(account).balance,
+                'interest_added': interest_amount
             }
-            
-            update_response = self.supabase.table('spending_accounts').update(update_data).eq('id', account['id']).execute()
-            update_data_result = getattr(update_response, 'data', [])
-            
-            if update_data_result:
-                return {
-                    'success': True,
-                    'new_balance': new_balance,
-                    'interest_added': interest_amount
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'Failed to update spending account'
-                }
-                
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Error updating spending account: {str(e)}'
             }
 
-    def _update_next_due_date(self, investor_id: str) -> bool:
+    def _update_next_due_date(self, investor_id: str, paid_due_date: datetime) -> bool:
         """
-        Update the next_due_date to next week.
+        Move the due date on by a week after the installment due on `paid_due_date` was paid.
         Logic:
-        - The payment was just made for 'next_due_date'.
-        - So 'last_due_date' becomes the old 'next_due_date'.
-        - New 'next_due_date' becomes old 'next_due_date' + 7 days.
+        - 'last_due_date' becomes the date just paid.
+        - New 'next_due_date' becomes that date + 7 days.
+        The update is versioned and only applies while next_due_date is still the
+        date just paid, so concurrent checks advance it once. The due dates are
+        `date` columns, so only the day is compared and written.
         """
-        try:
-            # Get investor data
-            investor_response = self.supabase.table('investors').select('next_due_date, current_week, investment_expiry_date, portfolio_type, investment_type, investment_start_date, created_at').eq('id', investor_id).execute()
-            investor_data = getattr(investor_response, 'data', [])
-
-            if not investor_data:
-                return False
-
-            investor = investor_data[0]
-            current_next_due_date = investor.get('next_due_date')
-            current_week = int(investor.get('current_week', 0))
-            investment_expiry_date = investor.get('investment_expiry_date')
-
-            if not current_next_due_date:
-                # Should not happen if we just paid, but handle gracefully
-                return False
-
-            # Parse current due date (which was just paid)
-            if isinstance(current_next_due_date, str):
-                just_paid_date_obj = datetime.fromisoformat(current_next_due_date.replace('Z', '+00:00'))
-            else:
-                just_paid_date_obj = current_next_due_date
+        def advance(row):
+            investor = Investor.from_row(row)
+            just_paid_date_obj = investor.next_due_date
+            if not just_paid_date_obj or just_paid_date_obj.date() != paid_due_date.date():
+                # Already advanced by another run (or never set)
+                return None
 
             # Calculate new dates
             new_last_due_date_obj = just_paid_date_obj
             new_next_due_date_obj = just_paid_date_obj + timedelta(days=7)
-            new_current_week = current_week + 1
 
             # Calculate expiry date dynamically
-            portfolio_type = investor.get('portfolio_type')
-            investment_type = investor.get('investment_type')
-            start_date_val = investor.get('investment_start_date') or investor.get('created_at')
-            
-            if portfolio_type and investment_type and start_date_val:
+            portfolio_type = investor.portfolio_type
+            investment_type = investor.investment_type
+            start_date_obj = investor.start_date
+
+            if portfolio_type and investment_type and start_date_obj:
                 from .portfolio_service import PortfolioService
                 portfolio_service = PortfolioService()
-                
-                if isinstance(start_date_val, str):
-                    start_date_obj = datetime.fromisoformat(start_date_val.replace('Z', '+00:00'))
-                else:
-                    start_date_obj = start_date_val
-                    
+
                 expiry_date_obj = portfolio_service.get_investment_expiry_date(portfolio_type, investment_type, start_date_obj)
-                
+
                 if expiry_date_obj:
                      # Ensure both are timezone-aware or both naive for comparison
                     if new_next_due_date_obj.tzinfo is not None and expiry_date_obj.tzinfo is None:
@@ -275,30 +213,34 @@ class InterestCalculationService:
                      # If new next due date is past expiry, set to None
                     if new_next_due_date_obj > expiry_date_obj:
                         new_next_due_date_obj = None
-            
-            update_data = {
-                'last_due_date': new_last_due_date_obj.isoformat(),
-                'next_due_date': new_next_due_date_obj.isoformat() if new_next_due_date_obj else None,
-                'current_week': new_current_week,
+
+            return {
+                'last_due_date': new_last_due_date_obj.date().isoformat(),
+                'next_due_date': new_next_due_date_obj.date().isoformat() if new_next_due_date_obj else None,
+                'current_week': investor.current_week + 1,
                 'updated_at': datetime.now().isoformat()
             }
-            
-            # If finished
-            if new_next_due_date_obj is None:
-                # Removed investment_status update as column does not exist
-                pass
 
-            update_response = self.supabase.table('investors').update(update_data).eq('id', investor_id).execute()
-            update_data_result = getattr(update_response, 'data', [])
+        try:
+            advanced = investor_rows.update(investor_id, advance, columns=Investor.columns(
+                'next_due_date', 'current_week', 'portfolio_type', 'investment_type',
+                'investment_start_date', 'created_at'
+            ))
+            if advanced is None or not advanced.applied:
+                return False
 
-            return bool(update_data_result)
+            due_date_timer.schedule(investor_id, advanced.after.get('next_due_date'))
+            return True
 
         except Exception as e:
-            print(f"Error updating next_due_date for investor {investor_id}: {str(e)}")
+            logger.error(f"Error updating next_due_date for investor {investor_id}: {str(e)}")
             return False
 
-    def process_auto_withdrawal(self, investor_id: str) -> Dict[str, Any]:
-        """Process auto-withdrawal of interest to spending account on due date."""
+    def process_auto_withdrawal(self, investor_id: str, notify: bool = True) -> Dict[str, Any]:
+        """Process auto-withdrawal of interest to spending account on due date.
+
+        With notify=False the caller reports the payment itself (catch-up runs send one summed notification).
+        """
         try:
             # 0. IDEMPOTENCY CHECK
             # Check if we already paid interest today for this investor
@@ -343,59 +285,72 @@ class InterestCalculationService:
                     'message': 'No interest to withdraw'
                 }
             
-            # Add interest to spending account
-            update_result = self.update_spending_account(investor_id, interest_amount)
-            if not update_result['success']:
-                return update_result
-            
-            # Update investor's total_paid
-            investor_response = self.supabase.table('investors').select('total_paid, email, account_number, portfolio_type, investment_type').eq('id', investor_id).execute()
-            investor_data = getattr(investor_response, 'data', [])
-            
-            if investor_data:
-                investor = investor_data[0]
-                current_total_paid = float(investor.get('total_paid', 0) or 0)
-                new_total_paid = current_total_paid + interest_amount
-                
-                new_total_paid = current_total_paid + interest_amount
-                
-                # Update investor record with new total_paid AND increment payment_counter
-                new_counter = payment_counter + 1
-                
-                investor_update_data = {
-                    'total_paid': new_total_paid,
-                    'payment_counter': new_counter,
+            # Claim the installment before paying it: total_paid and payment_counter
+            # move together in one versioned update, and only while the counter is
+            # still the one read above, so concurrent runs pay it once.
+            def claim(row):
+                if int(row.get('payment_counter') or 0) != payment_counter:
+                    return None
+                return {
+                    'total_paid': float(row.get('total_paid') or 0) + interest_amount,
+                    'payment_counter': payment_counter + 1,
                     'updated_at': datetime.now().isoformat()
                 }
-                
-                self.supabase.table('investors').update(investor_update_data).eq('id', investor_id).execute()
-                
-                # Record transaction
-                import uuid
-                transaction_data = {
-                    'investor_id': investor_id,
-                    'amount': interest_amount,
-                    'transaction_type': 'interest_deposit',
-                    'transaction_id': f"INT-{uuid.uuid4().hex[:12].upper()}",
-                    'email': investor.get('email'),
-                    'account_number': investor.get('account_number'),
-                    'portfolio_type': investor.get('portfolio_type'),
-                    'investment_type': investor.get('investment_type'),
-                    'withdraw_status': 'completed',
-                    'created_at': datetime.now().isoformat()
-                }
-                
-                transaction_response = self.supabase.table('transactions').insert(transaction_data).execute()
-                transaction_data_result = getattr(transaction_response, 'data', [])
-                
+
+            claimed = investor_rows.update(
+                investor_id, claim,
+                columns='total_paid, payment_counter, email, account_number, portfolio_type, investment_type'
+            )
+            if claimed is None:
+                return {'success': False, 'error': 'Investor not found for update'}
+            if not claimed.applied:
                 return {
                     'success': True,
-                    'interest_deposited': interest_amount,
-                    'new_balance': update_result['new_balance'],
-                    'transaction_recorded': bool(transaction_data_result)
+                    'message': 'Installment already paid by another run',
+                    'paid': False
                 }
+            invalidate_payment_totals()
+
+            # Add interest to spending account
+            update_result = self.update_spending_account(investor_id, interest_amount)
+            if not update_result['success']:
+                self._release_installment(investor_id, payment_counter, interest_amount)
+                return update_result
+
+            investor = claimed.before
+
+            # Record transaction
+            import uuid
+            transaction_data = {
+                'investor_id': investor_id,
+                'amount': interest_amount,
+                'transaction_type': 'interest_deposit',
+                'transaction_id': f"INT-{uuid.uuid4().hex[:12].upper()}",
+                'email': investor.get('email'),
+                'account_number': investor.get('account_number'),
+                'portfolio_type': investor.get('portfolio_type'),
+                'investment_type': investor.get('investment_type'),
+                'withdraw_status': 'completed',
+                'created_at': datetime.now().isoformat()
+            }
+            
+            transaction_response = self.supabase.table('transactions').insert(transaction_data).execute()
+            transaction_data_result = getattr(transaction_response, 'data', [])
+
+            # Payouts run unattended, so queue the notification for the writer
+            if notify:
+                notification_writer.add_generated(
+                    NotificationService.generate_payment_day_notification(
+                        investor_id, interest_amount, update_result['new_balance']
+                    )
+                )
             
-            return {'success': False, 'error': 'Investor not found for update'}
+            return {
+                'success': True,
+                'interest_deposited': interest_amount,
+                'new_balance': update_result['new_balance'],
+                'transaction_recorded': bool(transaction_data_result)
+            }
             
         except Exception as e:
             return {
@@ -403,6 +358,26 @@ class InterestCalculationService:
                 'error': f'Error processing auto-withdrawal: {str(e)}'
             }
 
+    def _release_installment(self, investor_id: str, payment_counter: int, interest_amount: float) -> None:
+        """Undo a claimed installment whose payout failed, so the next run retries it."""
+        def release(row):
+            # Only while the counter still shows our claim
+            if int(row.get('payment_counter') or 0) != payment_counter + 1:
+                return None
+            return {
+                'total_paid': float(row.get('total_paid') or 0) - interest_amount,
+                'payment_counter': payment_counter,
+                'updated_at': datetime.now().isoformat()
+            }
+
+        try:
+            released = investor_rows.update(investor_id, release, columns='total_paid, payment_counter')
+            if released is None or not released.applied:
+                logger.error(f"Could not release installment {payment_counter + 1} of {investor_id}: counter moved on")
+            invalidate_payment_totals()
+        except Exception as e:
+            logger.error(f"Could not release installment {payment_counter + 1} of {investor_id}: {e}")
+
     def get_spending_account_balance(self, investor_id: str) -> Dict[str, Any]:
         """Get current spending account balance for an investor."""
         try:
@@ -410,8 +385,7 @@ class InterestCalculationService:
             if not account_result['success']:
                 return account_result
             
-            account = account_result['account']
-            balance = float(account.get('balance', 0))
+            balance = SpendingAccount.from_row(account_result['account']).balance
             
             return {
                 'success': True,
@@ -427,102 +401,65 @@ class InterestCalculationService:
     def process_user_withdrawal(self, investor_id: str, withdrawal_amount: float) -> Dict[str, Any]:
         """Process user withdrawal request from spending account."""
         try:
-            # Check spending account balance
-            balance_result = self.get_spending_account_balance(investor_id)
-            if not balance_result['success']:
-                return balance_result
-            
-            current_balance = balance_result['balance']
-            
-            if withdrawal_amount > current_balance:
-                return {
-                    'success': False,
-                    'error': 'Insufficient balance in spending account'
-                }
-            
-            # Deduct amount from spending account
-            account_result = self.get_investor_spending_account(investor_id)
-            if not account_result['success']:
-                return account_result
-            
-            account = account_result['account']
-            new_balance = current_balance - withdrawal_amount
-            current_total_withdrawn = float(account.get('total_withdrawn', 0))
-            new_total_withdrawn = current_total_withdrawn + withdrawal_amount
-            
-            # Update spending account
-            update_data = {
-                'balance': new_balance,
-                'total_withdrawn': new_total_withdrawn,
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            update_response = self.supabase.table('spending_accounts').update(update_data).eq('id', account['id']).execute()
-            update_data_result = getattr(update_response, 'data', [])
-            
-            if not update_data_result:
-                return {
-                    'success': False,
-                    'error': 'Failed to update spending account'
-                }
-            
-            # Record withdrawal transaction (avoid inserting fields not present in schema)
-            # Build a minimal transaction record that matches the transactions table schema.
             import uuid
 
             # Attach investor details (email/account_number) so Postgres doesn't reject NOT NULL constraints
             investor_resp = self.supabase.table('investors').select('email, account_number, portfolio_type, investment_type').eq('id', investor_id).execute()
             investor_data = getattr(investor_resp, 'data', [])
+            if not investor_data:
+                return {
+                    'success': False,
+                    'error': 'Investor not found'
+                }
+            inv = investor_data[0]
 
-            investor_email = None
-            investor_account_number = None
-            portfolio_type = None
-            investment_type = None
-
-            if investor_data and len(investor_data) > 0:
-                inv = investor_data[0]
-                investor_email = inv.get('email')
-                investor_account_number = inv.get('account_number')
-                portfolio_type = inv.get('portfolio_type')
-                investment_type = inv.get('investment_type')
-
-                transaction_record = {
-                    'investor_id': investor_id,
-                    'email': investor_email,
-                    'account_number': investor_account_number,
-                    'portfolio_type': portfolio_type,
-                    'investment_type': investment_type,
-                    'amount': withdrawal_amount,
-                    'transaction_type': 'withdrawal',  # Use the canonical 'withdrawal' type
-                    'withdrawal_requested': True,      # Indicate that this is a withdrawal request
-                    'withdraw_status': 'pending',
-                    'withdrawal_amount': str(withdrawal_amount),
-                    'withdrawal_timestamp': datetime.now().isoformat(),
-                    'transaction_id': f"USRWD-{uuid.uuid4().hex[:12].upper()}"
+            # Balance check and deduction happen in one UPDATE; None means the balance was too low
+            account = spending_accounts.debit(investor_id, withdrawal_amount)
+            if account is None:
+                return {
+                    'success': False,
+                    'error': 'Insufficient balance in spending account'
                 }
+            new_balance = SpendingAccount.from_row(account).balance
 
-            transaction_response = self.supabase.table('transactions').insert(transaction_record).execute()
-            transaction_data_result = getattr(transaction_response, 'data', [])
+            # Record withdrawal transaction (avoid inserting fields not present in schema)
+            transaction_record = {
+                'investor_id': investor_id,
+                'email': inv.get('email'),
+                'account_number': inv.get('account_number'),
+                'portfolio_type': inv.get('portfolio_type'),
+                'investment_type': inv.get('investment_type'),
+                'amount': withdrawal_amount,
+                'transaction_type': 'withdrawal',  # Use the canonical 'withdrawal' type
+                'withdrawal_requested': True,      # Indicate that this is a withdrawal request
+                'withdraw_status': 'pending',
+                'withdrawal_amount': str(withdrawal_amount),
+                'withdrawal_timestamp': datetime.now().isoformat(),
+                'transaction_id': f"USRWD-{uuid.uuid4().hex[:12].upper()}"
+            }
 
-            # If inserting a transaction record failed, attempt to roll back the spending account update
+            try:
+                transaction_response = self.supabase.table('transactions').insert(transaction_record).execute()
+                transaction_data_result = getattr(transaction_response, 'data', [])
+                insert_error = getattr(transaction_response, 'error', None) or 'unknown error'
+            except Exception as e:
+                transaction_data_result = []
+                insert_error = str(e)
+
+            # If inserting a transaction record failed, give the amount back to the spending account
             if not transaction_data_result:
                 try:
-                    revert_data = {
-                        'balance': current_balance,
-                        'total_withdrawn': current_total_withdrawn,
-                        'updated_at': datetime.now().isoformat()
-                    }
-                    self.supabase.table('spending_accounts').update(revert_data).eq('id', account['id']).execute()
+                    spending_accounts.adjust(investor_id, withdrawal_amount, withdrawn=-withdrawal_amount)
                 except Exception as rollback_error:
-                    # Log the rollback failure and return a descriptive error
+                    logger.error(f"Failed to restore {withdrawal_amount} to spending account of {investor_id}: {rollback_error}")
                     return {
                         'success': False,
-                        'error': f'Failed to record withdrawal transaction: {getattr(transaction_response, "error", "unknown error")} and failed to rollback spending account update: {str(rollback_error)}'
+                        'error': f'Failed to record withdrawal transaction: {insert_error} and failed to rollback spending account update: {str(rollback_error)}'
                     }
 
                 return {
                     'success': False,
-                    'error': f'Failed to record withdrawal transaction: {getattr(transaction_response, "error", "unknown error")}'
+                    'error': f'Failed to record withdrawal transaction: {insert_error}'
                 }
 
             return {
@@ -548,7 +485,10 @@ class InterestCalculationService:
         try:
             # Get investor data
             investor_response = self.supabase.table('investors')\
-                .select('last_due_date, next_due_date, investment_start_date, created_at, current_week, investment_expiry_date, portfolio_type, investment_type')\
+                .select(Investor.columns(
+                    'last_due_date', 'next_due_date', 'investment_start_date', 'created_at', 'current_week',
+                    'investment_expiry_date', 'portfolio_type', 'investment_type', 'investment_ended'
+                ))\
                 .eq('id', investor_id)\
                 .execute()
             
@@ -557,25 +497,19 @@ class InterestCalculationService:
                 return {'success': False, 'error': 'Investor not found'}
                 
             investor = investor_data[0]
+            row = Investor.from_row(investor)
             
-            last_due_date = investor.get('last_due_date')
-            next_due_date = investor.get('next_due_date')
-            investment_start_date = investor.get('investment_start_date') or investor.get('created_at')
-            current_week = int(investor.get('current_week', 0))
-            investment_expiry_date = investor.get('investment_expiry_date')
-            investment_type = investor.get('investment_type')
-            portfolio_type = investor.get('portfolio_type')
-            
-            # If no investment type, we can't calculate dates
-            if not investment_type:
+            current_week = row.current_week
+            investment_type = row.investment_type
+            portfolio_type = row.portfolio_type
+            
+            # If no investment type, we can't calculate dates; an ended
+            # investment keeps next_due_date NULL so it is never scheduled again
+            if not investment_type or row.investment_ended:
                 return {'success': True, 'data': investor}
 
-            # Parse start date
-            if isinstance(investment_start_date, str):
-                start_date = datetime.fromisoformat(investment_start_date.replace('Z', '+00:00'))
-            elif isinstance(investment_start_date, datetime):
-                start_date = investment_start_date
-            else:
+            start_date = row.start_date
+            if start_date is None:
                 # Fallback if no start date
                 return {'success': True, 'data': investor}
 
@@ -583,24 +517,17 @@ class InterestCalculationService:
             dates_updated = False
 
             # 1. Initialize if missing
-            if not last_due_date and not next_due_date:
+            if not row.last_due_date and not row.next_due_date:
                 # Week 0 case: last_due_date is the start date
                 last_due_date_obj = start_date
                 next_due_date_obj = start_date + timedelta(days=7)
                 current_week = 0
                 dates_updated = True
             else:
-                # Parse existing dates
-                if isinstance(last_due_date, str):
-                    last_due_date_obj = datetime.fromisoformat(last_due_date.replace('Z', '+00:00'))
-                else:
-                    last_due_date_obj = last_due_date
+                last_due_date_obj = row.last_due_date
                     
-                if next_due_date:
-                    if isinstance(next_due_date, str):
-                        next_due_date_obj = datetime.fromisoformat(next_due_date.replace('Z', '+00:00'))
-                    else:
-                        next_due_date_obj = next_due_date
+                if row.next_due_date:
+                    next_due_date_obj = row.next_due_date
                 else:
                     # If next_due_date is None, it might be completed or just missing
                     # If completed, we shouldn't be here usually, but let's check expiry
@@ -652,14 +579,16 @@ class InterestCalculationService:
 
             # 4. Persist if changed
             if dates_updated:
+                # Both are `date` columns; a time of day would not survive the round trip
                 update_data = {
-                    'last_due_date': last_due_date_obj.isoformat(),
-                    'next_due_date': next_due_date_obj.isoformat() if next_due_date_obj else None,
+                    'last_due_date': last_due_date_obj.date().isoformat(),
+                    'next_due_date': next_due_date_obj.date().isoformat() if next_due_date_obj else None,
                     'current_week': current_week,
                     'updated_at': datetime.now().isoformat()
                 }
                 
                 self.supabase.table('investors').update(update_data).eq('id', investor_id).execute()
+                due_date_timer.schedule(investor_id, update_data['next_due_date'])
                 
                 # Update local object to return
                 investor['last_due_date'] = update_data['last_due_date']
@@ -669,7 +598,7 @@ class InterestCalculationService:
             return {'success': True, 'data': investor}
 
         except Exception as e:
-            print(f"Error ensuring due dates up to date: {e}")
+            logger.error(f"Error ensuring due dates up to date: {e}")
             return {'success': False, 'error': str(e)}
 
     def process_investor_due_date_check(self, investor_id: str) -> Dict[str, Any]:
@@ -690,70 +619,148 @@ class InterestCalculationService:
                 return {'success': True, 'message': 'No upcoming due date'}
 
             # 2. Check if due today
-            if isinstance(next_due_date, str):
-                due_date = datetime.fromisoformat(next_due_date.replace('Z', '+00:00')).date()
-            else:
-                due_date = next_due_date.date() if isinstance(next_due_date, datetime) else next_due_date
+            due_date = parse_datetime(next_due_date).date()
             
             today = date.today()
             
             if due_date == today:
                 # Process payment
                 result = self.process_auto_withdrawal(investor_id)
-                if result['success']:
-                    # Update to next week
-                    self._update_next_due_date(investor_id)
-                    return {'success': True, 'message': 'Interest paid', 'paid': True}
-                else:
+                if not result['success']:
                     return {'success': False, 'error': result.get('error')}
+                if not result.get('transaction_recorded'):
+                    # Another run paid it (or it was already paid today) and moves the due date itself
+                    return {'success': True, 'message': result.get('message', 'Interest not paid'), 'paid': False}
+
+                # Update to next week
+                self._update_next_due_date(investor_id, parse_datetime(next_due_date))
+                return {'success': True, 'message': 'Interest paid', 'paid': True}
             
             return {'success': True, 'message': 'Not due today', 'paid': False}
 
         except Exception as e:
             return {'success': False, 'error': f"Error in due date check: {str(e)}"}
 
+    DUE_PAGE_SIZE = 500
+
+    def _iter_investor_ids(self, apply_filter, sort_column: Optional[str] = None) -> Any:
+        """Yield investor ids matching `apply_filter(query)`; see _iter_investor_rows."""
+        for row in self._iter_investor_rows(apply_filter, sort_column):
+            yield row['id']
+
+    def _iter_investor_rows(self, apply_filter, sort_column: Optional[str] = None) -> Any:
+        """
+        Yield investor rows (id and sort column) matching `apply_filter(query)`,
+        one keyset page at a time.
+
+        Pages are ordered by (sort_column, id) so they follow the index that
+        serves the filter; without a sort column they are ordered by id.
+        """
+        columns = f'id, {sort_column}' if sort_column else 'id'
+        last = None
+        while True:
+            query = apply_filter(self.supabase.table('investors').select(columns))
+            if last and sort_column:
+                query = query.or_(ascending_keyset_filter(sort_column, last[sort_column], 'id', last['id']))
+            elif last:
+                query = query.gt('id', last['id'])
+            if sort_column:
+                query = query.order(sort_column)
+            response = query.order('id').limit(self.DUE_PAGE_SIZE).execute()
+            rows = getattr(response, 'data', []) or []
+            yield from rows
+            if len(rows) < self.DUE_PAGE_SIZE:
+                return
+            last = rows[-1]
+
+    def _process_investor_ids(self, investor_ids, check) -> Dict[str, Any]:
+        processed_count = 0
+        checked_count = 0
+        errors = []
+
+        for investor_id in investor_ids:
+            checked_count += 1
+            try:
+                result = check(investor_id)
+                if result['success']:
+                    if result.get('paid'):
+                        processed_count += 1
+                else:
+                    errors.append(f"Investor {investor_id}: {result.get('error')}")
+            except Exception as e:
+                errors.append(f"Investor {investor_id}: {str(e)}")
+
+        return {
+            'success': True,
+            'checked_count': checked_count,
+            'processed_count': processed_count,
+            'errors': errors
+        }
+
     def check_and_process_all_due_dates(self) -> Dict[str, Any]:
         """
-        Iterate over all active investors and process their due dates.
+        Process every investor whose next due date is today or earlier.
         This is the main entry point for the cron job.
+
+        Only due rows are read (served by idx_investors_next_due_active), so the
+        cost scales with the number of investors due rather than the table
+        size. Overdue rows are included so ensure_due_dates_up_to_date can roll
+        them forward; investors with no schedule yet are handled by
+        sync_unscheduled_investors. Processed rows move past today and drop
+        out of the range, so keyset paging never revisits them.
         """
         try:
-            # Get all active investors (not completed)
-            # We can filter by status if needed, but checking all is safer to catch up
-            # Removing filter on 'investment_status' as it doesn't exist.
-            # We can filter by 'status' != 'completed' if 'status' is the column.
-            # But let's just fetch all for now to be safe and avoid column errors.
-            response = self.supabase.table('investors').select('id').execute()
-            investors = getattr(response, 'data', [])
-            
-            processed_count = 0
-            errors = []
-            
-            for investor in investors:
-                try:
-                    result = self.process_investor_due_date_check(investor['id'])
-                    if result['success']:
-                        if result.get('paid'):
-                            processed_count += 1
-                    else:
-                        errors.append(f"Investor {investor['id']}: {result.get('error')}")
-                except Exception as e:
-                    errors.append(f"Investor {investor['id']}: {str(e)}")
-            
-            return {
-                'success': True,
-                'processed_count': processed_count,
-                'errors': errors
-            }
+            today = date.today().isoformat()
+            result = self._process_investor_ids(
+                self._iter_investor_ids(lambda query: query.lte('next_due_date', today), 'next_due_date'),
+                self.process_investor_due_date_check
+            )
+            notification_writer.flush()
+            return result
             
         except Exception as e:
             return {
                 'success': False,
                 'error': f"Error in batch processing: {str(e)}"
             }
+
+    def load_upcoming_due_dates(self, horizon_days: int) -> List[Tuple[str, Any]]:
+        """
+        Return (investor_id, next_due_date) for every investor due within
+        `horizon_days`, including overdue ones. Used to fill the due-date timer.
+        """
+        until = (date.today() + timedelta(days=horizon_days)).isoformat()
+        return [
+            (row['id'], row['next_due_date'])
+            for row in self._iter_investor_rows(lambda query: query.lte('next_due_date', until), 'next_due_date')
+        ]
+
+    def process_due_investors(self, investor_ids: List[str]) -> Dict[str, Any]:
+        """Run the due-date check for investors the due-date timer reports as due."""
+        result = self._process_investor_ids(investor_ids, self.process_investor_due_date_check)
+        notification_writer.flush()
+        return result
+
+    def sync_unscheduled_investors(self) -> Dict[str, Any]:
+        """
+        Initialise due dates for investors that have an investment type but no
+        schedule yet, so the due-date job can see them. Runs less often than
+        the hourly job.
+        """
+        try:
+            return self._process_investor_ids(
+                self._iter_investor_ids(
+                    lambda query: query.is_('next_due_date', 'null')
+                    .is_('last_due_date', 'null')
+                    .not_.is_('investment_type', 'null')
+                ),
+                self.ensure_due_dates_up_to_date
+            )
+
+        except Exception as e:
             return {
                 'success': False,
-                'error': f"Error in batch processing: {str(e)}"
+                'error': f"Error syncing unscheduled investors: {str(e)}"
             }
 
     def admin_catch_up_missed_payments(self, investor_id: str) -> Dict[str, Any]:
@@ -773,6 +780,9 @@ class InterestCalculationService:
                 return {'success': True, 'message': 'No missed payments to catch up', 'processed_count': 0}
             
             processed_count = 0
+            paid_count = 0
+            paid_total = 0.0
+            new_balance = None
             errors = []
             
             # 2. Loop and pay
@@ -780,8 +790,12 @@ class InterestCalculationService:
             for _ in range(missed_count):
                 # We call process_auto_withdrawal which now checks the counter
                 # It will pay one installment and increment counter
-                result = self.process_auto_withdrawal(investor_id)
+                result = self.process_auto_withdrawal(investor_id, notify=False)
                 
+                if result['success'] and result.get('interest_deposited'):
+                    paid_count += 1
+                    paid_total += result['interest_deposited']
+                    new_balance = result['new_balance']
                 if result['success'] and result.get('transaction_recorded'):
                     processed_count += 1
                 elif result['success'] and not result.get('paid'):
@@ -792,8 +806,17 @@ class InterestCalculationService:
                     errors.append(result.get('error', 'Unknown error'))
                     break # Stop on error
             
+            # One notification for the whole catch-up, with the summed amount
+            if paid_count:
+                notification_writer.add_generated(
+                    NotificationService.generate_payment_day_notification(
+                        investor_id, paid_total, new_balance, installments=paid_count
+                    )
+                )
+
             # 3. Update due dates to reflect current reality
             self.ensure_due_dates_up_to_date(investor_id)
+            notification_writer.flush()
             
             return {
                 'success': True,
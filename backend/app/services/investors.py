@@ -7,6 +7,7 @@
 # - Inserts records into Supabase
 #
 # It is imported by routes/investors.py, which exposes API endpoints.
+import logging
 from typing import Optional, Dict, Any
 from datetime import date
 import re
@@ -14,6 +15,11 @@ import re
 from ..core.config import settings
 from .transaction_service import TransactionService
 from .notification_service import NotificationService
+from .id_allocator import account_number_allocator
+from ..core.due_date_timer import due_date_timer
+from .payment_totals import invalidate_payment_totals
+
+logger = logging.getLogger(__name__)
 
 try:
     from supabase import create_client
@@ -55,9 +61,15 @@ class InvestorService:
         return bool(re.match(r"^[0-9+\-\s()]{7,30}$", phone))
 
     def _generate_account_number(self) -> str:
-        # Simple INV-prefixed unique account number. Ensure DB uniqueness on insert.
-        import random
-        return f"INV{random.randint(10**7, 10**9)}"
+        # Allocated from the id_blocks counter, so it is unique without probing.
+        # Falls back to the legacy random INV number if the counter is
+        # unavailable (e.g. migration not applied); the insert retry covers that case.
+        try:
+            return account_number_allocator.next_id()
+        except Exception as e:
+            logger.warning(f"Account number allocation failed, using random fallback: {e}")
+            import random
+            return f"INV{random.randint(10**7, 10**9)}"
 
     def _hash_pin(self, pin: str) -> str:
         # Ensure pin is a string and truncate to 72 bytes to comply with bcrypt limit
@@ -222,7 +234,7 @@ class InvestorService:
                 transaction_result = transaction_service.record_initial_transaction(investor_record)
                 if not transaction_result['success']:
                     # Log the error but don't fail the investor creation
-                    print(f"Warning: Failed to record initial transaction: {transaction_result['error']}")
+                    logger.warning(f"Failed to record initial transaction: {transaction_result['error']}")
 
                 result = {'success': True, 'data': investor_record}
                 # Generate account creation notification
@@ -238,7 +250,7 @@ class InvestorService:
                 transaction_result = transaction_service.record_initial_transaction(investor_record)
                 if not transaction_result['success']:
                     # Log the error but don't fail the investor creation
-                    print(f"Warning: Failed to record initial transaction: {transaction_result['error']}")
+                    logger.warning(f"Failed to record initial transaction: {transaction_result['error']}")
 
                 result = {'success': True, 'data': investor_record}
                 # Generate account creation notification
@@ -312,6 +324,9 @@ class InvestorService:
             if update_error:
                 return {'success': False, 'error': f'Failed to update investor: {update_error}'}
 
+            due_date_timer.schedule(investor_id, update_data['next_due_date'])
+            invalidate_payment_totals()
+
             return {'success': True, 'data': update_data_result[0] if isinstance(update_data_result, list) and update_data_result else update_data_result}
 
         except Exception as e:
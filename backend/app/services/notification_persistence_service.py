@@ -42,23 +42,9 @@ class NotificationPersistenceService:
             Dict containing the created notification data
         """
         try:
-            now = datetime.utcnow()
-            notification_id = f"{event_type}_{uuid.uuid4().hex[:8]}_{int(now.timestamp())}"
-            
-            notification_data = {
-                'id': notification_id,
-                'investor_id': investor_id,
-                'title': title,
-                'message': message,
-                'type': notification_type,
-                'event_type': event_type,
-                'timestamp': now.isoformat(),
-                'expires_at': (now + timedelta(days=30)).isoformat(),
-                'read': False
-            }
-            
-            if metadata:
-                notification_data['metadata'] = metadata
+            notification_data = self.build_notification_row(
+                investor_id, title, message, notification_type, event_type, metadata
+            )
             
             # Insert into database
             response = self.supabase.table('notifications').insert(notification_data).execute()
@@ -81,6 +67,57 @@ class NotificationPersistenceService:
                 'error': f'Error creating notification: {str(e)}'
             }
     
+    @staticmethod
+    def build_notification_row(investor_id: str, title: str, message: str,
+                               notification_type: str, event_type: str,
+                               metadata: Optional[Dict[Any, Any]] = None) -> Dict[str, Any]:
+        """Build a `notifications` row ready for insert."""
+        now = datetime.utcnow()
+        notification_id = f"{event_type}_{uuid.uuid4().hex[:8]}_{int(now.timestamp())}"
+
+        notification_data = {
+            'id': notification_id,
+            'investor_id': investor_id,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'event_type': event_type,
+            'timestamp': now.isoformat(),
+            'expires_at': (now + timedelta(days=30)).isoformat(),
+            'read': False
+        }
+
+        if metadata:
+            notification_data['metadata'] = metadata
+
+        return notification_data
+
+    def create_notifications_bulk(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Insert several prepared notification rows with a single multi-row insert.
+        
+        Args:
+            rows: Rows built with build_notification_row
+            
+        Returns:
+            Dict containing the number of rows written
+        """
+        if not rows:
+            return {'success': True, 'written': 0}
+
+        try:
+            response = self.supabase.table('notifications').insert(rows).execute()
+            data = getattr(response, 'data', [])
+            return {
+                'success': True,
+                'written': len(data) if data else 0
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error creating notifications: {str(e)}'
+            }
+
     def get_notifications(self, investor_id: str, limit: int = 50, 
                          since: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -241,20 +278,23 @@ class NotificationPersistenceService:
     def cleanup_expired_notifications(self) -> Dict[str, Any]:
         """
         Clean up expired notifications from the database.
+
+        Deletes in bounded chunks through the retention service; anything left
+        over is picked up by the scheduled retention job.
         
         Returns:
             Dict containing cleanup results
         """
         try:
-            now = datetime.utcnow().isoformat()
-            response = self.supabase.table('notifications').delete()\
-                .lt('expires_at', now).execute()
-            
-            deleted_count = len(getattr(response, 'data', []))
-            
+            from .retention_service import RetentionService, RetentionPolicy
+            result = RetentionService(policies=[RetentionPolicy('notifications')]).run()
+            table_result = result['tables']['notifications']
+            if not table_result['success']:
+                return {'success': False, 'error': table_result['error']}
+
             return {
                 'success': True,
-                'message': f'Deleted {deleted_count} expired notifications'
+                'message': f"Deleted {table_result['deleted']} expired notifications"
             }
                 
         except Exception as e:
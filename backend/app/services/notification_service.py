@@ -299,11 +299,17 @@ class NotificationService:
         )
 
     @staticmethod
-    def generate_payment_day_notification(investor_id: str, amount_received: float, total_balance: float, currency: str = 'NGN') -> dict:
-        """Generate notification on the day of interest payment."""
+    def generate_payment_day_notification(investor_id: str, amount_received: float, total_balance: float,
+                                          currency: str = 'NGN', installments: int = 1) -> dict:
+        """Generate notification on the day of interest payment.
+
+        `amount_received` is the total of `installments` weekly payments made together (catch-up runs).
+        """
         currency_symbol = 'N' if currency == 'NGN' else currency
         formatted_amount = f"{currency_symbol}{amount_received:,.2f}"
         formatted_balance = f"{currency_symbol}{total_balance:,.2f}"
+        if installments > 1:
+            formatted_amount = f"{formatted_amount} ({installments} weekly interest payments)"
 
         return NotificationService.create_notification(
             investor_id=investor_id,
@@ -311,5 +317,6 @@ class NotificationService:
             message=f"Congratulations! {formatted_amount} has been added to your spending account. Your new balance is {formatted_balance}.",
             notification_type="success",
             event_type="payment_day_notification",
-            metadata={'amount_received': amount_received, 'total_balance': total_balance, 'currency': currency}
+            metadata={'amount_received': amount_received, 'total_balance': total_balance, 'currency': currency,
+                      'installments': installments}
         )
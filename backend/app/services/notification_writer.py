@@ -0,0 +1,214 @@
+"""
+Buffered notification writer.
+
+Collects notifications in memory and writes them to the `notifications` table
+as multi-row inserts once the buffer reaches NOTIFICATION_BATCH_SIZE rows or
+the oldest row has waited NOTIFICATION_FLUSH_INTERVAL_SECONDS. Batch jobs such
+as the interest payout run call `flush()` when they finish; the app flushes on
+shutdown and an atexit hook covers standalone scripts.
+
+Notifications added with `coalesce=True` replace an earlier buffered
+notification of the same event type for the same investor, as long as it was
+added within NOTIFICATION_COALESCE_WINDOW_SECONDS. Only the latest content is
+kept, so this suits status-style events, not ones that carry an amount:
+callers that pay several times in a row send one summed notification instead.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from ..core.config import settings
+from .notification_persistence_service import NotificationPersistenceService
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedNotificationWriter:
+    """Thread-safe buffer that persists notifications in batches."""
+
+    # Rows kept across failed flushes before the oldest are dropped.
+    MAX_BUFFERED_MULTIPLIER = 10
+
+    def __init__(self, persistence: Optional[NotificationPersistenceService] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval_seconds: Optional[float] = None,
+                 coalesce_window_seconds: Optional[float] = None):
+        self._persistence = persistence
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+        self.flush_interval_seconds = flush_interval_seconds or settings.NOTIFICATION_FLUSH_INTERVAL_SECONDS
+        self.coalesce_window_seconds = (
+            coalesce_window_seconds if coalesce_window_seconds is not None
+            else settings.NOTIFICATION_COALESCE_WINDOW_SECONDS
+        )
+
+        self._rows: List[Dict[str, Any]] = []
+        self._first_added_at: Optional[float] = None
+        # (investor_id, event_type) -> (row, added_at, count)
+        self._coalesce_index: Dict[Tuple[str, str], Tuple[Dict[str, Any], float, int]] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'added': 0, 'coalesced': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0, 'dropped': 0}
+
+    @property
+    def persistence(self) -> NotificationPersistenceService:
+        if self._persistence is None:
+            self._persistence = NotificationPersistenceService()
+        return self._persistence
+
+    def add(self, investor_id: str, title: str, message: str, notification_type: str,
+            event_type: str, metadata: Optional[Dict[Any, Any]] = None,
+            coalesce: bool = False) -> Dict[str, Any]:
+        """
+        Buffer a notification for writing.
+
+        Args:
+            investor_id: The investor ID the notification belongs to
+            title: Short notification title
+            message: Longer descriptive message
+            notification_type: 'success', 'warning', 'error', 'info'
+            event_type: Specific event identifier
+            metadata: Optional additional data for the event
+            coalesce: Replace a recent buffered notification of the same event type
+
+        Returns:
+            The buffered row
+        """
+        row = NotificationPersistenceService.build_notification_row(
+            investor_id, title, message, notification_type, event_type, metadata
+        )
+        now = time.monotonic()
+        flush_now = False
+
+        with self._lock:
+            self.stats['added'] += 1
+            key = (investor_id, event_type)
+            existing = self._coalesce_index.get(key) if coalesce else None
+
+            if existing and now - existing[1] <= self.coalesce_window_seconds:
+                previous_row, added_at, count = existing
+                # Keep the original id/position; take the latest content.
+                for field in ('title', 'message', 'type', 'timestamp', 'expires_at'):
+                    previous_row[field] = row[field]
+                previous_row['metadata'] = {**(row.get('metadata') or {}), 'coalesced_count': count + 1}
+                self._coalesce_index[key] = (previous_row, added_at, count + 1)
+                self.stats['coalesced'] += 1
+                return previous_row
+
+            self._rows.append(row)
+            if coalesce:
+                self._coalesce_index[key] = (row, now, 1)
+            if self._first_added_at is None:
+                self._first_added_at = now
+            flush_now = len(self._rows) >= self.batch_size
+
+        self.start()
+        if flush_now:
+            self._wakeup.set()
+        return row
+
+    def add_generated(self, notification: Dict[str, Any], coalesce: bool = False) -> Dict[str, Any]:
+        """Buffer a notification produced by NotificationService (camelCase keys)."""
+        return self.add(
+            investor_id=notification['investorId'],
+            title=notification['title'],
+            message=notification['message'],
+            notification_type=notification['type'],
+            event_type=notification['eventType'],
+            metadata=notification.get('metadata'),
+            coalesce=coalesce
+        )
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> Dict[str, Any]:
+        """Write everything buffered so far. Safe to call from any thread."""
+        with self._flush_lock:
+            total_written = 0
+            while True:
+                with self._lock:
+                    if not self._rows:
+                        self._first_added_at = None
+                        return {'success': True, 'written': total_written}
+                    batch = self._rows[:self.batch_size]
+                    self._rows = self._rows[self.batch_size:]
+                    self._first_added_at = time.monotonic() if self._rows else None
+                    # Rows leaving the buffer can no longer absorb duplicates.
+                    batch_ids = {id(r) for r in batch}
+                    self._coalesce_index = {
+                        k: v for k, v in self._coalesce_index.items() if id(v[0]) not in batch_ids
+                    }
+
+                result = self.persistence.create_notifications_bulk(batch)
+                self.stats['flushes'] += 1
+
+                if not result['success']:
+                    self.stats['failed_flushes'] += 1
+                    logger.error(f"Failed to flush {len(batch)} notifications: {result.get('error')}")
+                    self._requeue(batch)
+                    return {'success': False, 'written': total_written, 'error': result.get('error')}
+
+                total_written += len(batch)
+                self.stats['written'] += len(batch)
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._rows = batch + self._rows
+            if self._first_added_at is None:
+                self._first_added_at = time.monotonic()
+            limit = self.batch_size * self.MAX_BUFFERED_MULTIPLIER
+            if len(self._rows) > limit:
+                dropped = len(self._rows) - limit
+                self._rows = self._rows[dropped:]
+                self.stats['dropped'] += dropped
+                logger.error(f"Notification buffer full; dropped {dropped} oldest notifications")
+
+    def start(self) -> None:
+        """Start the background flusher if it isn't running."""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='notification-writer', daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the background flusher and write anything still buffered."""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.pending_count():
+            self.flush()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                return
+            with self._lock:
+                due = bool(self._rows) and (
+                    len(self._rows) >= self.batch_size
+                    or time.monotonic() - (self._first_added_at or 0) >= self.flush_interval_seconds
+                )
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Notification writer flush error: {str(e)}")
+
+
+# Shared writer; flushed on app shutdown and at interpreter exit.
+notification_writer = BufferedNotificationWriter()
+atexit.register(notification_writer.close)
@@ -0,0 +1,22 @@
+"""
+Cache for the admin payments headline totals.
+
+The totals come from the admin_payments_totals RPC (see
+sql/create_payment_summary_views.sql). They are cached for a short TTL and
+dropped by any code path that changes an investor's invested, paid or
+payment status columns.
+"""
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.metrics import register_cache
+
+TOTALS_KEY = ('payments', 'totals')
+
+payment_totals_cache = TTLCache(ttl_seconds=settings.PAYMENT_TOTALS_CACHE_TTL_SECONDS, max_entries=8)
+register_cache('payment_totals', payment_totals_cache)
+
+
+def invalidate_payment_totals() -> None:
+    """Drop the cached totals after a payment, payout, top-up or new investment."""
+    payment_totals_cache.invalidate(TOTALS_KEY)
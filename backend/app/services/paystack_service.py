@@ -1,6 +1,7 @@
-from pypaystack2 import PaystackClient
-from typing import Optional, Dict, Any
+from functools import cached_property
+from typing import Optional, Dict, Any, List
 from ..core.config import settings
+from ..core.metrics import external_call
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,11 +12,30 @@ class PaystackService:
         if not settings.PAYSTACK_SECRET_KEY:
             raise ValueError("PAYSTACK_SECRET_KEY is not set in environment variables. Please check your .env file.")
 
+    # pypaystack2 builds its pydantic models on import, which takes about half
+    # a second, so the client is created on the first Paystack call.
+    @cached_property
+    def client(self):
+        from pypaystack2 import PaystackClient
         # Use the package's main client. Sub-clients are available as attributes
         # e.g. client.transactions, client.customers
-        self.client = PaystackClient(secret_key=settings.PAYSTACK_SECRET_KEY)
-        self.transactions = self.client.transactions
-        self.customers = self.client.customers
+        return PaystackClient(secret_key=settings.PAYSTACK_SECRET_KEY)
+
+    @cached_property
+    def transactions(self):
+        return self.client.transactions
+
+    @cached_property
+    def customers(self):
+        return self.client.customers
+
+    @cached_property
+    def transfers(self):
+        return self.client.transfers
+
+    @cached_property
+    def transfer_recipients(self):
+        return self.client.transfer_recipients
 
     def _normalize_response(self, resp: Any) -> Dict[str, Any]:
         """Normalize pypaystack2 Response objects or dicts into a simple dict.
@@ -64,13 +84,14 @@ class PaystackService:
         """
         try:
             logger.info("Initializing Paystack transaction for email: %s, amount: %d kobo", email, amount)
-            response = self.transactions.initialize(
-                email=email,
-                amount=amount,
-                metadata=metadata,
-                callback_url=callback_url,
-                reference=reference
-            )
+            with external_call('paystack', 'transaction_initialize'):
+                response = self.transactions.initialize(
+                    email=email,
+                    amount=amount,
+                    metadata=metadata,
+                    callback_url=callback_url,
+                    reference=reference
+                )
             norm = self._normalize_response(response)
 
             if norm.get('status'):
@@ -103,7 +124,8 @@ class PaystackService:
             reference: Transaction reference to verify
         """
         try:
-            response = self.transactions.verify(reference=reference)
+            with external_call('paystack', 'transaction_verify'):
+                response = self.transactions.verify(reference=reference)
             norm = self._normalize_response(response)
 
             if norm.get('status'):
@@ -138,12 +160,13 @@ class PaystackService:
         Create a Paystack customer
         """
         try:
-            response = self.customers.create(
-                email=email,
-                first_name=first_name,
-                last_name=last_name,
-                phone=phone
-            )
+            with external_call('paystack', 'customer_create'):
+                response = self.customers.create(
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone=phone
+                )
             norm = self._normalize_response(response)
 
             if norm.get('status'):
@@ -162,7 +185,8 @@ class PaystackService:
         List all transactions
         """
         try:
-            response = self.transactions.list(page=page, perPage=per_page)
+            with external_call('paystack', 'transaction_list'):
+                response = self.transactions.list(page=page, perPage=per_page)
             norm = self._normalize_response(response)
 
             if norm.get('status'):
@@ -176,5 +200,100 @@ class PaystackService:
                 "message": f"Error retrieving transactions: {str(e)}"
             }
 
+    def list_banks(self) -> Dict[str, Any]:
+        """
+        List Nigerian banks that support transfers, following Paystack's cursor pages
+
+        Returns data as a list of {"name", "code"} dicts.
+        """
+        from pypaystack2.enums import Country
+        try:
+            banks, cursor = [], None
+            while True:
+                with external_call('paystack', 'bank_list'):
+                    response = self.client.miscellaneous.get_banks(
+                        country=Country.NIGERIA, use_cursor=True, next_=cursor, pagination=100
+                    )
+                raw = getattr(response, 'raw', None) or {}
+                if not raw.get('status'):
+                    return {"status": False, "message": raw.get('message', 'Failed to list banks')}
+                banks.extend(
+                    {"name": bank.get('name'), "code": bank.get('code')}
+                    for bank in raw.get('data') or [] if bank.get('supports_transfer', True)
+                )
+                cursor = (raw.get('meta') or {}).get('next')
+                if not cursor:
+                    return {"status": True, "message": raw.get('message'), "data": banks}
+        except Exception as e:
+            logger.exception("Error listing banks: %s", str(e))
+            return {"status": False, "message": f"Error listing banks: {str(e)}"}
+
+    def create_transfer_recipients(self, recipients: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create NUBAN transfer recipients in one request
+
+        Args:
+            recipients: dicts with name, account_number, bank_code and optional metadata
+
+        Returns data as {"success": [...], "errors": [...]} in Paystack's raw shape;
+        each success carries `recipient_code` and `details.account_number`.
+        """
+        from pypaystack2.enums import Currency, RecipientType
+        from pypaystack2.models import Recipient
+        try:
+            batch = [
+                Recipient(
+                    type=RecipientType.NUBAN,
+                    name=r['name'],
+                    account_number=r['account_number'],
+                    bank_code=r['bank_code'],
+                    currency=Currency.NGN,
+                    metadata=r.get('metadata'),
+                )
+                for r in recipients
+            ]
+            with external_call('paystack', 'transfer_recipient_bulk_create'):
+                response = self.transfer_recipients.bulk_create(batch=batch)
+            raw = getattr(response, 'raw', None) or {}
+            if raw.get('status'):
+                return {"status": True, "message": raw.get('message'), "data": raw.get('data') or {}}
+            return {"status": False, "message": raw.get('message', 'Failed to create transfer recipients')}
+        except Exception as e:
+            logger.exception("Error creating transfer recipients: %s", str(e))
+            return {"status": False, "message": f"Error creating transfer recipients: {str(e)}"}
+
+    def bulk_transfer(self, transfers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Queue up to 100 transfers from the Paystack balance in one request
+
+        Bulk transfers need OTP for transfers to be disabled on the integration.
+
+        Args:
+            transfers: dicts with amount (kobo), recipient (recipient code), reference and reason
+
+        Returns data as a list of {"reference", "transfer_code", "status", ...} for the
+        transfers Paystack accepted.
+        """
+        from pypaystack2.models import TransferInstruction
+        try:
+            instructions = [
+                TransferInstruction(
+                    amount=t['amount'],
+                    recipient=t['recipient'],
+                    reference=t.get('reference'),
+                    reason=t.get('reason'),
+                )
+                for t in transfers
+            ]
+            with external_call('paystack', 'transfer_bulk'):
+                response = self.transfers.bulk_transfer(transfers=instructions)
+            raw = getattr(response, 'raw', None) or {}
+            if raw.get('status'):
+                return {"status": True, "message": raw.get('message'), "data": raw.get('data') or []}
+            return {"status": False, "message": raw.get('message', 'Bulk transfer failed')}
+        except Exception as e:
+            logger.exception("Error initiating bulk transfer: %s", str(e))
+            return {"status": False, "message": f"Error initiating bulk transfer: {str(e)}"}
+
 # Instantiate service
 paystack_service = PaystackService()
@@ -3,10 +3,15 @@ Portfolio service for managing investment portfolio logic.
 Handles portfolio validation, investment options, and interest calculations.
 """
 
+import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from ..core.config import settings
+from ..core.due_date_timer import due_date_timer
 from .notification_service import NotificationService
+from .payment_totals import invalidate_payment_totals
+
+logger = logging.getLogger(__name__)
 
 try:
     from supabase import create_client
@@ -238,7 +243,7 @@ class PortfolioService:
                 if investor_data:
                     investor = investor_data[0]
             except Exception as e:
-                print(f"Error ensuring due dates in portfolio service: {e}")
+                logger.error(f"Error ensuring due dates in portfolio service: {e}")
                 # Continue with existing data if update fails
 
             portfolio_type = investor.get('portfolio_type')
@@ -387,10 +392,13 @@ class PortfolioService:
                     elif not isinstance(update_response, str):
                         success = True
             except Exception as e:
-                print(f"Error processing Supabase response: {e}")
+                logger.error(f"Error processing Supabase response: {e}")
                 success = False
             
             if success:
+                due_date_timer.schedule(investor_id, next_due_date)
+                invalidate_payment_totals()
+
                 # If update was successful, also update transactions table
                 try:
                     # Import transaction service
@@ -398,18 +406,18 @@ class PortfolioService:
                     transaction_service = TransactionService()
                     
                     # Update transactions with new investment type and calculated amounts
-                    print(f"DEBUG: Calling update_transaction_amounts for investor {investor_id} with investment type {investment_type}")
+                    logger.debug(f"Calling update_transaction_amounts for investor {investor_id} with investment type {investment_type}")
                     transaction_update_result = transaction_service.update_transaction_amounts(investor_id, investment_type)
-                    print(f"DEBUG: Transaction update result: {transaction_update_result}")
+                    logger.debug(f"Transaction update result: {transaction_update_result}")
                     
                     if not transaction_update_result['success']:
                         # Log the error but don't fail the entire operation
-                        print(f"Warning: Failed to update transactions: {transaction_update_result['error']}")
+                        logger.warning(f"Failed to update transactions: {transaction_update_result['error']}")
                     else:
-                        print(f"DEBUG: Successfully updated transactions: {transaction_update_result}")
+                        logger.debug(f"Successfully updated transactions: {transaction_update_result}")
                 except Exception as e:
                     # Log the error but don't fail the entire operation
-                    print(f"Warning: Error updating transactions: {str(e)}")
+                    logger.warning(f"Error updating transactions: {str(e)}")
                     import traceback
                     traceback.print_exc()
                 
@@ -3,20 +3,35 @@ Referral service for managing affiliate network and points system.
 Handles referral code generation, validation, points awarding, and redemptions.
 """
 
+import logging
 import random
 import string
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date
 from ..core.config import settings
+from ..core.cache import TTLCache
+from ..core.metrics import register_cache
+from ..core.pagination import (
+    decode_cursor, clamp_page_size, descending_keyset_filter, split_page
+)
 from .notification_service import NotificationService
+from .id_allocator import referral_code_allocator
 from .transaction_service import TransactionService
 from .interest_calculation_service import InterestCalculationService
+from .versioned_rows import VersionedUpdate, user_points_rows
+
+logger = logging.getLogger(__name__)
 
 try:
     from supabase import create_client
 except Exception:
     create_client = None
 
+# Stats and downline pages keyed by ('stats'|'downlines', referrer_id, ...);
+# invalidated whenever a referral for that referrer is recorded or awarded.
+referral_cache = TTLCache(ttl_seconds=settings.REFERRAL_CACHE_TTL_SECONDS, max_entries=5000)
+register_cache('referral', referral_cache)
+
 
 class ReferralService:
     """Service for managing referral codes, points, and affiliate network."""
@@ -37,6 +52,12 @@ class ReferralService:
 
     def generate_referral_code(self) -> str:
         """Generate a unique 8-character referral code."""
+        try:
+            return referral_code_allocator.next_id()
+        except Exception as e:
+            # Counter unavailable (e.g. migration not applied): probe random codes
+            logger.warning(f"Referral code allocation failed, falling back to random codes: {str(e)}")
+
         while True:
             # Generate 8-character alphanumeric code
             code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
@@ -76,12 +97,20 @@ class ReferralService:
     def assign_referral_code_to_user(self, user_id: str) -> Dict[str, Any]:
         """Generate and assign a unique referral code to a user."""
         try:
-            referral_code = self.generate_referral_code()
-
-            # Update user with referral code
-            response = self.supabase.table('users').update({
-                'referral_code': referral_code
-            }).eq('id', user_id).execute()
+            # Allocated codes can't collide with each other, but may still hit
+            # one of the older randomly generated codes; take the next one then.
+            for attempt in range(3):
+                referral_code = self.generate_referral_code()
+                try:
+                    # Update user with referral code
+                    response = self.supabase.table('users').update({
+                        'referral_code': referral_code
+                    }).eq('id', user_id).execute()
+                    break
+                except Exception as e:
+                    low = str(e).lower()
+                    if attempt == 2 or not ('duplicate' in low or 'unique' in low):
+                        raise
 
             data = getattr(response, 'data', [])
             error = getattr(response, 'error', None)
@@ -150,6 +179,7 @@ class ReferralService:
             error = getattr(response, 'error', None)
 
             if data:
+                self._increment_stats(referrer_id, total=1)
                 return {'success': True, 'data': data[0]}
             else:
                 return {'success': False, 'error': f'Failed to record referral: {error}'}
@@ -174,25 +204,31 @@ class ReferralService:
 
             referrer_id = referral['referrer_id']
 
-            # Update referral record
+            # Flip the flag only if it is still unset, so concurrent calls award once
             update_response = self.supabase.table('user_referrals').update({
                 'investor_account_created': True,
                 'points_awarded': self.POINTS_PER_REFERRAL
-            }).eq('id', referral['id']).execute()
+            }).eq('id', referral['id']).eq('investor_account_created', False).execute()
+            if not getattr(update_response, 'data', None):
+                return {'success': False, 'error': 'Points already awarded for this referral'}
 
             # Update referrer's points
-            points_response = self.supabase.table('user_points').select('*').eq('user_id', referrer_id).execute()
-            points_data = getattr(points_response, 'data', [])
-
-            if points_data:
-                current_points = points_data[0]
-                new_balance = current_points['points_balance'] + self.POINTS_PER_REFERRAL
-                new_total_earned = current_points['total_points_earned'] + self.POINTS_PER_REFERRAL
-
-                self.supabase.table('user_points').update({
-                    'points_balance': new_balance,
-                    'total_points_earned': new_total_earned
-                }).eq('user_id', referrer_id).execute()
+            try:
+                awarded = user_points_rows.update(referrer_id, lambda row: {
+                    'points_balance': (row['points_balance'] or 0) + self.POINTS_PER_REFERRAL,
+                    'total_points_earned': (row['total_points_earned'] or 0) + self.POINTS_PER_REFERRAL
+                }, columns='points_balance, total_points_earned')
+            except Exception:
+                # Unclaim the referral so the award can be retried
+                self.supabase.table('user_referrals').update({
+                    'investor_account_created': False,
+                    'points_awarded': 0
+                }).eq('id', referral['id']).execute()
+                raise
+
+            if awarded is not None:
+                self._increment_stats(referrer_id, successful=1, points=self.POINTS_PER_REFERRAL)
+                new_balance = awarded.after['points_balance']
 
                 # Generate notification
                 notification = NotificationService.generate_referral_points_earned_notification(
@@ -248,48 +284,122 @@ class ReferralService:
         except Exception as e:
             return {'success': False, 'error': f'Error getting user points: {str(e)}'}
 
+    def _increment_stats(self, referrer_id: str, total: int = 0, successful: int = 0, points: int = 0) -> None:
+        """Bump the referrer's counters and drop their cached stats and downline pages."""
+        try:
+            self.supabase.rpc('increment_referral_stats', {
+                'p_referrer_id': referrer_id,
+                'p_total': total,
+                'p_successful': successful,
+                'p_points': points
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Failed to update referral stats for {referrer_id}: {str(e)}")
+        finally:
+            referral_cache.invalidate_prefix(('stats', referrer_id))
+            referral_cache.invalidate_prefix(('downlines', referrer_id))
+
     def get_referral_stats(self, user_id: str) -> Dict[str, Any]:
         """Get user's referral statistics."""
+        return referral_cache.get_or_set(
+            ('stats', user_id),
+            lambda: self._load_referral_stats(user_id),
+            should_cache=lambda result: result['success']
+        )
+
+    def _load_referral_stats(self, user_id: str) -> Dict[str, Any]:
         try:
-            # Get referral count and points earned
-            referrals_response = self.supabase.table('user_referrals').select('*').eq('referrer_id', user_id).execute()
-            referrals_data = getattr(referrals_response, 'data', [])
+            stats_response = self.supabase.table('referral_stats')\
+                .select('total_referrals, successful_referrals, total_points_earned')\
+                .eq('referrer_id', user_id)\
+                .execute()
+            stats_data = getattr(stats_response, 'data', [])
+
+            if stats_data:
+                stats = stats_data[0]
+                return {
+                    'success': True,
+                    'total_referrals': stats['total_referrals'],
+                    'successful_referrals': stats['successful_referrals'],
+                    'total_points_earned': stats['total_points_earned']
+                }
 
-            total_referrals = len(referrals_data) if referrals_data else 0
-            successful_referrals = len([r for r in referrals_data if r['investor_account_created']]) if referrals_data else 0
-            total_points_earned = sum(r['points_awarded'] for r in referrals_data) if referrals_data else 0
+            # No counters row yet: the referrer has no referrals since the
+            # counters were introduced, so a scan here is small.
+            referrals_response = self.supabase.table('user_referrals')\
+                .select('investor_account_created, points_awarded')\
+                .eq('referrer_id', user_id)\
+                .execute()
+            referrals_data = getattr(referrals_response, 'data', []) or []
 
             return {
                 'success': True,
-                'total_referrals': total_referrals,
-                'successful_referrals': successful_referrals,
-                'total_points_earned': total_points_earned
+                'total_referrals': len(referrals_data),
+                'successful_referrals': len([r for r in referrals_data if r['investor_account_created']]),
+                'total_points_earned': sum(r['points_awarded'] or 0 for r in referrals_data)
             }
 
         except Exception as e:
             return {'success': False, 'error': f'Error getting referral stats: {str(e)}'}
 
-    def get_downlines(self, user_id: str) -> Dict[str, Any]:
-        """Get user's referral downlines."""
+    def get_downlines(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of the user's referral downlines, newest first.
+
+        Args:
+            user_id: The referrer's user ID
+            limit: Page size (clamped to the pagination maximum)
+            cursor: `next_cursor` from the previous page, or None for the first page
+
+        Returns:
+            Dict containing the downlines page and the cursor for the next page
+        """
+        limit = clamp_page_size(limit)
+        return referral_cache.get_or_set(
+            ('downlines', user_id, limit, cursor),
+            lambda: self._load_downlines_page(user_id, limit, cursor),
+            should_cache=lambda result: result['success']
+        )
+
+    def _load_downlines_page(self, user_id: str, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
         try:
-            response = self.supabase.table('user_referrals').select('*, users!referee_id(email, first_name, surname, created_at)').eq('referrer_id', user_id).execute()
-            data = getattr(response, 'data', [])
+            try:
+                after = decode_cursor(cursor)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+
+            query = self.supabase.table('user_referrals')\
+                .select('id, referee_id, investor_account_created, points_awarded, created_at, '
+                        'users!referee_id(email, first_name, surname, created_at)')\
+                .eq('referrer_id', user_id)
+            if after:
+                query = query.or_(descending_keyset_filter('created_at', after['created_at'], 'id', after['id']))
+
+            response = query.order('created_at', desc=True)\
+                .order('id', desc=True)\
+                .limit(limit + 1)\
+                .execute()
+            rows, next_cursor = split_page(getattr(response, 'data', []) or [], limit, 'created_at')
 
             downlines = []
-            if data:
-                for referral in data:
-                    user_info = referral.get('users', {})
-                    downlines.append({
-                        'id': referral['referee_id'],
-                        'email': user_info.get('email', ''),
-                        'name': f"{user_info.get('first_name', '')} {user_info.get('surname', '')}".strip(),
-                        'joined_date': user_info.get('created_at', ''),
-                        'investor_account_created': referral['investor_account_created'],
-                        'points_awarded': referral['points_awarded'],
-                        'referral_date': referral['created_at']
-                    })
-
-            return {'success': True, 'downlines': downlines}
+            for referral in rows:
+                user_info = referral.get('users') or {}
+                downlines.append({
+                    'id': referral['referee_id'],
+                    'email': user_info.get('email', ''),
+                    'name': f"{user_info.get('first_name', '')} {user_info.get('surname', '')}".strip(),
+                    'joined_date': user_info.get('created_at', ''),
+                    'investor_account_created': referral['investor_account_created'],
+                    'points_awarded': referral['points_awarded'],
+                    'referral_date': referral['created_at']
+                })
+
+            return {
+                'success': True,
+                'downlines': downlines,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
 
         except Exception as e:
             return {'success': False, 'error': f'Error getting downlines: {str(e)}'}
@@ -350,36 +460,6 @@ class ReferralService:
             current_date = date.today()
             current_month = current_date.replace(day=1)
 
-            # Update user points
-            points_response = self.supabase.table('user_points').select('*').eq('user_id', user_id).execute()
-            points_data = getattr(points_response, 'data', [])
-
-            if not points_data:
-                return {'success': False, 'error': 'Points record not found'}
-
-            current_points = points_data[0]
-            new_balance = current_points['points_balance'] - points_to_redeem
-            new_total_redeemed = current_points['total_points_redeemed'] + points_to_redeem
-
-            # Update monthly redemption count
-            monthly_count = 1
-            last_redemption_month = current_points['last_redemption_month']
-
-            if last_redemption_month:
-                last_month = datetime.strptime(last_redemption_month, '%Y-%m-%d').date().replace(day=1)
-                if last_month == current_month:
-                    monthly_count = current_points['monthly_redemption_count'] + 1
-
-            update_data = {
-                'points_balance': new_balance,
-                'total_points_redeemed': new_total_redeemed,
-                'last_redemption_date': current_date.isoformat(),
-                'monthly_redemption_count': monthly_count,
-                'last_redemption_month': current_month.isoformat()
-            }
-
-            self.supabase.table('user_points').update(update_data).eq('user_id', user_id).execute()
-
             # Add amount to spending account via transaction service
             transaction_service = TransactionService()
 
@@ -401,6 +481,37 @@ class ReferralService:
 
             investor_id = investor_data[0]['id']
 
+            # Deduct the points. The balance and monthly limit checked above are
+            # checked again against the row being written, since a concurrent
+            # redemption may have spent them in the meantime.
+            def redeem(row):
+                monthly_count = 1
+                last_redemption_month = row['last_redemption_month']
+                if last_redemption_month:
+                    last_month = datetime.strptime(last_redemption_month, '%Y-%m-%d').date().replace(day=1)
+                    if last_month == current_month:
+                        monthly_count = row['monthly_redemption_count'] + 1
+
+                if points_to_redeem > row['points_balance'] or monthly_count > self.MAX_MONTHLY_REDEMPTIONS:
+                    return None
+
+                return {
+                    'points_balance': row['points_balance'] - points_to_redeem,
+                    'total_points_redeemed': row['total_points_redeemed'] + points_to_redeem,
+                    'last_redemption_date': current_date.isoformat(),
+                    'monthly_redemption_count': monthly_count,
+                    'last_redemption_month': current_month.isoformat()
+                }
+
+            redeemed = user_points_rows.update(user_id, redeem)
+            if redeemed is None:
+                return {'success': False, 'error': 'Points record not found'}
+            if not redeemed.applied:
+                if points_to_redeem > redeemed.before['points_balance']:
+                    return {'success': False, 'error': 'Insufficient points balance'}
+                return {'success': False, 'error': 'Monthly redemption limit reached. Try again next month.'}
+            new_balance = redeemed.after['points_balance']
+
             # Record redemption transaction
             transaction_data = {
                 'investor_id': investor_id,
@@ -411,39 +522,25 @@ class ReferralService:
             transaction_result = transaction_service.record_points_redemption_transaction(transaction_data)
 
             # Debug logging
-            print(f"DEBUG: Transaction creation result: success={transaction_result.get('success')}, error={transaction_result.get('error')}")
+            logger.debug(f"Transaction creation result: success={transaction_result.get('success')}, error={transaction_result.get('error')}")
 
             if not transaction_result['success']:
                 # Rollback points deduction since transaction recording failed
-                rollback_update_data = {
-                    'points_balance': current_points['points_balance'],  # Restore original balance
-                    'total_points_redeemed': current_points['total_points_redeemed'],  # Restore original redeemed count
-                    'last_redemption_date': current_points['last_redemption_date'],  # Restore original date
-                    'monthly_redemption_count': current_points['monthly_redemption_count'],  # Restore original count
-                    'last_redemption_month': current_points['last_redemption_month']  # Restore original month
-                }
-                self.supabase.table('user_points').update(rollback_update_data).eq('user_id', user_id).execute()
-                print(f"DEBUG: Rolled back points for user_id={user_id} due to transaction failure")
+                self._refund_redemption(user_id, points_to_redeem, redeemed)
+                logger.warning(f"Rolled back points for user_id={user_id} due to transaction failure")
                 return {'success': False, 'error': 'Failed to process redemption transaction'}
 
             # Credit spending account with redemption amount
-            print(f"DEBUG: About to credit spending account for investor_id={investor_id}, amount={amount_in_naira}")
+            logger.debug(f"About to credit spending account for investor_id={investor_id}, amount={amount_in_naira}")
             interest_service = InterestCalculationService()
             spending_result = interest_service.update_spending_account(investor_id, amount_in_naira)
 
             # Debug logging
-            print(f"DEBUG: Spending account update result: success={spending_result.get('success')}, error={spending_result.get('error')}")
+            logger.debug(f"Spending account update result: success={spending_result.get('success')}, error={spending_result.get('error')}")
 
             if not spending_result['success']:
                 # Rollback points deduction and transaction since spending account credit failed
-                rollback_update_data = {
-                    'points_balance': current_points['points_balance'],  # Restore original balance
-                    'total_points_redeemed': current_points['total_points_redeemed'],  # Restore original redeemed count
-                    'last_redemption_date': current_points['last_redemption_date'],  # Restore original date
-                    'monthly_redemption_count': current_points['monthly_redemption_count'],  # Restore original count
-                    'last_redemption_month': current_points['last_redemption_month']  # Restore original month
-                }
-                self.supabase.table('user_points').update(rollback_update_data).eq('user_id', user_id).execute()
+                self._refund_redemption(user_id, points_to_redeem, redeemed)
 
                 # TODO: Delete transaction record if possible (though this might be complex)
                 # For now, the transaction record will remain as audit trail of the failed attempt
@@ -468,3 +565,27 @@ class ReferralService:
 
         except Exception as e:
             return {'success': False, 'error': f'Error redeeming points: {str(e)}'}
+
+    def _refund_redemption(self, user_id: str, points: int, redeemed: VersionedUpdate) -> None:
+        """Give back the points of a redemption that could not be completed."""
+        before, after = redeemed.before, redeemed.after
+
+        def refund(row):
+            values = {
+                'points_balance': row['points_balance'] + points,
+                'total_points_redeemed': row['total_points_redeemed'] - points
+            }
+            # Restore the redemption bookkeeping unless another redemption has been recorded since
+            if (row['monthly_redemption_count'] == after['monthly_redemption_count']
+                    and row['last_redemption_month'] == after['last_redemption_month']):
+                values.update({
+                    'last_redemption_date': before['last_redemption_date'],
+                    'monthly_redemption_count': before['monthly_redemption_count'],
+                    'last_redemption_month': before['last_redemption_month']
+                })
+            return values
+
+        try:
+            user_points_rows.update(user_id, refund)
+        except Exception as e:
+            logger.error(f"Failed to refund {points} points to user_id={user_id}: {str(e)}")
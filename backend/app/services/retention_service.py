@@ -0,0 +1,185 @@
+"""
+Retention service for purging expired rows in bounded chunks.
+
+Each table has a RetentionPolicy describing which rows are expired. A run
+selects a chunk of expired ids (served by the table's expires_at index),
+deletes exactly those ids, pauses briefly and repeats, stopping after
+RETENTION_MAX_CHUNKS_PER_RUN chunks so a large backlog is worked down over
+several scheduled runs instead of one long-running delete.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from supabase import create_client
+except Exception:
+    create_client = None
+
+
+@dataclass
+class RetentionPolicy:
+    """Which rows of a table are expired and may be deleted."""
+    table: str
+    expires_column: str = 'expires_at'
+    id_column: str = 'id'
+    # Keep rows this long after they expire (e.g. for support lookups).
+    grace: timedelta = timedelta(0)
+    chunk_size: Optional[int] = None
+
+
+DEFAULT_POLICIES: List[RetentionPolicy] = [
+    RetentionPolicy('sessions'),
+    RetentionPolicy('notifications'),
+    # Reset codes expire after 15 minutes; keep a day of history for support.
+    RetentionPolicy('password_reset_codes', grace=timedelta(days=1)),
+]
+
+
+class RetentionService:
+    """Deletes expired rows table by table, in bounded, throttled chunks."""
+
+    def __init__(self, policies: Optional[List[RetentionPolicy]] = None,
+                 chunk_size: Optional[int] = None,
+                 max_chunks_per_run: Optional[int] = None,
+                 pause_seconds: Optional[float] = None):
+        if create_client is None:
+            raise RuntimeError("supabase package not installed")
+
+        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+            raise RuntimeError("Supabase config missing in settings")
+
+        self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+        self.policies = policies or DEFAULT_POLICIES
+        self.chunk_size = chunk_size or settings.RETENTION_CHUNK_SIZE
+        self.max_chunks_per_run = max_chunks_per_run or settings.RETENTION_MAX_CHUNKS_PER_RUN
+        self.pause_seconds = (
+            pause_seconds if pause_seconds is not None
+            else settings.RETENTION_CHUNK_PAUSE_SECONDS
+        )
+
+    def purge_table(self, policy: RetentionPolicy) -> Dict[str, Any]:
+        """
+        Delete expired rows from one table.
+
+        Args:
+            policy: The retention policy for the table
+
+        Returns:
+            Dict containing the number of rows deleted, chunks used and whether
+            expired rows remain for the next run
+        """
+        started = time.monotonic()
+        chunk_size = policy.chunk_size or self.chunk_size
+        cutoff = (datetime.now(timezone.utc) - policy.grace).isoformat()
+        deleted = 0
+        chunks = 0
+        backlog = False
+
+        try:
+            while chunks < self.max_chunks_per_run:
+                response = self.supabase.table(policy.table)\
+                    .select(policy.id_column)\
+                    .lt(policy.expires_column, cutoff)\
+                    .order(policy.expires_column)\
+                    .limit(chunk_size)\
+                    .execute()
+                ids = [row[policy.id_column] for row in getattr(response, 'data', [])]
+                if not ids:
+                    break
+
+                self.supabase.table(policy.table).delete()\
+                    .in_(policy.id_column, ids)\
+                    .execute()
+                deleted += len(ids)
+                chunks += 1
+
+                if len(ids) < chunk_size:
+                    break
+                if chunks >= self.max_chunks_per_run:
+                    backlog = True
+                    break
+                if self.pause_seconds:
+                    time.sleep(self.pause_seconds)
+
+            return {
+                'success': True,
+                'table': policy.table,
+                'deleted': deleted,
+                'chunks': chunks,
+                'backlog': backlog,
+                'duration_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'table': policy.table,
+                'deleted': deleted,
+                'chunks': chunks,
+                'error': f'Error purging {policy.table}: {str(e)}',
+                'duration_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Apply every retention policy once.
+
+        Returns:
+            Dict containing per-table results
+        """
+        results = {}
+        for policy in self.policies:
+            result = self.purge_table(policy)
+            results[policy.table] = result
+            retention_metrics.record(result)
+            if result['success']:
+                logger.info(
+                    f"Retention: deleted {result['deleted']} rows from {policy.table} "
+                    f"in {result['chunks']} chunks ({result['duration_ms']} ms)"
+                )
+            else:
+                logger.error(f"Retention: {result['error']}")
+
+        return {
+            'success': all(r['success'] for r in results.values()),
+            'tables': results
+        }
+
+
+class RetentionMetrics:
+    """Cumulative retention counters per table, kept for the admin status endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, result: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._tables.setdefault(result['table'], {
+                'runs': 0, 'deleted_total': 0, 'chunks_total': 0, 'errors': 0
+            })
+            entry['runs'] += 1
+            entry['deleted_total'] += result.get('deleted', 0)
+            entry['chunks_total'] += result.get('chunks', 0)
+            entry['last_run_at'] = datetime.utcnow().isoformat()
+            entry['last_deleted'] = result.get('deleted', 0)
+            entry['last_duration_ms'] = result.get('duration_ms')
+            entry['backlog'] = result.get('backlog', False)
+            if not result.get('success'):
+                entry['errors'] += 1
+                entry['last_error'] = result.get('error')
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {table: dict(entry) for table, entry in self._tables.items()}
+
+
+retention_metrics = RetentionMetrics()
@@ -0,0 +1,143 @@
+"""
+Spending-account reads and balance changes behind a per-process cache.
+
+Accounts are cached by investor id for SPENDING_ACCOUNT_CACHE_TTL_SECONDS.
+A miss costs one spending_account_for call, which also creates a missing
+account. Every balance change goes through the adjust_spending_account RPC
+(sql/create_spending_account_functions.sql): the delta is applied in one
+UPDATE, so concurrent payouts and withdrawals cannot overwrite each other,
+and the returned row replaces the cached one (write-through). Other worker
+processes pick the change up when their entry expires.
+
+Batch readers can `prefetch()` a page of investors in one query.
+"""
+
+import itertools
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from ..core.cache import TTLCache
+from ..core.clients import LazyClient
+from ..core.config import settings
+from ..core.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_CHUNK_SIZE = 200
+
+spending_account_cache = TTLCache(ttl_seconds=settings.SPENDING_ACCOUNT_CACHE_TTL_SECONDS,
+                                  max_entries=settings.SPENDING_ACCOUNT_CACHE_SIZE)
+register_cache('spending_accounts', spending_account_cache)
+
+
+def _single(data: Any) -> Optional[Dict[str, Any]]:
+    """An RPC's row: PostgREST returns a composite as an object and SETOF as a list."""
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data or None
+
+
+class SpendingAccountRepository:
+    """Cached access to spending_accounts, keyed by investor id."""
+
+    def __init__(self, supabase=None, cache: TTLCache = spending_account_cache):
+        self.supabase = supabase or LazyClient('SUPABASE_SERVICE_ROLE_KEY')
+        self.cache = cache
+        # Responses can come back out of order, so a row is only cached if no
+        # write to the same account started after the read or write that
+        # fetched it. Holds one ticket per investor written by this process.
+        self._tickets = itertools.count(1)
+        self._last_write: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, investor_id: str) -> Dict[str, Any]:
+        """The investor's account row, created on first use."""
+        row = self.cache.get(investor_id)
+        if row is None:
+            ticket = next(self._tickets)
+            response = self.supabase.rpc('spending_account_for', {'p_investor_id': investor_id}).execute()
+            row = _single(getattr(response, 'data', None))
+            if row is None:
+                raise RuntimeError('Failed to create spending account')
+            self._store(investor_id, row, ticket)
+        return dict(row)
+
+    def prefetch(self, investor_ids: Iterable[str]) -> int:
+        """
+        Load the accounts of `investor_ids` not already cached, one query per
+        PREFETCH_CHUNK_SIZE ids. Investors without an account are skipped;
+        get() creates theirs when first asked.
+
+        Returns:
+            Number of accounts loaded
+        """
+        missing = [i for i in dict.fromkeys(investor_ids) if self.cache.get(i) is None]
+        loaded = 0
+        for start in range(0, len(missing), PREFETCH_CHUNK_SIZE):
+            chunk = missing[start:start + PREFETCH_CHUNK_SIZE]
+            ticket = next(self._tickets)
+            response = self.supabase.table('spending_accounts') \
+                .select('*') \
+                .in_('investor_id', chunk) \
+                .order('created_at') \
+                .execute()
+            seen = set()
+            for row in getattr(response, 'data', None) or []:
+                # Oldest account wins where duplicates exist, as in spending_account_for
+                if row['investor_id'] not in seen:
+                    seen.add(row['investor_id'])
+                    self._store(row['investor_id'], row, ticket)
+            loaded += len(seen)
+        return loaded
+
+    def credit(self, investor_id: str, amount: float) -> Dict[str, Any]:
+        """Add `amount` to the balance; returns the updated row."""
+        row = self.adjust(investor_id, amount)
+        if row is None:
+            raise RuntimeError('Failed to update spending account')
+        return row
+
+    def debit(self, investor_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """Withdraw `amount`; returns the updated row, or None if the balance is too low."""
+        return self.adjust(investor_id, -amount, withdrawn=amount)
+
+    def adjust(self, investor_id: str, amount: float, withdrawn: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Apply a balance delta (and total_withdrawn delta) atomically.
+
+        Returns:
+            The updated row, or None when a debit was refused for insufficient balance
+        """
+        with self._lock:
+            ticket = next(self._tickets)
+            self._last_write[investor_id] = ticket
+        try:
+            response = self.supabase.rpc('adjust_spending_account', {
+                'p_investor_id': investor_id,
+                'p_amount': amount,
+                'p_withdrawn': withdrawn
+            }).execute()
+        except Exception:
+            # The write may or may not have landed; do not keep serving the old balance
+            self.invalidate(investor_id)
+            raise
+        row = _single(getattr(response, 'data', None))
+        if row is None:
+            return None
+        self._store(investor_id, row, ticket)
+        return dict(row)
+
+    def invalidate(self, investor_id: str) -> None:
+        self.cache.invalidate(investor_id)
+
+    def _store(self, investor_id: str, row: Dict[str, Any], ticket: int) -> None:
+        """Cache `row` unless a later write to the account has started; then drop the entry instead."""
+        with self._lock:
+            if self._last_write.get(investor_id, 0) > ticket:
+                self.cache.invalidate(investor_id)
+            else:
+                self.cache.set(investor_id, row)
+
+
+spending_accounts = SpendingAccountRepository()
@@ -5,6 +5,7 @@ import logging
 from .transaction_service import TransactionService
 from .paystack_service import paystack_service
 from .notification_service import NotificationService
+from .payment_totals import invalidate_payment_totals
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -167,6 +168,7 @@ class TopUpService:
                     
                     update_result = self.transaction_service.supabase.table('investors').update(investor_update).eq('id', topup['investor_id']).execute()
                     logger.info(f"Investor update result: {update_result}")
+                    invalidate_payment_totals()
                     
                     # Create a transaction record for the top-up
                     transaction_record = {
@@ -201,24 +203,12 @@ class TopUpService:
                         amount=topup_amount
                     )
                     
-                    # Persist the notification in the database
+                    # Queue the notification; the writer persists it in the next batch
                     try:
-                        from .notification_persistence_service import NotificationPersistenceService
-                        notification_service = NotificationPersistenceService()
-                        persist_result = notification_service.create_notification(
-                            investor_id=topup['investor_id'],
-                            title=notification['title'],
-                            message=notification['message'],
-                            notification_type=notification['type'],
-                            event_type=notification['eventType'],
-                            metadata=notification.get('metadata')
-                        )
-                        if not persist_result.get('success'):
-                            logger.error(f"Failed to persist notification: {persist_result.get('error')}")
-                        else:
-                            logger.info(f"Notification persisted successfully for top-up {topup['id']}")
+                        from .notification_writer import notification_writer
+                        notification_writer.add_generated(notification)
                     except Exception as persist_error:
-                        logger.error(f"Exception while persisting notification: {persist_error}")
+                        logger.error(f"Exception while queueing notification: {persist_error}")
 
                     # Log success
                     logger.info(f"Successfully updated investor {topup['investor_id']} with top-up amount {topup_amount}")
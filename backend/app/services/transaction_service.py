@@ -6,13 +6,23 @@
 # - Handles withdrawal requests and status updates
 # - Provides transaction history and reporting
 
+import logging
 from typing import Optional, Dict, Any, List
 from datetime import timedelta
 from datetime import datetime, date
 import uuid
 
 from ..core.config import settings
+from ..core.due_date_timer import due_date_timer
 from .notification_service import NotificationService
+from .payment_totals import invalidate_payment_totals
+
+logger = logging.getLogger(__name__)
+
+# Records whose amount_due is final. Together with withdrawal requests and
+# credits (negative amount_due) they are left alone when the amount due is
+# recalculated; the rest are the investor's open amount-due rows.
+CLOSED_TRANSACTION_TYPES = ('end_investment', 'renew_investment')
 
 try:
     from supabase import create_client
@@ -297,29 +307,33 @@ class TransactionService:
     def update_withdrawal_status(self, transaction_id: str, status: str, failure_reason: Optional[str] = None) -> Dict[str, Any]:
         """Update the status of a withdrawal transaction.
 
+        Marking a withdrawal as 'sent' settles it through the settle_withdrawal
+        RPC (sql/create_settle_withdrawal_function.sql): the withdrawal row,
+        the investor's open amount-due rows and investors.total_paid are
+        updated in one database transaction. Other statuses touch only the
+        withdrawal row.
+
+        Withdrawals change only while still 'pending': a bulk payout run
+        claims the ones it pays by moving them to 'processing', and a
+        withdrawal that was already rejected or sent is left alone. Otherwise
+        the result carries status_code 409.
+
         Args:
             transaction_id: The transaction ID to update
             status: New status (pending, failed, sent)
             failure_reason: Reason for failure if status is 'failed'
 
         Returns:
-            Dict with success status and data/error
+            Dict with success status and data/error; `already_sent` is True
+            when the withdrawal had been settled before this call
         """
         try:
-            update_data = {
-                'withdraw_status': status,
-                'updated_at': datetime.utcnow().isoformat()
-            }
-
-            if status == 'failed' and failure_reason:
-                update_data['failure_reason'] = failure_reason
-
             if self.supabase is None:
                 return {'success': False, 'error': 'Supabase client not initialized'}
 
             # First, get the transaction details before updating
-            transaction_resp = self.supabase.table('transactions').select('investor_id, amount, amount_due, transaction_type').eq('transaction_id', transaction_id).execute()
-            
+            transaction_resp = self.supabase.table('transactions').select('investor_id, amount, transaction_type').eq('transaction_id', transaction_id).execute()
+
             transaction_data = None
             transaction_error = None
             if isinstance(transaction_resp, dict):
@@ -328,126 +342,59 @@ class TransactionService:
             else:
                 transaction_data = getattr(transaction_resp, 'data', None)
                 transaction_error = getattr(transaction_resp, 'error', None)
-            
+
             if not transaction_data or len(transaction_data) == 0:
                 return {'success': False, 'error': f'Transaction not found: {transaction_error}'}
-            
+
             transaction = transaction_data[0]
-            
-            # If this is a withdrawal being marked as 'sent', update investor's amount_due and total_paid
-            if status == 'sent' and transaction['transaction_type'] == 'withdrawal':
-                investor_id = transaction['investor_id']
-                withdrawal_amount = float(transaction['amount'])
-                
-                # Get current investor data
-                investor_resp = self.supabase.table('investors').select('id').eq('id', investor_id).execute()
-                
-                investor_data = None
-                investor_error = None
-                if isinstance(investor_resp, dict):
-                    investor_data = investor_resp.get('data')
-                    investor_error = investor_resp.get('error')
-                else:
-                    investor_data = getattr(investor_resp, 'data', None)
-                    investor_error = getattr(investor_resp, 'error', None)
-                
-                if investor_data and len(investor_data) > 0:
-                    # Update the transaction with the sent status and withdrawal_amount
-                    update_data['withdrawal_amount'] = str(withdrawal_amount)
-                    resp = self.supabase.table('transactions').update(update_data).eq('transaction_id', transaction_id).execute()
-                    
-                    # Recalculate the investor's current amount_due after withdrawal
-                    calc_result = self.calculate_amount_due(investor_id)
-                    if calc_result['success']:
-                        new_amount_due = calc_result['amount_due']
-                        
-                        # Update all transactions for this investor with the new calculated amount_due
-                        transaction_update_data = {
-                            'amount_due': new_amount_due,
-                            'updated_at': datetime.utcnow().isoformat()
-                        }
-                        
-                        transaction_update_resp = self.supabase.table('transactions').update(transaction_update_data).eq('investor_id', investor_id).execute()
-                        
-                        data = None
-                        error = None
-                        if isinstance(transaction_update_resp, dict):
-                            data = transaction_update_resp.get('data')
-                            error = transaction_update_resp.get('error')
-                        else:
-                            data = getattr(transaction_update_resp, 'data', None)
-                            error = getattr(transaction_update_resp, 'error', None)
-                        
-                        if error:
-                            return {'success': False, 'error': f'Failed to update investor transactions: {error}'}
-                        
-                        # Update the investor's total_paid field
-                        investor_update_data = {
-                            'updated_at': datetime.utcnow().isoformat()
-                        }
-                        
-                        # Get current total_paid value and add the withdrawal amount
-                        current_investor_resp = self.supabase.table('investors').select('total_paid').eq('id', investor_id).execute()
-                        if isinstance(current_investor_resp, dict):
-                            current_investor_data = current_investor_resp.get('data')
-                        else:
-                            current_investor_data = getattr(current_investor_resp, 'data', None)
-                        
-                        if current_investor_data and len(current_investor_data) > 0:
-                            # Check if total_paid field exists
-                            if 'total_paid' in current_investor_data[0]:
-                                current_total_paid = float(current_investor_data[0].get('total_paid', 0) or 0)
-                                new_total_paid = current_total_paid + withdrawal_amount
-                                investor_update_data['total_paid'] = str(new_total_paid)
-                            else:
-                                # If total_paid field doesn't exist, set it to the withdrawal amount
-                                investor_update_data['total_paid'] = str(withdrawal_amount)
-                        
-                        investor_update_resp = self.supabase.table('investors').update(investor_update_data).eq('id', investor_id).execute()
-
-                        investor_update_data_result = None
-                        investor_update_error = None
-                        if isinstance(investor_update_resp, dict):
-                            investor_update_data_result = investor_update_resp.get('data')
-                            investor_update_error = investor_update_resp.get('error')
-                        else:
-                            investor_update_data_result = getattr(investor_update_resp, 'data', None)
-                            investor_update_error = getattr(investor_update_resp, 'error', None)
-
-                        if investor_update_error:
-                            return {'success': False, 'error': f'Failed to update investor total_paid: {investor_update_error}'}
-
-                        if investor_update_error:
-                            return {'success': False, 'error': f'Failed to update investor total_paid: {investor_update_error}'}
-
-                        # CRITICAL FIX: Removed double deduction.
-                        # The amount is already deducted when the request is made (in withdrawal.py/InterestCalculationService).
-                        # We do NOT need to deduct it again here.
-                        
-                        # from .interest_calculation_service import InterestCalculationService
-                        # interest_service = InterestCalculationService()
-                        # spending_update_result = interest_service.process_user_withdrawal(
-                        #     investor_id,
-                        #     withdrawal_amount
-                        # )
-                        # if not spending_update_result['success']:
-                        #     return {'success': False, 'error': f'Failed to update spending account: {spending_update_result["error"]}'}
-                    else:
-                        return {'success': False, 'error': f'Failed to calculate new amount due: {calc_result.get("error")}'}
-                else:
-                    return {'success': False, 'error': f'Investor not found: {investor_error}'}
-            else:
-                # For other status updates, just update the transaction
-                resp = self.supabase.table('transactions').update(update_data).eq('transaction_id', transaction_id).execute()
+            is_withdrawal = transaction['transaction_type'] == 'withdrawal'
+            not_pending = {
+                'success': False,
+                'error': f'Withdrawal {transaction_id} is no longer pending',
+                'status_code': 409
+            }
 
-            data = None
-            error = None
-            if isinstance(resp, dict):
-                data = resp.get('data')
-                error = resp.get('error')
+            if status == 'sent' and is_withdrawal:
+                # Claim it the way a bulk payout run does, so the two cannot both pay it
+                claim = self.supabase.table('transactions')\
+                    .update({'withdraw_status': 'processing', 'updated_at': datetime.utcnow().isoformat()})\
+                    .eq('transaction_id', transaction_id)\
+                    .eq('withdraw_status', 'pending')\
+                    .execute()
+                if not getattr(claim, 'data', None):
+                    return not_pending
+
+                settled = self.settle_withdrawal(transaction_id, transaction['investor_id'])
+                if not settled['success']:
+                    self.supabase.table('transactions')\
+                        .update({'withdraw_status': 'pending', 'updated_at': datetime.utcnow().isoformat()})\
+                        .eq('transaction_id', transaction_id)\
+                        .eq('withdraw_status', 'processing')\
+                        .execute()
+                    return settled
+                data = settled['data']
+                error = None
             else:
-                data = getattr(resp, 'data', None)
-                error = getattr(resp, 'error', None)
+                update_data = {
+                    'withdraw_status': status,
+                    'updated_at': datetime.utcnow().isoformat()
+                }
+                if status == 'failed' and failure_reason:
+                    update_data['failure_reason'] = failure_reason
+
+                query = self.supabase.table('transactions').update(update_data).eq('transaction_id', transaction_id)
+                if is_withdrawal:
+                    query = query.eq('withdraw_status', 'pending')
+                resp = query.execute()
+
+                data = None
+                error = None
+                if isinstance(resp, dict):
+                    data = resp.get('data')
+                    error = resp.get('error')
+                else:
+                    data = getattr(resp, 'data', None)
+                    error = getattr(resp, 'error', None)
 
             if data:
                 result = {'success': True, 'data': data[0] if isinstance(data, list) else data}
@@ -469,13 +416,58 @@ class TransactionService:
                         reason=reason
                     )
 
+                # Status changes come from admins, so the investor's client never
+                # sees this response; persist the notification for them instead.
+                if result.get('notification'):
+                    from .notification_writer import notification_writer
+                    notification_writer.add_generated(result['notification'])
+
                 return result
+            elif is_withdrawal and not error:
+                return not_pending
             else:
                 return {'success': False, 'error': f'Failed to update withdrawal status: {error}'}
 
         except Exception as e:
             return {'success': False, 'error': f'Error updating withdrawal status: {str(e)}'}
 
+    def settle_withdrawal(self, transaction_id: str, investor_id: str) -> Dict[str, Any]:
+        """Mark a withdrawal as sent and book it against the investor, atomically.
+
+        The amount due is still computed here from the portfolio rules; the
+        settle_withdrawal RPC locks the withdrawal row, marks it sent, adds its
+        amount to investors.total_paid and writes the new amount due to the
+        investor's open amount-due rows only. The amount is deducted from the
+        spending account when the withdrawal is requested, not here.
+
+        Returns:
+            Dict with success status, the updated withdrawal row as `data`
+            and `already_sent`
+        """
+        calc_result = self.calculate_amount_due(investor_id)
+        if not calc_result['success']:
+            return {'success': False, 'error': f'Failed to calculate new amount due: {calc_result.get("error")}'}
+
+        try:
+            response = self.supabase.rpc('settle_withdrawal', {
+                'p_transaction_id': transaction_id,
+                'p_amount_due': calc_result['amount_due']
+            }).execute()
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to settle withdrawal: {str(e)}'}
+
+        settled = getattr(response, 'data', None) or {}
+        already_sent = bool(settled.get('already_sent'))
+        if already_sent:
+            logger.info(f"Withdrawal {transaction_id} was already sent; not booked again")
+        else:
+            invalidate_payment_totals()
+            logger.info(
+                f"Settled withdrawal {transaction_id} for investor {investor_id}, "
+                f"{settled.get('amount_due_rows_updated', 0)} amount-due rows updated"
+            )
+        return {'success': True, 'data': settled.get('transaction'), 'already_sent': already_sent}
+
     def get_transaction_history(self, investor_id: str, transaction_type: Optional[str] = None) -> Dict[str, Any]:
         """Get transaction history for an investor.
 
@@ -632,7 +624,22 @@ class TransactionService:
             if not data or len(data) == 0:
                 return {'success': False, 'error': f'Investor not found: {error}'}
 
-            investor = data[0]
+            return self.amount_due_for(data[0])
+
+        except Exception as e:
+            return {'success': False, 'error': f'Error calculating amount due: {str(e)}'}
+
+    def amount_due_for(self, investor: Dict[str, Any], portfolio_service=None) -> Dict[str, Any]:
+        """Amount due for an investor row already in hand.
+
+        Args:
+            investor: Row with portfolio_type, investment_type, initial_investment and created_at
+            portfolio_service: PortfolioService to reuse when called in a loop
+
+        Returns:
+            Dict with success status and amount due/error
+        """
+        try:
             portfolio_type = investor.get('portfolio_type')
             investment_type = investor.get('investment_type')
             initial_investment = float(investor.get('initial_investment', 0))
@@ -642,8 +649,9 @@ class TransactionService:
                 return {'success': True, 'amount_due': 0}
 
             # Import portfolio service to get investment rules
-            from .portfolio_service import PortfolioService
-            portfolio_service = PortfolioService()
+            if portfolio_service is None:
+                from .portfolio_service import PortfolioService
+                portfolio_service = PortfolioService()
 
             # Get investment requirements
             requirements = portfolio_service.get_investment_requirements(portfolio_type, investment_type)
@@ -725,16 +733,22 @@ class TransactionService:
             weekly_interest = initial_investment * weekly_rate
             amount_due = weekly_interest * weeks_elapsed
             
-            # Update all transactions for this investor with the new investment type and calculated amount
+            # Update the investor's open amount-due rows with the new investment type and calculated amount;
+            # withdrawals, end/renew records and credits keep the values they were booked with
             update_data = {
                 'investment_type': investment_type,
                 'amount_due': amount_due,
                 'portfolio_type': portfolio_type,  # Correct field name
                 'updated_at': datetime.now().isoformat()
             }
-            
-            # Update all transactions for this investor
-            update_resp = self.supabase.table('transactions').update(update_data).eq('investor_id', investor_id).execute()
+
+            update_resp = self.supabase.table('transactions') \
+                .update(update_data) \
+                .eq('investor_id', investor_id) \
+                .eq('withdrawal_requested', False) \
+                .not_.in_('transaction_type', list(CLOSED_TRANSACTION_TYPES)) \
+                .gte('amount_due', 0) \
+                .execute()
             
             update_data_result = None
             update_error = None
@@ -793,10 +807,12 @@ class TransactionService:
             forfeiture_amount = initial_investment * 0.25
             remaining_amount = initial_investment - forfeiture_amount
             
-            # Update investor record to mark as ended
+            # Update investor record to mark as ended; clearing next_due_date
+            # takes it out of the due-date job and idx_investors_next_due_active
             update_data = {
                 'investment_ended': True,
                 'ended_at': datetime.now().isoformat(),
+                'next_due_date': None,
                 'updated_at': datetime.now().isoformat()
             }
             
@@ -813,6 +829,7 @@ class TransactionService:
             
             if update_error:
                 return {'success': False, 'error': f'Failed to update investor record: {update_error}'}
+            due_date_timer.discard(investor_id)
             
             # Record the end investment transaction
             transaction_record = {
@@ -944,7 +961,7 @@ class TransactionService:
                     metadata=notification.get('metadata')
                 )
             except Exception as persist_error:
-                print(f"Failed to persist notification: {persist_error}")
+                logger.warning(f"Failed to persist notification: {persist_error}")
             
             result['notification'] = notification
 
@@ -1020,6 +1037,9 @@ class TransactionService:
             
             if update_error:
                 return {'success': False, 'error': f'Failed to update investor record: {update_error}'}
+
+            due_date_timer.discard(investor_id)
+            invalidate_payment_totals()
             
             # Record the renew investment transaction
             transaction_record = {
@@ -1071,20 +1091,12 @@ class TransactionService:
                 investor_id=investor_id
             )
             
-            # Persist the notification in the database
+            # Queue the notification; the writer persists it in the next batch
             try:
-                from .notification_persistence_service import NotificationPersistenceService
-                notification_service = NotificationPersistenceService()
-                notification_service.create_notification(
-                    investor_id=investor_id,
-                    title=notification['title'],
-                    message=notification['message'],
-                    notification_type=notification['type'],
-                    event_type=notification['eventType'],
-                    metadata=notification.get('metadata')
-                )
+                from .notification_writer import notification_writer
+                notification_writer.add_generated(notification)
             except Exception as persist_error:
-                print(f"Failed to persist notification: {persist_error}")
+                logger.warning(f"Failed to queue notification: {persist_error}")
             
             result['notification'] = notification
 
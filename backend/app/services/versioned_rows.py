@@ -0,0 +1,105 @@
+"""
+Optimistic concurrency for rows that are read, changed in Python and written back.
+
+investors, spending_accounts and user_points carry a `version` column that a
+trigger bumps on every UPDATE (sql/add_row_versions.sql). VersionedTable.update()
+reads a row, asks the caller for the change, and writes it with
+`.eq('version', <version read>)`. If another writer got there first the write
+matches nothing, and the read-change-write is repeated, up to CAS_MAX_ATTEMPTS
+times with a short jittered backoff.
+
+The change function may run several times and must compute its values from
+the row it is given, not from anything read earlier. It returns None to
+leave the row alone (e.g. the installment was already paid).
+"""
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from ..core.clients import LazyClient
+from ..core.config import settings
+from ..core.metrics import ROW_VERSION_CONFLICTS, ROW_VERSION_FAILURES
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentUpdateError(RuntimeError):
+    """Raised when a versioned update keeps losing to other writers."""
+
+
+@dataclass
+class VersionedUpdate:
+    """Outcome of VersionedTable.update(): the row as read, and as written (None if declined)."""
+    before: Dict[str, Any]
+    after: Optional[Dict[str, Any]]
+
+    @property
+    def applied(self) -> bool:
+        return self.after is not None
+
+
+class VersionedTable:
+    """Compare-and-swap updates on one table, addressed by a unique key column."""
+
+    def __init__(self, table: str, key_column: str = 'id', supabase=None,
+                 max_attempts: Optional[int] = None, backoff_ms: Optional[float] = None):
+        self.table = table
+        self.key_column = key_column
+        self.supabase = supabase or LazyClient('SUPABASE_SERVICE_ROLE_KEY')
+        self.max_attempts = max_attempts or settings.CAS_MAX_ATTEMPTS
+        self.backoff_ms = settings.CAS_BACKOFF_MS if backoff_ms is None else backoff_ms
+
+    def update(self, key: Any, change: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+               columns: str = '*') -> Optional[VersionedUpdate]:
+        """
+        Apply `change(row)` to the row whose key column equals `key`.
+
+        Args:
+            key: Value of the key column
+            change: Returns the columns to update, or None to leave the row as it is
+            columns: Columns to read; `version` is always added
+
+        Returns:
+            VersionedUpdate, or None if there is no such row
+
+        Raises:
+            ConcurrentUpdateError: the row changed under every attempt
+        """
+        if columns != '*':
+            columns = f'{columns}, version'
+        for attempt in range(self.max_attempts):
+            response = self.supabase.table(self.table).select(columns).eq(self.key_column, key).execute()
+            rows = getattr(response, 'data', None) or []
+            if not rows:
+                return None
+            row = rows[0]
+
+            values = change(dict(row))
+            if values is None:
+                return VersionedUpdate(before=row, after=None)
+
+            version = row['version']
+            # The trigger sets the same value; sending it keeps triggerless copies of the schema consistent
+            response = self.supabase.table(self.table) \
+                .update({**values, 'version': version + 1}) \
+                .eq(self.key_column, key) \
+                .eq('version', version) \
+                .execute()
+            written = getattr(response, 'data', None) or []
+            if written:
+                return VersionedUpdate(before=row, after=written[0])
+
+            ROW_VERSION_CONFLICTS.inc(self.table)
+            if attempt + 1 < self.max_attempts and self.backoff_ms:
+                time.sleep(random.uniform(0, self.backoff_ms * 2 ** attempt) / 1000)
+
+        ROW_VERSION_FAILURES.inc(self.table)
+        logger.warning(f"Gave up updating {self.table} {key} after {self.max_attempts} version conflicts")
+        raise ConcurrentUpdateError(f'{self.table} {key} changed concurrently; try again')
+
+
+investor_rows = VersionedTable('investors')
+user_points_rows = VersionedTable('user_points', key_column='user_id')
@@ -0,0 +1,478 @@
+"""
+Bulk withdrawal approval through Paystack bulk transfers.
+
+An admin posts a set of withdrawal transaction ids and gets a run id back
+at once; a background thread then works through the run:
+
+1. Validate: one query loads the withdrawals and one loads their investors.
+   Ids that are unknown, not pending withdrawals, or whose investor has no
+   usable bank details are reported as `rejected`.
+2. Recipients: investors without a stored Paystack recipient code get one
+   from a single bulk-create request, saved on investors.paystack_recipient_code.
+3. Per chunk of PAYOUT_CHUNK_SIZE withdrawals:
+   - claim: one update moves them from pending to processing, so a second
+     run (or a double click) cannot pay them again;
+   - pay: one Paystack bulk transfer. References are derived from the
+     transaction id, so Paystack refuses a repeated transfer;
+   - settle: one settle_withdrawals RPC (sql/create_withdrawal_payouts.sql)
+     marks the paid rows sent and books them against their investors.
+     Withdrawals Paystack did not accept go back to pending with the reason.
+
+GET /admin/withdrawals/bulk-approve/{run_id} reports progress and the
+outcome of each withdrawal. Set PAYOUT_PROVIDER=fake to stub the Paystack
+calls when running locally.
+"""
+
+import itertools
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..core.clients import LazyClient
+from ..core.config import settings
+from .notification_service import NotificationService
+from .payment_totals import invalidate_payment_totals
+
+logger = logging.getLogger(__name__)
+
+# Per-withdrawal outcomes
+REJECTED = 'rejected'                # failed validation, nothing was changed
+TRANSFER_FAILED = 'transfer_failed'  # Paystack did not accept it; back to pending
+SENT = 'sent'                        # paid and settled
+ALREADY_SENT = 'already_sent'        # settled before this run; not paid again
+SETTLE_FAILED = 'settle_failed'      # paid but not settled; left in processing for review
+
+# Paystack bank codes for the bank labels the signup form stores in
+# investors.bank_name (OpenAccountWizard.jsx). Most of them are not the names
+# Paystack's bank list uses, and some banks have since been renamed.
+BANK_CODES = {
+    'access bank': '044',
+    'gtbank': '058',
+    'first bank': '011',
+    'uba': '033',
+    'zenith bank': '057',
+    'fidelity bank': '070',
+    'opay': '999992',
+    'money point': '50515',
+    'skye bank': '076',       # now Polaris Bank
+    'eco bank': '050',
+    'bank phb': '082',        # now Keystone Bank
+    'kuda bank': '50211',
+    'suntrust bank': '100',
+    'palm pay': '999991',
+    'union bank': '032',
+}
+
+
+def _bank_key(bank_name: Optional[str]) -> str:
+    return ' '.join((bank_name or '').lower().split())
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def transfer_reference(transaction_id: str) -> str:
+    """Paystack transfer reference for a withdrawal (lowercase, dashes allowed)."""
+    return f"payout-{transaction_id.lower()}"
+
+
+@dataclass
+class PayoutItem:
+    transaction_id: str
+    outcome: Optional[str] = None
+    investor_id: Optional[str] = None
+    amount: float = 0.0
+    transfer_code: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'transaction_id': self.transaction_id,
+            'outcome': self.outcome or 'queued',
+            'investor_id': self.investor_id,
+            'amount': self.amount,
+            'transfer_code': self.transfer_code,
+            'error': self.error,
+        }
+
+
+@dataclass
+class PayoutRun:
+    id: int
+    requested_by: Optional[str]
+    items: 'OrderedDict[str, PayoutItem]'
+    stage: str = 'queued'
+    error: Optional[str] = None
+    started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+
+    def finish(self, item: PayoutItem, outcome: str, error: Optional[str] = None) -> None:
+        item.outcome = outcome
+        item.error = error
+
+    @property
+    def processed(self) -> int:
+        return sum(1 for item in self.items.values() if item.outcome)
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = defaultdict(int)
+        paid = 0.0
+        for item in self.items.values():
+            if item.outcome:
+                counts[item.outcome] += 1
+            if item.outcome == SENT:
+                paid += item.amount
+        return {
+            'id': self.id,
+            'requested_by': self.requested_by,
+            'stage': self.stage,
+            'total': len(self.items),
+            'processed': self.processed,
+            'outcomes': dict(counts),
+            'amount_sent': paid,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), 'items': [item.to_dict() for item in self.items.values()]}
+
+
+class PaystackPayoutProvider:
+    """
+    Pays through paystack_service. Bank names are resolved through BANK_CODES,
+    then by exact name in Paystack's bank list, which is fetched once per process.
+    """
+
+    def __init__(self):
+        from .paystack_service import paystack_service
+        self.paystack = paystack_service
+        self._bank_codes: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def bank_code(self, bank_name: Optional[str]) -> Optional[str]:
+        key = _bank_key(bank_name)
+        if key in BANK_CODES:
+            return BANK_CODES[key]
+        with self._lock:
+            if self._bank_codes is None:
+                result = self.paystack.list_banks()
+                if not result.get('status'):
+                    raise RuntimeError(result.get('message'))
+                self._bank_codes = {_bank_key(b['name']): b['code'] for b in result['data'] if b.get('name')}
+        return self._bank_codes.get(key)
+
+    def create_recipients(self, recipients: List[Dict[str, Any]]) -> Dict[str, str]:
+        """investor_id -> recipient code for each recipient Paystack created (or already had)."""
+        result = self.paystack.create_transfer_recipients(recipients)
+        if not result.get('status'):
+            raise RuntimeError(result.get('message'))
+        by_account = {(r['account_number'], r['bank_code']): r['metadata']['investor_id'] for r in recipients}
+        codes = {}
+        for created in result['data'].get('success') or []:
+            details = created.get('details') or {}
+            investor_id = by_account.get((details.get('account_number'), details.get('bank_code')))
+            if investor_id and created.get('recipient_code'):
+                codes[investor_id] = created['recipient_code']
+        return codes
+
+    def bulk_transfer(self, transfers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """reference -> Paystack's transfer entry, for the transfers it accepted."""
+        result = self.paystack.bulk_transfer(transfers)
+        if not result.get('status'):
+            raise RuntimeError(result.get('message'))
+        return {t['reference']: t for t in result['data'] if t.get('reference')}
+
+
+class FakePayoutProvider:
+    """
+    In-memory provider for local runs. Only banks in BANK_CODES are known,
+    and accounts in `fail_accounts` are refused.
+    """
+
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.recipients: Dict[str, Dict[str, Any]] = {}
+        self.fail_accounts: set = set()
+
+    def bank_code(self, bank_name: Optional[str]) -> Optional[str]:
+        return BANK_CODES.get(_bank_key(bank_name))
+
+    def create_recipients(self, recipients: List[Dict[str, Any]]) -> Dict[str, str]:
+        codes = {}
+        for r in recipients:
+            code = f"RCP_{r['account_number']}"
+            self.recipients[code] = r
+            codes[r['metadata']['investor_id']] = code
+        return codes
+
+    def bulk_transfer(self, transfers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        self.batches.append(transfers)
+        return {
+            t['reference']: {**t, 'transfer_code': f"TRF_{t['reference']}", 'status': 'success'}
+            for t in transfers
+            if self.recipients.get(t['recipient'], {}).get('account_number') not in self.fail_accounts
+        }
+
+
+class WithdrawalPayoutService:
+    """Starts bulk approval runs and keeps the latest PAYOUT_RUNS_KEEP in memory."""
+
+    def __init__(self, provider=None):
+        self.supabase = LazyClient('SUPABASE_SERVICE_ROLE_KEY')
+        self._provider = provider
+        self._runs: 'OrderedDict[int, PayoutRun]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            if settings.PAYOUT_PROVIDER == 'fake':
+                self._provider = FakePayoutProvider()
+            else:
+                self._provider = PaystackPayoutProvider()
+        return self._provider
+
+    # -- Runs --------------------------------------------------------------
+
+    def start(self, transaction_ids: List[str], requested_by: Optional[str] = None) -> PayoutRun:
+        """Queue a run for the given withdrawals and process it on a background thread."""
+        items = OrderedDict((tid, PayoutItem(tid)) for tid in dict.fromkeys(transaction_ids))
+        run = PayoutRun(next(self._ids), requested_by, items)
+        with self._lock:
+            self._runs[run.id] = run
+            finished = [r.id for r in self._runs.values() if r.finished_at]
+            while len(self._runs) > settings.PAYOUT_RUNS_KEEP and finished:
+                del self._runs[finished.pop(0)]
+        logger.info(f"Payout run {run.id} queued by {requested_by}: {len(items)} withdrawals")
+        threading.Thread(target=self.process, args=(run,), name=f'payout-run-{run.id}', daemon=True).start()
+        return run
+
+    def get(self, run_id: int) -> Optional[PayoutRun]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            runs = list(self._runs.values())
+        return [run.summary() for run in reversed(runs)]
+
+    def process(self, run: PayoutRun) -> None:
+        try:
+            run.stage = 'validating'
+            payable = self._validate(run)
+            run.stage = 'creating recipients'
+            payable = self._ensure_recipients(run, payable)
+            run.stage = 'paying'
+            for chunk in _chunks(payable, max(1, settings.PAYOUT_CHUNK_SIZE)):
+                self._pay_chunk(run, chunk)
+            run.stage = 'finished'
+        except Exception as e:
+            logger.exception(f"Payout run {run.id} stopped: {str(e)}")
+            run.stage = 'failed'
+            run.error = str(e)
+            for item in run.items.values():
+                if not item.outcome:
+                    run.finish(item, REJECTED, f'Run stopped: {str(e)}')
+        finally:
+            run.finished_at = datetime.utcnow().isoformat()
+            logger.info(f"Payout run {run.id} {run.stage}: {run.summary()['outcomes']}")
+
+    # -- Stages ------------------------------------------------------------
+
+    def _validate(self, run: PayoutRun) -> List[Dict[str, Any]]:
+        """Withdrawals that can be paid, each with its investor row."""
+        response = self.supabase.table('transactions') \
+            .select('transaction_id, investor_id, amount, transaction_type, withdraw_status') \
+            .in_('transaction_id', list(run.items)) \
+            .execute()
+        withdrawals = {row['transaction_id']: row for row in getattr(response, 'data', None) or []}
+
+        investor_ids = list({row['investor_id'] for row in withdrawals.values() if row.get('investor_id')})
+        investors = {}
+        if investor_ids:
+            response = self.supabase.table('investors') \
+                .select('id, first_name, surname, bank_name, bank_account_name, bank_account_number, '
+                        'paystack_recipient_code, portfolio_type, investment_type, initial_investment, created_at') \
+                .in_('id', investor_ids) \
+                .execute()
+            investors = {row['id']: row for row in getattr(response, 'data', None) or []}
+
+        payable = []
+        for transaction_id, item in run.items.items():
+            row = withdrawals.get(transaction_id)
+            if row is None:
+                run.finish(item, REJECTED, 'Transaction not found')
+                continue
+            item.investor_id = row.get('investor_id')
+            item.amount = float(row.get('amount') or 0)
+            investor = investors.get(item.investor_id)
+            if row.get('transaction_type') != 'withdrawal':
+                run.finish(item, REJECTED, 'Not a withdrawal')
+            elif row.get('withdraw_status') != 'pending':
+                run.finish(item, REJECTED, f"Withdrawal is {row.get('withdraw_status')}, not pending")
+            elif item.amount <= 0:
+                run.finish(item, REJECTED, 'Withdrawal amount must be positive')
+            elif investor is None:
+                run.finish(item, REJECTED, 'Investor not found')
+            elif not investor.get('paystack_recipient_code') and not (
+                    investor.get('bank_account_number') and investor.get('bank_name')):
+                run.finish(item, REJECTED, 'Investor has no bank details')
+            else:
+                payable.append({'item': item, 'investor': investor})
+        return payable
+
+    def _ensure_recipients(self, run: PayoutRun, payable: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Give every payable investor a recipient code, creating the missing ones in one request."""
+        missing: Dict[str, Dict[str, Any]] = {}
+        unknown_bank = set()
+        for entry in payable:
+            investor = entry['investor']
+            if investor.get('paystack_recipient_code') or investor['id'] in missing or investor['id'] in unknown_bank:
+                continue
+            bank_code = self.provider.bank_code(investor.get('bank_name'))
+            if bank_code is None:
+                unknown_bank.add(investor['id'])
+                continue
+            name = investor.get('bank_account_name') or f"{investor.get('first_name', '')} {investor.get('surname', '')}"
+            missing[investor['id']] = {
+                'name': name.strip(),
+                'account_number': investor['bank_account_number'],
+                'bank_code': bank_code,
+                'metadata': {'investor_id': investor['id']},
+            }
+
+        codes = self.provider.create_recipients(list(missing.values())) if missing else {}
+        for investor_id, code in codes.items():
+            # One write per investor, the first time they are paid
+            self.supabase.table('investors').update({'paystack_recipient_code': code}).eq('id', investor_id).execute()
+
+        ready = []
+        for entry in payable:
+            investor = entry['investor']
+            if not investor.get('paystack_recipient_code'):
+                investor['paystack_recipient_code'] = codes.get(investor['id'])
+            if investor['paystack_recipient_code']:
+                ready.append(entry)
+            elif investor['id'] in unknown_bank:
+                run.finish(entry['item'], REJECTED, f"Unknown bank: {investor.get('bank_name')}")
+            else:
+                run.finish(entry['item'], REJECTED, 'Paystack did not create a transfer recipient')
+        return ready
+
+    def _pay_chunk(self, run: PayoutRun, chunk: List[Dict[str, Any]]) -> None:
+        by_id = {entry['item'].transaction_id: entry for entry in chunk}
+
+        # Claim: only rows still pending move to processing, and only those are paid
+        response = self.supabase.table('transactions') \
+            .update({'withdraw_status': 'processing', 'updated_at': datetime.utcnow().isoformat()}) \
+            .in_('transaction_id', list(by_id)) \
+            .eq('withdraw_status', 'pending') \
+            .execute()
+        claimed_ids = {row['transaction_id'] for row in getattr(response, 'data', None) or []}
+        claimed = []
+        for transaction_id, entry in by_id.items():
+            if transaction_id in claimed_ids:
+                claimed.append(entry)
+            else:
+                run.finish(entry['item'], REJECTED, 'No longer pending')
+        if not claimed:
+            return
+
+        transfers = [{
+            'amount': int(round(entry['item'].amount * 100)),
+            'recipient': entry['investor']['paystack_recipient_code'],
+            'reference': transfer_reference(entry['item'].transaction_id),
+            'reason': f"Withdrawal {entry['item'].transaction_id}",
+        } for entry in claimed]
+        try:
+            accepted = self.provider.bulk_transfer(transfers)
+        except Exception as e:
+            self._release(run, claimed, f'Transfer not initiated: {str(e)}')
+            return
+
+        paid, refused = [], []
+        for entry in claimed:
+            transfer = accepted.get(transfer_reference(entry['item'].transaction_id))
+            if transfer is None or transfer.get('status') in ('failed', 'reversed'):
+                refused.append(entry)
+            else:
+                entry['item'].transfer_code = transfer.get('transfer_code')
+                entry['transfer_status'] = transfer.get('status')
+                paid.append(entry)
+        if refused:
+            self._release(run, refused, 'Transfer refused by Paystack')
+        if paid:
+            self._settle(run, paid)
+
+    def _settle(self, run: PayoutRun, paid: List[Dict[str, Any]]) -> None:
+        from .portfolio_service import PortfolioService
+        from .transaction_service import TransactionService
+        transactions = TransactionService()
+        portfolio_service = PortfolioService()
+
+        amount_due: Dict[str, Optional[float]] = {}
+        payload = []
+        for entry in paid:
+            investor = entry['investor']
+            if investor['id'] not in amount_due:
+                calc = transactions.amount_due_for(investor, portfolio_service)
+                if not calc['success']:
+                    # Settled without touching the investor's amount-due rows
+                    logger.warning(f"Payout run {run.id}: no amount due for investor {investor['id']}: {calc.get('error')}")
+                amount_due[investor['id']] = calc.get('amount_due')
+            payload.append({
+                'transaction_id': entry['item'].transaction_id,
+                'amount_due': amount_due[investor['id']],
+                'transfer_code': entry['item'].transfer_code,
+                'transfer_status': entry['transfer_status'],
+            })
+
+        try:
+            response = self.supabase.rpc('settle_withdrawals', {'p_items': payload}).execute()
+            results = {r['transaction_id']: r for r in getattr(response, 'data', None) or []}
+        except Exception as e:
+            logger.error(f"Payout run {run.id}: settling {len(paid)} paid withdrawals failed: {str(e)}")
+            results = {}
+
+        from .notification_writer import notification_writer
+        for entry in paid:
+            item = entry['item']
+            result = results.get(item.transaction_id)
+            if result is None or not result.get('success'):
+                error = (result or {}).get('error') or 'Settlement did not run'
+                run.finish(item, SETTLE_FAILED, f'Paid ({item.transfer_code}) but not settled: {error}')
+            elif result.get('already_sent'):
+                run.finish(item, ALREADY_SENT)
+            else:
+                run.finish(item, SENT)
+                notification_writer.add_generated(NotificationService.generate_withdrawal_completed_notification(
+                    investor_id=item.investor_id,
+                    amount=item.amount
+                ))
+        invalidate_payment_totals()
+
+    def _release(self, run: PayoutRun, entries: List[Dict[str, Any]], reason: str) -> None:
+        """Put withdrawals that were not paid back to pending, one update for the group."""
+        try:
+            self.supabase.table('transactions') \
+                .update({'withdraw_status': 'pending', 'failure_reason': reason,
+                         'updated_at': datetime.utcnow().isoformat()}) \
+                .in_('transaction_id', [entry['item'].transaction_id for entry in entries]) \
+                .eq('withdraw_status', 'processing') \
+                .execute()
+        except Exception as e:
+            logger.error(f"Payout run {run.id}: could not release {len(entries)} unpaid withdrawals: {str(e)}")
+            reason = f'{reason}; still marked processing: {str(e)}'
+        for entry in entries:
+            run.finish(entry['item'], TRANSFER_FAILED, reason)
+
+
+withdrawal_payout_service = WithdrawalPayoutService()
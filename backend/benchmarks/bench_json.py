@@ -0,0 +1,123 @@
+"""
+Benchmark: JSON encoding of the heavy route payloads.
+
+Payloads are built by the real services against the in-memory fake Supabase
+(benchmarks/fake_supabase.py), then encoded two ways:
+
+    default  FastAPI's path for a returned dict: jsonable_encoder + json.dumps
+    fast     app.core.responses.dumps (orjson when installed)
+
+and compressed with the gzip level FastJSONResponse uses. Reports median
+encode time and bytes on the wire, raw and gzipped, per payload.
+
+Usage (from backend/):
+    python benchmarks/bench_json.py --investors 2000 --transactions 20 --iterations 50
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeDatabase, install, seed_database  # noqa: E402
+
+
+def default_encode(payload: Any) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    # Same arguments as starlette.responses.JSONResponse.render
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def timed(call: Callable[[], Any], iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def build_payloads(seeded: Dict, rng: random.Random) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.admin_service import AdminService
+    from app.services.dashboard import DashboardService
+
+    client = TestClient(app)
+    token = rng.choice(seeded['session_tokens'])
+    admin = AdminService()
+
+    def route(path: str) -> Any:
+        return client.get(path, headers={'Authorization': f'Bearer {token}'}).json()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            'dashboard_data': DashboardService().get_dashboard_data(token),
+            'portfolio_goals': route('/api/v1/portfolio/goals-data'),
+            'portfolio_analytics': route('/api/v1/portfolio/analytics-data'),
+            'admin_investors_200': admin.get_all_investors(limit=200),
+            'admin_payments_200': admin.get_payments_summary(limit=200),
+            'admin_portfolio_200': admin.get_portfolio_details(limit=200),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--investors', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=8, help='transactions per investor')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', help='also write results to this file')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    db = FakeDatabase()
+    seeded = seed_database(db, args.investors, args.transactions, 0.05, args.seed)
+    install(db)
+
+    from app.core import responses
+    from app.core.config import settings
+
+    payloads = build_payloads(seeded, random.Random(args.seed))
+    encoder = 'orjson' if responses.orjson is not None else 'json (orjson not installed)'
+    print(f"fast encoder: {encoder}, gzip level {settings.JSON_GZIP_LEVEL}, "
+          f"threshold {settings.JSON_GZIP_MIN_BYTES} bytes\n")
+    print(f"{'payload':<22}{'default ms':>12}{'fast ms':>10}{'speedup':>9}{'raw KB':>10}{'gzip KB':>10}{'gzip ms':>9}")
+
+    results = {}
+    for name, payload in payloads.items():
+        body = responses.dumps(payload)
+        compressed = gzip.compress(body, compresslevel=settings.JSON_GZIP_LEVEL)
+        default_ms = timed(lambda: default_encode(payload), args.iterations)
+        fast_ms = timed(lambda: responses.dumps(payload), args.iterations)
+        gzip_ms = timed(lambda: gzip.compress(body, compresslevel=settings.JSON_GZIP_LEVEL), args.iterations)
+        results[name] = {
+            'default_ms': round(default_ms, 3),
+            'fast_ms': round(fast_ms, 3),
+            'gzip_ms': round(gzip_ms, 3),
+            'default_bytes': len(default_encode(payload)),
+            'raw_bytes': len(body),
+            'gzip_bytes': len(compressed),
+        }
+        print(f"{name:<22}{default_ms:>12.3f}{fast_ms:>10.3f}{default_ms / fast_ms if fast_ms else 0:>8.1f}x"
+              f"{len(body) / 1024:>10.1f}{len(compressed) / 1024:>10.1f}{gzip_ms:>9.3f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'config': vars(args), 'encoder': encoder, 'results': results}, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
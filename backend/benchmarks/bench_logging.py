@@ -0,0 +1,121 @@
+"""
+Benchmark: cost of a log call on the calling thread.
+
+Compares, with several threads logging at once (as request handlers do):
+
+    print    f-string print() to the sink, what the hot paths used to do
+    sync     a StreamHandler on the root logger, formatting and writing inline
+    queue    app.core.logging_config: enqueue only; JSON formatting and the
+             write happen on the listener thread
+
+The sink is a file (default /dev/null) written with a flush per line, like
+a line-buffered terminal; --write-delay-ms adds a sleep per write to model
+a slow consumer (a terminal, a pipe to a log shipper). Reports p50/p99 of
+the per-call latency seen by the caller.
+
+Usage (from backend/):
+    python benchmarks/bench_logging.py --threads 8 --records 2000 --write-delay-ms 0.05
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_services import percentile  # noqa: E402
+
+
+class SlowSink:
+    """File wrapper that sleeps on every write."""
+
+    def __init__(self, path: str, delay: float):
+        self.file = open(path, 'w')
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def run_threads(call: Callable[[int], None], threads: int, records: int) -> List[float]:
+    samples: List[float] = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for i in range(records):
+            started = time.perf_counter()
+            call(i)
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            samples.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--records', type=int, default=2000, help='log calls per thread')
+    parser.add_argument('--sink', default=os.devnull)
+    parser.add_argument('--write-delay-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    from app.core import logging_config
+    from app.core.config import settings
+
+    sink = SlowSink(args.sink, args.write_delay_ms / 1000)
+    root = logging.getLogger()
+    logger = logging.getLogger('app.bench')
+    values = {'investor_id': 'c0ffee', 'weeks_elapsed': 12, 'weekly_interest': 1234.5}
+
+    def with_print(i: int) -> None:
+        print(f"DEBUG: investor_id={values['investor_id']} weeks_elapsed={values['weeks_elapsed']} i={i}",
+              file=sink, flush=True)
+
+    def with_logger(i: int) -> None:
+        logger.info("Analytics timeline %d", i, extra=values)
+
+    results = {}
+    results['print'] = run_threads(with_print, args.threads, args.records)
+
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging_config.JSONFormatter())
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+    results['sync'] = run_threads(with_logger, args.threads, args.records)
+
+    root.handlers[:] = []
+    settings.LOG_QUEUE_SIZE = args.threads * args.records + 1
+    with contextlib.redirect_stdout(sink):
+        logging_config.setup_logging(stream=sink)
+        started = time.perf_counter()
+        results['queue'] = run_threads(with_logger, args.threads, args.records)
+        enqueued = time.perf_counter() - started
+        logging_config.shutdown_logging()
+        drained = time.perf_counter() - started
+
+    print(f"{args.threads} threads x {args.records} records, write delay {args.write_delay_ms} ms\n")
+    print(f"{'mode':<8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode, samples in results.items():
+        print(f"{mode:<8}{percentile(samples, 50):>10.4f}{percentile(samples, 99):>10.4f}{max(samples):>10.3f}")
+    print(f"\nqueue: callers done after {enqueued * 1000:.0f} ms, listener drained after {drained * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
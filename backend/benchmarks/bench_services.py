@@ -0,0 +1,153 @@
+"""
+Benchmark: dashboard, portfolio analytics, admin views and the interest job
+against the in-memory fake Supabase (benchmarks/fake_supabase.py).
+
+Requests go through the real FastAPI app (routes, services, middleware), so
+the numbers include the app's own query pattern. Each Supabase round trip
+can be given a simulated latency with --rtt-ms; with the default of 0 the
+timings show local CPU cost only and the query counts carry the signal.
+
+Reports p50/p95/p99 latency and Supabase queries per call for each scenario.
+
+Usage (from backend/):
+    python benchmarks/bench_services.py --investors 2000 --iterations 50 --rtt-ms 2
+    python benchmarks/bench_services.py --scenarios dashboard,admin_investors --json bench.json
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeDatabase, install, seed_database  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(db: FakeDatabase, call: Callable[[], None], iterations: int,
+            before: Callable[[], None] = None, after: Callable[[], None] = None) -> Dict[str, float]:
+    latencies, queries = [], []
+    for _ in range(iterations):
+        if before:
+            before()
+        start_queries = db.query_count
+        started = time.perf_counter()
+        # The app prints liberally; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(db.query_count - start_queries)
+        if after:
+            after()
+    return {
+        'calls': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries_per_call': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def build_scenarios(db: FakeDatabase, seeded: Dict[str, List[str]], rng: random.Random) -> Dict[str, Dict]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.interest_calculation_service import InterestCalculationService
+
+    client = TestClient(app)
+    tokens = seeded['session_tokens']
+
+    def get(path: str) -> Callable[[], None]:
+        def call() -> None:
+            response = client.get(path, headers={'Authorization': f'Bearer {rng.choice(tokens)}'})
+            if response.status_code >= 500:
+                raise RuntimeError(f'{path}: {response.status_code} {response.text[:200]}')
+        return call
+
+    snapshot = {}
+
+    def save_tables() -> None:
+        snapshot['tables'] = copy.deepcopy(db.tables)
+
+    def restore_tables() -> None:
+        db.tables = snapshot.pop('tables')
+
+    return {
+        'dashboard': {'call': get('/api/v1/dashboard/data')},
+        'portfolio_analytics': {'call': get('/api/v1/portfolio/analytics-data')},
+        'admin_investors': {'call': get('/api/v1/admin/investors?limit=50')},
+        'admin_payments': {'call': get('/api/v1/admin/payments?limit=50')},
+        'admin_portfolio': {'call': get('/api/v1/admin/portfolio?limit=50')},
+        'admin_pending_withdrawals': {'call': get('/api/v1/admin/pending-withdrawals')},
+        'admin_missed_payments': {'call': get('/api/v1/admin/missed-payments-summary')},
+        # Mutates the book, so every run starts from the same seeded state.
+        'interest_job': {
+            'call': lambda: InterestCalculationService().check_and_process_all_due_dates(),
+            'before': save_tables,
+            'after': restore_tables,
+            'iterations': 'job',
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--investors', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=8, help='transactions per investor')
+    parser.add_argument('--due-fraction', type=float, default=0.05, help='share of investors due today')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--job-iterations', type=int, default=3, help='runs of the interest job')
+    parser.add_argument('--rtt-ms', type=float, default=0.0, help='simulated latency per Supabase call')
+    parser.add_argument('--scenarios', default='all', help='comma-separated scenario names')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', help='also write results to this file')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    db = FakeDatabase(latency_seconds=args.rtt_ms / 1000)
+    seeded = seed_database(db, args.investors, args.transactions, args.due_fraction, args.seed)
+    install(db)
+
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(db, seeded, rng)
+    selected = list(scenarios) if args.scenarios == 'all' else [s.strip() for s in args.scenarios.split(',')]
+    unknown = [s for s in selected if s not in scenarios]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    print(f"{args.investors} investors, {args.investors * args.transactions} transactions, "
+          f"{args.rtt_ms} ms simulated round trip\n")
+    print(f"{'scenario':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'queries':>10}")
+
+    results = {}
+    for name in selected:
+        scenario = scenarios[name]
+        iterations = args.job_iterations if scenario.get('iterations') == 'job' else args.iterations
+        result = measure(db, scenario['call'], iterations, scenario.get('before'), scenario.get('after'))
+        results[name] = result
+        print(f"{name:<28}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['mean_ms']:>10.2f}{result['queries_per_call']:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
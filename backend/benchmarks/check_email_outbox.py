@@ -0,0 +1,108 @@
+"""
+Durability check for the email outbox, using FakeEmailProvider and the fake Supabase.
+
+The outbox writes to the email_outbox table of benchmarks/fake_supabase.py
+through the real SupabaseDeliveryLog, and this script asserts that:
+
+- every enqueued message is accepted exactly once, in batches, with the
+  provider's bulk id recorded and the template payload cleared afterwards;
+- batches that fail are retried with backoff and end up accepted;
+- messages left waiting by a process that died without stop() are reloaded
+  and sent by the next outbox started on the same table;
+- a message that keeps failing ends 'failed' after max_attempts.
+
+Usage (from backend/):
+    python benchmarks/check_email_outbox.py --messages 200
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeDatabase, install  # noqa: E402
+
+
+def outbox_rows(db: FakeDatabase):
+    return {r['id']: r for r in db.tables.get('email_outbox', [])}
+
+
+def check(label: str, condition: bool, failures: list) -> None:
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        failures.append(label)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    db = FakeDatabase()
+    install(db)
+
+    from app.services.email_outbox_service import EmailOutbox, FakeEmailProvider, SupabaseDeliveryLog
+
+    failures = []
+    outbox_args = dict(batch_size=args.batch_size, max_attempts=3, rate_per_second=100000,
+                       backoff_base_seconds=0.01, poll_interval_seconds=0.01)
+
+    # Delivery with two simulated provider outages
+    provider = FakeEmailProvider()
+    provider.fail_next = 2
+    outbox = EmailOutbox(provider=provider, delivery_log=SupabaseDeliveryLog(), **outbox_args)
+    ids = [outbox.enqueue('password_reset', f'user{i}@example.com', {'reset_code': f'{i:06d}'})
+           for i in range(args.messages)]
+    check('enqueue persists each message before sending', len(outbox_rows(db)) == args.messages, failures)
+    deadline_ok = outbox.flush(timeout=10)
+    while outbox.pending_count():
+        outbox.flush(timeout=1)
+    outbox.stop()
+    rows = outbox_rows(db)
+    check('queue drained', deadline_ok and outbox.pending_count() == 0, failures)
+    check('every message accepted exactly once',
+          sorted(m.id for m in provider.sent) == sorted(ids)
+          and all(rows[i]['status'] == 'accepted' for i in ids), failures)
+    check('bulk id recorded', all(rows[i]['provider_id'] for i in ids), failures)
+    check('payload cleared once accepted', all(rows[i]['payload'] is None for i in ids), failures)
+    check(f'sent in batches of at most {args.batch_size}', max(provider.batches) <= args.batch_size, failures)
+
+    # A process dies with messages queued: they must survive in the table
+    crashed = EmailOutbox(provider=FakeEmailProvider(), delivery_log=SupabaseDeliveryLog(), **outbox_args)
+    crashed.start = lambda: None  # the sender never runs, as if the process died right after enqueue
+    orphaned = [crashed.enqueue('account_deletion', f'gone{i}@example.com') for i in range(10)]
+    check('orphaned messages stay queued', all(outbox_rows(db)[i]['status'] == 'queued' for i in orphaned), failures)
+
+    provider = FakeEmailProvider()
+    restarted = EmailOutbox(provider=provider, delivery_log=SupabaseDeliveryLog(), **outbox_args)
+    restarted.start()
+    restarted.flush(timeout=5)
+    restarted.stop()
+    rows = outbox_rows(db)
+    check('restart reloads and sends orphaned messages',
+          sorted(m.id for m in provider.sent) == sorted(orphaned)
+          and all(rows[i]['status'] == 'accepted' for i in orphaned), failures)
+
+    # Permanent failure
+    provider = FakeEmailProvider()
+    provider.fail_next = 10
+    failing = EmailOutbox(provider=provider, delivery_log=SupabaseDeliveryLog(), **outbox_args)
+    doomed = failing.enqueue('password_reset_success', 'doomed@example.com')
+    for _ in range(100):
+        if outbox_rows(db)[doomed]['status'] == 'failed':
+            break
+        time.sleep(0.02)
+    failing.stop()
+    row = outbox_rows(db)[doomed]
+    check('gives up after max_attempts', row['status'] == 'failed' and row['attempts'] == 3, failures)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
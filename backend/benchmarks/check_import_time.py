@@ -0,0 +1,116 @@
+"""
+Check: import time of app.main against a budget.
+
+The desktop bundle (run.py) imports app.main before it can open its window,
+so everything imported at module level is startup latency. This runs
+
+    python -X importtime -c "import app.main"
+
+in fresh interpreters, takes the median total across runs, and fails when
+it exceeds the budget or when any module that is meant to load on first use
+(the SDKs listed in DEFERRED) was imported eagerly. The slowest packages
+and app modules are printed either way so a regression points at its cause.
+
+-X importtime adds its own overhead, so budgets are only comparable between
+runs on the same machine.
+
+Usage (from backend/):
+    python benchmarks/check_import_time.py --budget-ms 1500 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use by the services that need them; never by app.main
+DEFERRED = ('pypaystack2', 'authlib', 'mailersend')
+
+# (self us, cumulative us, depth, module name)
+Entry = Tuple[int, int, int, str]
+
+
+def import_profile(module: str) -> List[Entry]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def total_ms(entries: List[Entry]) -> float:
+    # Top-level entries' cumulative times cover every import exactly once
+    return sum(cumulative for _, cumulative, depth, _ in entries if depth == 0) / 1000
+
+
+def slowest_packages(entries: List[Entry], count: int) -> List[Tuple[str, float]]:
+    by_package: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in entries:
+        if not name.startswith('app.'):
+            by_package[name.split('.')[0]] += self_us
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return [(name, us / 1000) for name, us in ranked[:count]]
+
+
+def slowest_app_modules(entries: List[Entry], count: int) -> List[Tuple[str, float, float]]:
+    app_entries = [e for e in entries if e[3].startswith('app.') and e[3] != 'app.main']
+    ranked = sorted(app_entries, key=lambda e: e[1], reverse=True)
+    return [(name, self_us / 1000, cumulative / 1000) for self_us, cumulative, _, name in ranked[:count]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--budget-ms', type=float, default=1500.0)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [total_ms(entries) for entries in profiles]
+    median = statistics.median(totals)
+    # Report the run closest to the median
+    entries = min(zip(totals, profiles), key=lambda pair: abs(pair[0] - median))[1]
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms\n")
+    print(f"{'package':<32}{'self ms':>10}")
+    for name, ms in slowest_packages(entries, args.top):
+        print(f"{name:<32}{ms:>10.1f}")
+    print(f"\n{'app module':<48}{'self ms':>10}{'cumul ms':>10}")
+    for name, self_ms, cumulative_ms in slowest_app_modules(entries, args.top):
+        print(f"{name:<48}{self_ms:>10.1f}{cumulative_ms:>10.1f}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    imported = {name for _, _, _, name in entries}
+    for package in DEFERRED:
+        if package in imported:
+            failures.append(f"{package} is imported at startup; import it where it is first used")
+
+    if failures:
+        print('\nFAIL')
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print('\nOK')
+
+
+if __name__ == '__main__':
+    main()
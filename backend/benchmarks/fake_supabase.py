@@ -0,0 +1,892 @@
+"""
+In-memory stand-in for the supabase-py client, for offline benchmarks.
+
+Implements the subset of the postgrest query builder the app uses:
+
+    client.table(name)
+        .select(columns, count=...) / .insert(rows) / .update(values)
+        / .upsert(rows, on_conflict=...) / .delete()
+        .eq .neq .gt .gte .lt .lte .in_ .like .ilike .is_ .or_ .not_
+        .order(column, desc=...) .limit(n) .range(start, end)
+        .single() .maybe_single()
+        .execute()
+    client.rpc(name, params).execute()
+
+Rows live in plain lists of dicts. Views and RPCs are Python callables
+registered on the FakeDatabase, and generated columns (e.g. investors.search_text)
+are recomputed on every write. Unique violations raise postgrest's APIError
+with code 23505, as PostgREST would. Version columns (investors, spending_accounts,
+user_points) are bumped on every update, as the bump_row_version trigger does.
+
+Every execute() counts as one round trip: it is tallied on the database,
+reported to app.core.query_stats (so Server-Timing and query budgets work
+against the fake), and can sleep for a simulated network latency.
+
+`install(db)` points every create_client / module-level client in the app
+at the fake; `seed_database()` fills it with synthetic users, sessions,
+investors and transactions.
+"""
+
+import copy
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from postgrest.exceptions import APIError
+except Exception:  # pragma: no cover - postgrest ships with supabase
+    class APIError(Exception):
+        def __init__(self, error: Dict[str, Any]):
+            super().__init__(error.get('message'))
+            self.message = error.get('message')
+            self.code = error.get('code')
+            self.details = error.get('details')
+            self.hint = error.get('hint')
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self) -> str:
+        return f"FakeResponse(data={self.data!r}, count={self.count!r})"
+
+
+# ----------------------------------------------------------------------------
+# Value comparison with SQL-ish NULL semantics
+# ----------------------------------------------------------------------------
+
+def _coerce(filter_value: Any, row_value: Any) -> Any:
+    """Convert a filter value to the row value's type where PostgREST would."""
+    if isinstance(filter_value, str):
+        if filter_value == 'null':
+            return None
+        if isinstance(row_value, bool):
+            return filter_value.lower() in ('true', 't', '1')
+        if isinstance(row_value, (int, float)) and not isinstance(row_value, bool):
+            try:
+                return float(filter_value)
+            except ValueError:
+                return filter_value
+    if isinstance(row_value, str) and not isinstance(filter_value, str) and filter_value is not None:
+        if isinstance(filter_value, bool):
+            return filter_value
+        return str(filter_value) if isinstance(filter_value, (date, datetime)) else filter_value
+    return filter_value
+
+
+def _compare(row_value: Any, op: str, value: Any) -> Optional[bool]:
+    if op == 'is':
+        target = None if str(value).lower() == 'null' else str(value).lower() == 'true'
+        return row_value is target if target is None else row_value == target
+    if row_value is None:
+        return None
+    if op == 'in':
+        return any(row_value == _coerce(v, row_value) for v in value)
+    if op in ('like', 'ilike'):
+        return _pattern(str(value), op == 'ilike').match(str(row_value)) is not None
+    value = _coerce(value, row_value)
+    if value is None:
+        return None
+    try:
+        if isinstance(row_value, str) and not isinstance(value, str):
+            value = str(value)
+        if not isinstance(row_value, str) and isinstance(value, str):
+            row_value = str(row_value)
+        return {
+            'eq': row_value == value, 'neq': row_value != value,
+            'gt': row_value > value, 'gte': row_value >= value,
+            'lt': row_value < value, 'lte': row_value <= value,
+        }[op]
+    except TypeError:
+        return None
+
+
+_PATTERN_CACHE: Dict[tuple, 're.Pattern'] = {}
+
+
+def _pattern(like: str, insensitive: bool) -> 're.Pattern':
+    key = (like, insensitive)
+    compiled = _PATTERN_CACHE.get(key)
+    if compiled is None:
+        out, i = [], 0
+        while i < len(like):
+            char = like[i]
+            if char == '\\' and i + 1 < len(like):
+                out.append(re.escape(like[i + 1]))
+                i += 2
+                continue
+            out.append('.*' if char in '%*' else '.' if char == '_' else re.escape(char))
+            i += 1
+        compiled = re.compile('^' + ''.join(out) + '$', re.DOTALL | (re.IGNORECASE if insensitive else 0))
+        _PATTERN_CACHE[key] = compiled
+    return compiled
+
+
+# ----------------------------------------------------------------------------
+# PostgREST `or` filter syntax
+# ----------------------------------------------------------------------------
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append(''.join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _parse_condition(text: str) -> Callable[[Dict[str, Any]], Optional[bool]]:
+    text = text.strip()
+    for combinator in ('and', 'or'):
+        for prefix, negate in ((f'not.{combinator}(', True), (f'{combinator}(', False)):
+            if text.startswith(prefix) and text.endswith(')'):
+                children = [_parse_condition(p) for p in _split_top_level(text[len(prefix):-1])]
+                group = _all if combinator == 'and' else _any
+                return (lambda row: _negate(group(children, row))) if negate else (lambda row: group(children, row))
+    column, rest = text.split('.', 1)
+    negate = rest.startswith('not.')
+    if negate:
+        rest = rest[4:]
+    op, value = rest.split('.', 1)
+    if op == 'in':
+        value = [_unquote(v) for v in _split_top_level(value.strip('()'))]
+    else:
+        value = _unquote(value)
+    predicate = _column_predicate(column, op, value)
+    return (lambda row: _negate(predicate(row))) if negate else predicate
+
+
+def _column_predicate(column: str, op: str, value: Any) -> Callable[[Dict[str, Any]], Optional[bool]]:
+    return lambda row: _compare(row.get(column), op, value)
+
+
+def _negate(result: Optional[bool]) -> Optional[bool]:
+    return None if result is None else not result
+
+
+def _all(children, row) -> Optional[bool]:
+    results = [c(row) for c in children]
+    if any(r is False for r in results):
+        return False
+    return None if any(r is None for r in results) else True
+
+
+def _any(children, row) -> Optional[bool]:
+    results = [c(row) for c in children]
+    if any(r is True for r in results):
+        return True
+    return None if any(r is None for r in results) else False
+
+
+# ----------------------------------------------------------------------------
+# Database
+# ----------------------------------------------------------------------------
+
+class FakeDatabase:
+    """Tables, views, RPCs and round-trip accounting shared by every fake client."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.views: Dict[str, Callable[['FakeDatabase'], List[Dict[str, Any]]]] = {}
+        self.rpcs: Dict[str, Callable[['FakeDatabase', Dict[str, Any]], Any]] = {}
+        self.generated: Dict[str, Dict[str, Callable[[Dict[str, Any]], Any]]] = {}
+        self.unique: Dict[str, List[str]] = {}
+        self.versioned: Dict[str, str] = {}
+        self.queries: Counter = Counter()
+        self.lock = threading.RLock()
+
+    # -- schema ---------------------------------------------------------------
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        if table in self.views:
+            return self.views[table](self)
+        return self.tables.setdefault(table, [])
+
+    def register_view(self, name: str, builder: Callable[['FakeDatabase'], List[Dict[str, Any]]]) -> None:
+        self.views[name] = builder
+
+    def register_rpc(self, name: str, handler: Callable[['FakeDatabase', Dict[str, Any]], Any]) -> None:
+        self.rpcs[name] = handler
+
+    def generated_column(self, table: str, column: str, compute: Callable[[Dict[str, Any]], Any]) -> None:
+        self.generated.setdefault(table, {})[column] = compute
+
+    def unique_columns(self, table: str, *columns: str) -> None:
+        self.unique[table] = list(columns)
+
+    def version_column(self, table: str, column: str = 'version') -> None:
+        """Bump `column` on every update of `table`, like the bump_row_version trigger."""
+        self.versioned[table] = column
+
+    def bump_version(self, table: str, row: Dict[str, Any]) -> None:
+        column = self.versioned.get(table)
+        if column:
+            row[column] = (row.get(column) or 0) + 1
+
+    # -- accounting -----------------------------------------------------------
+    @property
+    def query_count(self) -> int:
+        return sum(self.queries.values())
+
+    def reset_counts(self) -> None:
+        self.queries.clear()
+
+    def round_trip(self, table: str, operation: str, shape: str, started: float) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.queries[(table, operation)] += 1
+        try:
+            from app.core import query_stats, metrics
+            stats = query_stats.current_stats()
+            if stats is not None:
+                stats.record(shape, elapsed)
+            metrics.SUPABASE_CALL_DURATION.observe(elapsed, table, operation)
+        except Exception:
+            pass
+
+    # -- writes ---------------------------------------------------------------
+    def prepare_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        row.setdefault('id', str(uuid.uuid4()))
+        now = datetime.now(timezone.utc).isoformat()
+        row.setdefault('created_at', now)
+        row.setdefault('updated_at', now)
+        if table in self.versioned:
+            row.setdefault(self.versioned[table], 0)
+        return self.apply_generated(table, row)
+
+    def apply_generated(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        for column, compute in self.generated.get(table, {}).items():
+            row[column] = compute(row)
+        return row
+
+    def check_unique(self, table: str, row: Dict[str, Any], ignore: Optional[Dict[str, Any]] = None) -> None:
+        for column in ['id'] + self.unique.get(table, []):
+            value = row.get(column)
+            if value is None:
+                continue
+            for existing in self.tables.get(table, []):
+                if existing is not ignore and existing.get(column) == value:
+                    raise APIError({
+                        'message': f'duplicate key value violates unique constraint "{table}_{column}_key"',
+                        'code': '23505',
+                        'details': f'Key ({column})=({value}) already exists.',
+                        'hint': None,
+                    })
+
+
+# ----------------------------------------------------------------------------
+# Query builder
+# ----------------------------------------------------------------------------
+
+class _Not:
+    def __init__(self, query: 'FakeQuery'):
+        self._query = query
+
+    def __getattr__(self, name: str):
+        method = getattr(self._query, name)
+
+        def negated(*args, **kwargs):
+            self._query._negate_next = True
+            return method(*args, **kwargs)
+        return negated
+
+
+class FakeQuery:
+    def __init__(self, db: FakeDatabase, table: str):
+        self.db = db
+        self.table_name = table
+        self.operation = 'select'
+        self.columns: Optional[List[str]] = None
+        self.count_mode: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.filters: List[Callable[[Dict[str, Any]], Optional[bool]]] = []
+        self.shape: List[str] = []
+        self.orders: List[tuple] = []
+        self.limit_count: Optional[int] = None
+        self.offset_count = 0
+        self.single_mode: Optional[str] = None
+        self._negate_next = False
+
+    # -- operations -----------------------------------------------------------
+    def select(self, *columns: str, count: Optional[str] = None, head: bool = False) -> 'FakeQuery':
+        joined = ','.join(columns) if columns else '*'
+        self.columns = None if joined.strip() == '*' else [c.strip() for c in joined.split(',') if c.strip()]
+        self.count_mode = count
+        self.shape.append(f'select={joined.replace(" ", "")}')
+        return self
+
+    def insert(self, rows: Any, count: Optional[str] = None, returning: str = 'representation',
+               upsert: bool = False, **_: Any) -> 'FakeQuery':
+        self.operation = 'upsert' if upsert else 'insert'
+        self.payload = rows
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = '', ignore_duplicates: bool = False, **_: Any) -> 'FakeQuery':
+        self.operation = 'upsert'
+        self.payload = rows
+        self.on_conflict = on_conflict or None
+        return self
+
+    def update(self, values: Dict[str, Any], **_: Any) -> 'FakeQuery':
+        self.operation = 'update'
+        self.payload = values
+        return self
+
+    def delete(self, **_: Any) -> 'FakeQuery':
+        self.operation = 'delete'
+        return self
+
+    # -- filters --------------------------------------------------------------
+    @property
+    def not_(self) -> _Not:
+        return _Not(self)
+
+    def _filter(self, column: str, op: str, value: Any) -> 'FakeQuery':
+        predicate = _column_predicate(column, op, value)
+        if self._negate_next:
+            self._negate_next = False
+            self.filters.append(lambda row: _negate(predicate(row)))
+            self.shape.append(f'{column}=not.{op}')
+        else:
+            self.filters.append(predicate)
+            self.shape.append(f'{column}={op}')
+        return self
+
+    def eq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'lte', value)
+
+    def in_(self, column: str, values: Sequence[Any]) -> 'FakeQuery':
+        return self._filter(column, 'in', list(values))
+
+    def like(self, column: str, pattern: str) -> 'FakeQuery':
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column: str, pattern: str) -> 'FakeQuery':
+        return self._filter(column, 'ilike', pattern)
+
+    def is_(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'is', 'null' if value is None else value)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None) -> 'FakeQuery':
+        condition = _parse_condition(f'or({filters})')
+        self.filters.append(condition)
+        self.shape.append('or=' + re.sub(r'\.("[^"]*"|[^,()]*)(?=[,)])', '', filters))
+        return self
+
+    # -- modifiers ------------------------------------------------------------
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None,
+              foreign_table: Optional[str] = None) -> 'FakeQuery':
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        self.shape.append(f'order={column}.{"desc" if desc else "asc"}')
+        return self
+
+    def limit(self, size: int, foreign_table: Optional[str] = None) -> 'FakeQuery':
+        self.limit_count = size
+        return self
+
+    def offset(self, size: int) -> 'FakeQuery':
+        self.offset_count = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None) -> 'FakeQuery':
+        self.offset_count = start
+        self.limit_count = end - start + 1
+        return self
+
+    def single(self) -> 'FakeQuery':
+        self.single_mode = 'single'
+        return self
+
+    def maybe_single(self) -> 'FakeQuery':
+        self.single_mode = 'maybe_single'
+        return self
+
+    # -- execution ------------------------------------------------------------
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(f(row) is True for f in self.filters)
+
+    def _sorted(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for column, desc, nulls_first in reversed(self.orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self.columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in self.columns}
+
+    def execute(self) -> FakeResponse:
+        started = time.perf_counter()
+        with self.db.lock:
+            response = getattr(self, f'_execute_{self.operation}')()
+        method = {'select': 'GET', 'insert': 'POST', 'upsert': 'POST', 'update': 'PATCH', 'delete': 'DELETE'}
+        shape = f"{method[self.operation]} /{self.table_name}" + (f"?{'&'.join(self.shape)}" if self.shape else '')
+        self.db.round_trip(self.table_name, self.operation, shape, started)
+
+        if self.single_mode:
+            rows = response.data or []
+            if len(rows) != 1:
+                if self.single_mode == 'maybe_single' and not rows:
+                    return None
+                raise APIError({
+                    'message': 'JSON object requested, multiple (or no) rows returned',
+                    'code': 'PGRST116',
+                    'details': f'The result contains {len(rows)} rows',
+                    'hint': None,
+                })
+            response.data = rows[0]
+        return response
+
+    def _execute_select(self) -> FakeResponse:
+        rows = [r for r in self.db.rows(self.table_name) if self._matches(r)]
+        total = len(rows) if self.count_mode else None
+        rows = self._sorted(rows)
+        end = None if self.limit_count is None else self.offset_count + self.limit_count
+        return FakeResponse([self._project(r) for r in rows[self.offset_count:end]], total)
+
+    def _payload_rows(self) -> List[Dict[str, Any]]:
+        return list(self.payload) if isinstance(self.payload, list) else [self.payload]
+
+    def _writable(self) -> List[Dict[str, Any]]:
+        if self.table_name in self.db.views:
+            raise APIError({'message': f'cannot write to view "{self.table_name}"', 'code': '55000',
+                            'details': None, 'hint': None})
+        return self.db.tables.setdefault(self.table_name, [])
+
+    def _execute_insert(self) -> FakeResponse:
+        table = self._writable()
+        inserted = []
+        for row in self._payload_rows():
+            row = self.db.prepare_row(self.table_name, row)
+            self.db.check_unique(self.table_name, row)
+            table.append(row)
+            inserted.append(copy.deepcopy(row))
+        return FakeResponse(inserted)
+
+    def _execute_upsert(self) -> FakeResponse:
+        table = self._writable()
+        keys = [c.strip() for c in (self.on_conflict or 'id').split(',')]
+        written = []
+        for row in self._payload_rows():
+            existing = next((r for r in table if all(k in row and r.get(k) == row[k] for k in keys)), None)
+            if existing is None:
+                existing = self.db.prepare_row(self.table_name, row)
+                self.db.check_unique(self.table_name, existing)
+                table.append(existing)
+            else:
+                existing.update(row)
+                self.db.bump_version(self.table_name, existing)
+                self.db.apply_generated(self.table_name, existing)
+            written.append(copy.deepcopy(existing))
+        return FakeResponse(written)
+
+    def _execute_update(self) -> FakeResponse:
+        table = self._writable()
+        updated = []
+        for row in table:
+            if self._matches(row):
+                candidate = {**row, **self.payload}
+                if self.table_name in self.db.versioned:
+                    candidate[self.db.versioned[self.table_name]] = row.get(self.db.versioned[self.table_name])
+                    self.db.bump_version(self.table_name, candidate)
+                candidate = self.db.apply_generated(self.table_name, candidate)
+                self.db.check_unique(self.table_name, candidate, ignore=row)
+                row.update(candidate)
+                updated.append(copy.deepcopy(row))
+        return FakeResponse(updated)
+
+    def _execute_delete(self) -> FakeResponse:
+        table = self._writable()
+        kept, deleted = [], []
+        for row in table:
+            (deleted if self._matches(row) else kept).append(row)
+        table[:] = kept
+        return FakeResponse([copy.deepcopy(r) for r in deleted])
+
+
+class FakeRPC:
+    def __init__(self, db: FakeDatabase, name: str, params: Optional[Dict[str, Any]]):
+        self.db = db
+        self.name = name
+        self.params = params or {}
+
+    def execute(self) -> FakeResponse:
+        started = time.perf_counter()
+        handler = self.db.rpcs.get(self.name)
+        if handler is None:
+            raise APIError({'message': f'Could not find the function public.{self.name}', 'code': 'PGRST202',
+                            'details': None, 'hint': None})
+        with self.db.lock:
+            data = handler(self.db, self.params)
+        self.db.round_trip(self.name, 'rpc', f'POST /rpc/{self.name}', started)
+        return FakeResponse(data)
+
+
+class FakeSupabase:
+    """Drop-in for supabase.Client covering table() and rpc()."""
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.db, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None, **_: Any) -> FakeRPC:
+        return FakeRPC(self.db, name, params)
+
+
+# ----------------------------------------------------------------------------
+# Wiring into the app
+# ----------------------------------------------------------------------------
+
+def install(db: FakeDatabase) -> FakeSupabase:
+    """
+    Route every Supabase client the app creates to `db`.
+
+    Imports the app first so module-level clients exist, then swaps each
+    module's `create_client` and `supabase_client`, plus `supabase.create_client`.
+    """
+    import supabase
+    from app.core.config import settings
+
+    settings.SUPABASE_URL = settings.SUPABASE_URL or 'http://fake-supabase.local'
+    settings.SUPABASE_KEY = settings.SUPABASE_KEY or 'fake-key'
+    settings.SUPABASE_SERVICE_ROLE_KEY = settings.SUPABASE_SERVICE_ROLE_KEY or 'fake-service-key'
+    settings.PAYSTACK_SECRET_KEY = settings.PAYSTACK_SECRET_KEY or 'sk_test_fake'
+
+    import app.main  # noqa: F401  (loads every route and service module)
+
+    client = FakeSupabase(db)
+
+    def create_client(*_: Any, **__: Any) -> FakeSupabase:
+        return client
+
+    supabase.create_client = create_client
+    for name, module in list(sys.modules.items()):
+        if not name.startswith('app.') or module is None:
+            continue
+        if hasattr(module, 'create_client'):
+            module.create_client = create_client
+        if hasattr(module, 'supabase_client'):
+            module.supabase_client = client
+    return client
+
+
+# ----------------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------------
+
+PORTFOLIOS = {
+    'Conservative': (['Gold Starter', 'Gold Flair'], 20, 5.0, 100000),
+    'Balanced': (['Gold Starter', 'Gold Flair', 'Gold Accent'], 12, 7.0, 2500000),
+    'Growth': (['Gold Starter', 'Gold Flair', 'Gold Accent', 'Gold Luxury'], 10, 10.0, 10000000),
+}
+
+
+def _search_text(row: Dict[str, Any]) -> str:
+    return ' '.join(str(row.get(c) or '') for c in ('email', 'first_name', 'surname', 'account_number')).lower()
+
+
+def _date_column(column: str) -> Callable[[Dict[str, Any]], Any]:
+    """Cast like a Postgres `date` column: a timestamp written to it keeps only its day."""
+    def cast(row: Dict[str, Any]) -> Any:
+        value = row.get(column)
+        return value[:10] if isinstance(value, str) else value
+    return cast
+
+
+def _payment_totals_view(db: FakeDatabase) -> List[Dict[str, Any]]:
+    rows = []
+    for inv in db.tables.get('investors', []):
+        invested = float(inv.get('total_investment') or inv.get('initial_investment') or 0)
+        rows.append({
+            **inv,
+            'initial_investment': float(inv.get('initial_investment') or 0),
+            'total_investment': invested,
+            'total_paid': float(inv.get('total_paid') or 0),
+            'pending_amount': 0 if inv.get('payment_status') in ('completed', 'success') else invested,
+        })
+    return rows
+
+
+def _payments_totals_rpc(db: FakeDatabase, _: Dict[str, Any]) -> Dict[str, Any]:
+    rows = _payment_totals_view(db)
+    by_portfolio: Counter = Counter(r.get('portfolio_type') for r in rows)
+    by_type: Counter = Counter(r.get('investment_type') for r in rows)
+    return {
+        'investor_count': len(rows),
+        'total_invested': sum(r['total_investment'] for r in rows),
+        'total_paid': sum(r['total_paid'] for r in rows),
+        'total_pending': sum(r['pending_amount'] for r in rows),
+        'pending_count': sum(1 for r in rows if r['pending_amount'] > 0),
+        'by_portfolio': [{'portfolio_type': k, 'investors': n} for k, n in by_portfolio.most_common()],
+        'by_investment_type': [{'investment_type': k, 'investors': n} for k, n in by_type.most_common()],
+    }
+
+
+def _reserve_id_block_rpc(db: FakeDatabase, params: Dict[str, Any]) -> int:
+    counters = db.tables.setdefault('id_blocks', [])
+    row = next((r for r in counters if r['name'] == params['p_name']), None)
+    if row is None:
+        row = {'name': params['p_name'], 'next_value': 1000000}
+        counters.append(row)
+    start = row['next_value']
+    row['next_value'] += int(params['p_size'])
+    return start
+
+
+def _increment_referral_stats_rpc(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    stats = db.tables.setdefault('referral_stats', [])
+    row = next((r for r in stats if r['referrer_id'] == params['p_referrer_id']), None)
+    if row is None:
+        row = {'referrer_id': params['p_referrer_id'], 'total_referrals': 0,
+               'successful_referrals': 0, 'total_points_earned': 0}
+        stats.append(row)
+    row['total_referrals'] += params.get('p_total', 0)
+    row['successful_referrals'] += params.get('p_successful', 0)
+    row['total_points_earned'] += params.get('p_points', 0)
+    return dict(row)
+
+
+def _settle_withdrawal_rpc(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    transactions = db.tables.setdefault('transactions', [])
+    withdrawal = next((r for r in transactions if r.get('transaction_id') == params['p_transaction_id']
+                       and r.get('transaction_type') == 'withdrawal'), None)
+    if withdrawal is None:
+        raise APIError({'message': f"Withdrawal {params['p_transaction_id']} not found", 'code': 'P0001',
+                        'details': None, 'hint': None})
+    if withdrawal.get('withdraw_status') == 'sent':
+        return {'already_sent': True, 'transaction': copy.deepcopy(withdrawal)}
+    if withdrawal.get('withdraw_status') not in ('pending', 'processing'):
+        raise APIError({'message': f"Withdrawal {params['p_transaction_id']} is {withdrawal.get('withdraw_status')}, "
+                                   f"not pending", 'code': 'P0001', 'details': None, 'hint': None})
+    investor = next((r for r in db.tables.get('investors', []) if r['id'] == withdrawal['investor_id']), None)
+    if investor is None:
+        raise APIError({'message': f"Investor {withdrawal['investor_id']} not found", 'code': 'P0001',
+                        'details': None, 'hint': None})
+    now = datetime.now(timezone.utc).isoformat()
+    amount = float(withdrawal.get('amount') or 0)
+    investor['total_paid'] = float(investor.get('total_paid') or 0) + amount
+    investor['updated_at'] = now
+    db.bump_version('investors', investor)
+    withdrawal.update(withdraw_status='sent', withdrawal_amount=amount, failure_reason=None, updated_at=now)
+    amount_due = None if params.get('p_amount_due') is None else round(float(params['p_amount_due']), 2)
+    updated = 0
+    for row in transactions:
+        if (amount_due is not None and row.get('investor_id') == withdrawal['investor_id']
+                and not row.get('withdrawal_requested')
+                and row.get('transaction_type') not in ('end_investment', 'renew_investment')
+                and float(row.get('amount_due') or 0) >= 0 and row.get('amount_due') != amount_due):
+            row.update(amount_due=amount_due, updated_at=now)
+            updated += 1
+    return {'already_sent': False, 'transaction': copy.deepcopy(withdrawal),
+            'total_paid': investor['total_paid'], 'amount_due_rows_updated': updated}
+
+
+def _settle_withdrawals_rpc(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    results = []
+    for item in params['p_items']:
+        try:
+            settled = _settle_withdrawal_rpc(db, {'p_transaction_id': item['transaction_id'],
+                                                  'p_amount_due': item.get('amount_due')})
+        except APIError as e:
+            results.append({'transaction_id': item['transaction_id'], 'success': False, 'error': e.message})
+            continue
+        row = next(r for r in db.tables['transactions'] if r.get('transaction_id') == item['transaction_id'])
+        row.update(paystack_ref=item.get('transfer_code'), paystack_status=item.get('transfer_status'),
+                   paystack_timestamp=datetime.now(timezone.utc).isoformat())
+        results.append({'transaction_id': item['transaction_id'], 'success': True,
+                        'already_sent': settled['already_sent']})
+    return results
+
+
+def _spending_account_for_rpc(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    accounts = db.tables.setdefault('spending_accounts', [])
+    owned = [r for r in accounts if r['investor_id'] == params['p_investor_id']]
+    if owned:
+        return copy.deepcopy(min(owned, key=lambda r: (r.get('created_at') or '', r['id'])))
+    now = datetime.now(timezone.utc).isoformat()
+    row = {'id': str(uuid.uuid4()), 'investor_id': params['p_investor_id'], 'balance': 0,
+           'total_withdrawn': 0, 'version': 0, 'created_at': now, 'updated_at': now}
+    accounts.append(row)
+    return copy.deepcopy(row)
+
+
+def _adjust_spending_account_rpc(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    account_id = _spending_account_for_rpc(db, params)['id']
+    row = next(r for r in db.tables['spending_accounts'] if r['id'] == account_id)
+    amount = float(params['p_amount'])
+    balance = float(row.get('balance') or 0)
+    if amount < 0 and balance + amount < 0:
+        return []
+    row.update(balance=round(balance + amount, 2),
+               total_withdrawn=round(float(row.get('total_withdrawn') or 0) + float(params.get('p_withdrawn') or 0), 2),
+               updated_at=datetime.now(timezone.utc).isoformat())
+    db.bump_version('spending_accounts', row)
+    return [copy.deepcopy(row)]
+
+
+def seed_database(db: FakeDatabase, investors: int = 1000, transactions_per_investor: int = 8,
+                  due_fraction: float = 0.05, seed: int = 42,
+                  password_hash: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Fill `db` with users, sessions, investors, spending accounts and transactions.
+
+    Seeding is deterministic for a given `seed`, so two processes seeded alike
+    hold the same ids and session tokens. `password_hash` is stored on every
+    user so the manual login route can be exercised.
+
+    Returns:
+        Dict with the seeded `emails`, `session_tokens` and `investor_ids`, in the same order
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now(timezone.utc)
+
+    db.generated_column('investors', 'search_text', _search_text)
+    for column in ('last_due_date', 'next_due_date'):
+        db.generated_column('investors', column, _date_column(column))
+    db.unique_columns('investors', 'email', 'account_number')
+    db.unique_columns('users', 'email')
+    db.unique_columns('sessions', 'token')
+    for table in ('investors', 'spending_accounts', 'user_points'):
+        db.version_column(table)
+    db.register_view('investor_payment_totals', _payment_totals_view)
+    db.register_rpc('admin_payments_totals', _payments_totals_rpc)
+    db.register_rpc('reserve_id_block', _reserve_id_block_rpc)
+    db.register_rpc('increment_referral_stats', _increment_referral_stats_rpc)
+    db.register_rpc('settle_withdrawal', _settle_withdrawal_rpc)
+    db.register_rpc('settle_withdrawals', _settle_withdrawals_rpc)
+    db.register_rpc('spending_account_for', _spending_account_for_rpc)
+    db.register_rpc('adjust_spending_account', _adjust_spending_account_rpc)
+
+    users, sessions, investor_rows, accounts, transactions = [], [], [], [], []
+    emails, tokens, investor_ids = [], [], []
+    portfolio_names = list(PORTFOLIOS)
+
+    for i in range(investors):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        investor_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        email = f'investor{i}@example.com'
+        first_name, surname = f'First{i}', f'Last{i}'
+        created = now - timedelta(days=rng.randint(1, 365), seconds=rng.randint(0, 86400))
+
+        portfolio = rng.choice(portfolio_names)
+        types, expiry_weeks, rate, minimum = PORTFOLIOS[portfolio]
+        investment_type = rng.choice(types)
+        initial = float(minimum * rng.choice((1, 1, 2, 3)))
+        weeks_elapsed = rng.randint(0, expiry_weeks - 1)
+        start = today - timedelta(weeks=weeks_elapsed, days=rng.randint(0, 6))
+        due = rng.random() < due_fraction
+        next_due = today - timedelta(days=rng.randint(0, 2)) if due else today + timedelta(days=rng.randint(1, 7))
+        weekly_interest = initial * rate / 100
+
+        users.append({
+            'id': user_id, 'email': email, 'first_name': first_name, 'surname': surname,
+            'referral_code': f'R{i:07d}', 'password_hash': password_hash,
+            'created_at': created.isoformat(), 'updated_at': created.isoformat(),
+        })
+        emails.append(email)
+        token = uuid.UUID(int=rng.getrandbits(128)).hex
+        tokens.append(token)
+        sessions.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))), 'user_id': user_id, 'token': token,
+            'created_at': now.isoformat(), 'expires_at': (now + timedelta(hours=6)).isoformat(),
+        })
+        investor_ids.append(investor_id)
+        investor_rows.append(db.apply_generated('investors', {
+            'id': investor_id, 'email': email, 'first_name': first_name, 'surname': surname,
+            'phone': f'080{i:08d}', 'account_number': f'INV{i:010d}',
+            'bank_name': 'GTBank', 'bank_account_name': f'{first_name} {surname}',
+            'bank_account_number': f'{i:010d}', 'identity_type': 'NIN', 'identity_number': f'{i:011d}',
+            'portfolio_type': portfolio, 'investment_type': investment_type,
+            'initial_investment': initial, 'total_investment': initial,
+            'total_paid': round(weekly_interest * weeks_elapsed, 2),
+            'payment_counter': weeks_elapsed, 'current_week': weeks_elapsed,
+            'investment_start_date': start.isoformat(),
+            'last_due_date': (next_due - timedelta(days=7)).isoformat(),
+            'next_due_date': next_due.isoformat(),
+            'investment_expiry_date': (start + timedelta(weeks=expiry_weeks)).isoformat(),
+            'investment_ended': False, 'status': 'active', 'payment_status': 'completed',
+            'paystack_reference': f'PSK-{i:08d}', 'version': 0, 'created_at': created.isoformat(),
+            'updated_at': created.isoformat(),
+        }))
+        accounts.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))), 'investor_id': investor_id,
+            'balance': round(weekly_interest * rng.randint(0, 3), 2), 'total_withdrawn': 0, 'version': 0,
+            'created_at': created.isoformat(), 'updated_at': created.isoformat(),
+        })
+
+        for t in range(transactions_per_investor):
+            kind = 'payment' if t == 0 else rng.choice(('interest_deposit', 'interest_deposit', 'withdrawal'))
+            status = rng.choice(('sent', 'sent', 'pending')) if kind == 'withdrawal' else 'none'
+            amount = initial if kind == 'payment' else round(weekly_interest * rng.uniform(0.5, 1.0), 2)
+            transactions.append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))), 'investor_id': investor_id, 'email': email,
+                'account_number': f'INV{i:010d}', 'portfolio_type': portfolio, 'investment_type': investment_type,
+                'initial_balance': initial, 'transaction_type': kind, 'amount': amount,
+                'amount_due': amount if kind == 'interest_deposit' else 0,
+                'total_paid': 0, 'withdrawal_requested': kind == 'withdrawal', 'withdraw_status': status,
+                'withdrawal_amount': amount if kind == 'withdrawal' else 0,
+                'transaction_id': f'TX-{i:07d}-{t:03d}', 'is_deleted': False,
+                'created_at': (created + timedelta(days=7 * t)).isoformat(),
+                'updated_at': (created + timedelta(days=7 * t)).isoformat(),
+            })
+
+    with db.lock:
+        db.tables.setdefault('users', []).extend(users)
+        db.tables.setdefault('sessions', []).extend(sessions)
+        db.tables.setdefault('investors', []).extend(investor_rows)
+        db.tables.setdefault('spending_accounts', []).extend(accounts)
+        db.tables.setdefault('transactions', []).extend(transactions)
+        for table in ('notifications', 'user_points', 'user_referrals', 'referral_stats',
+                      'server_events', 'system_settings', 'admin_settings', 'topups', 'customer_queries'):
+            db.tables.setdefault(table, [])
+
+    return {'emails': emails, 'session_tokens': tokens, 'investor_ids': investor_ids}
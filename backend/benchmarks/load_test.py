@@ -0,0 +1,354 @@
+"""
+HTTP load test for the FastAPI app against the in-memory fake Supabase.
+
+Unlike bench_services.py, which times one request at a time, this drives
+concurrent traffic through the full HTTP stack and reports p50/p95/p99
+latency and throughput per scenario:
+
+    login_burst           POST /api/v1/auth/login (bcrypt verify + session insert)
+    dashboard_storm       GET  /api/v1/dashboard/data for random sessions
+    notification_polling  GET  /api/v1/notifications/?limit=20
+    topup_callback        POST /api/v1/topup/callback for seeded pending top-ups
+    admin_export          GET  /api/v1/admin/export/investors (streamed CSV)
+
+Targets:
+    --target inproc   requests go through httpx's ASGI transport (default)
+    --target uvicorn  a uvicorn child process is started with the same seed
+    --url URL         an already running server; pass --fixtures with the
+                      session tokens, logins, top-up references and admin
+                      token to use
+
+Results are compared with a saved baseline (benchmarks/load_baseline.json by
+default, not committed: baselines are machine specific). A scenario regresses
+when its p95 grows, its throughput drops or its error rate rises by more than
+--tolerance; the script then exits with status 1.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --investors 2000 --requests 400 --concurrency 20 --save-baseline
+    python benchmarks/load_test.py --investors 2000 --requests 400 --concurrency 20 --rtt-ms 2
+    python benchmarks/load_test.py --target uvicorn --duration 10 --scenarios dashboard_storm
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeDatabase, install, seed_database  # noqa: E402
+from bench_services import percentile  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_baseline.json')
+LOGIN_PASSWORD = 'load-test-password'
+TOPUP_REFERENCE = 'LOADTEST-{:06d}'
+# Absolute p95 change (ms) ignored as noise, whatever the relative change.
+P95_NOISE_FLOOR_MS = 2.0
+
+
+class FakePaystackTransactions:
+    """Stand-in for the Paystack transactions API; every verification succeeds."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def verify(self, reference: str):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return SimpleNamespace(status=True, message='Verification successful',
+                               data={'reference': reference, 'status': 'success', 'amount': 500000})
+
+
+def seed(args) -> Dict[str, List]:
+    """Seed a fake database and point the app at it; returns the fixtures for the scenarios."""
+    from passlib.hash import bcrypt
+
+    db = FakeDatabase(latency_seconds=args.rtt_ms / 1000)
+    # One hash for everyone keeps seeding fast; verification cost per login is unchanged.
+    seeded = seed_database(db, args.investors, args.transactions, 0.0, args.seed,
+                           password_hash=bcrypt.hash(LOGIN_PASSWORD))
+    references = [TOPUP_REFERENCE.format(i) for i in range(args.topups)]
+    rng = random.Random(args.seed)
+    with db.lock:
+        db.tables['topups'].extend({
+            'id': f'topup-{i}', 'investor_id': rng.choice(seeded['investor_ids']), 'amount': 5000.0,
+            'paystack_reference': reference, 'paystack_status': 'pending',
+            'transaction_id': reference, 'payment_method': 'paystack',
+        } for i, reference in enumerate(references))
+    install(db)
+
+    from app.core.security import create_access_token
+    from app.services.paystack_service import paystack_service
+    paystack_service.transactions = FakePaystackTransactions(args.paystack_ms / 1000)
+
+    return {
+        'session_tokens': seeded['session_tokens'],
+        'logins': seeded['emails'],
+        'topup_references': references,
+        # Admin routes take an admin JWT, not an investor session
+        'admin_token': create_access_token({'sub': 'load-test', 'role': 'admin'}),
+    }
+
+
+def build_scenarios(fixtures: Dict[str, List], rng: random.Random) -> Dict[str, Callable]:
+    """Each scenario takes (client, i) and returns the response for the i-th request."""
+    tokens, logins = fixtures['session_tokens'], fixtures['logins']
+    references = fixtures.get('topup_references') or []
+    admin_headers = {'Authorization': f"Bearer {fixtures.get('admin_token', '')}"}
+
+    def auth() -> Dict[str, str]:
+        return {'Authorization': f'Bearer {rng.choice(tokens)}'}
+
+    async def login_burst(client, i):
+        return await client.post('/api/v1/auth/login',
+                                 data={'email': rng.choice(logins), 'password': LOGIN_PASSWORD})
+
+    async def dashboard_storm(client, i):
+        return await client.get('/api/v1/dashboard/data', headers=auth())
+
+    async def notification_polling(client, i):
+        return await client.get('/api/v1/notifications/?limit=20', headers=auth())
+
+    async def topup_callback(client, i):
+        # Each reference is settled once; later requests replay it, which
+        # exercises the duplicate-callback path like Paystack retries do.
+        reference = references[i % len(references)] if references else f'LOADTEST-MISSING-{i}'
+        return await client.post('/api/v1/topup/callback', json={'reference': reference, 'status': 'success'})
+
+    async def admin_export(client, i):
+        # Read the whole stream so the timing covers the full export.
+        async with client.stream('GET', '/api/v1/admin/export/investors?format=csv',
+                                 headers=admin_headers) as response:
+            async for _ in response.aiter_bytes():
+                pass
+        return response
+
+    return {
+        'login_burst': login_burst,
+        'dashboard_storm': dashboard_storm,
+        'notification_polling': notification_polling,
+        'topup_callback': topup_callback,
+        'admin_export': admin_export,
+    }
+
+
+async def run_scenario(client, call: Callable, requests: int, duration: float, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if deadline is None and i >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            started = time.perf_counter()
+            try:
+                response = await call(client, i)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    # The app prints liberally; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        return {'requests': 0, 'errors': 0, 'error_rate': 0.0, 'throughput_rps': 0.0,
+                'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'statuses': {}}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions of `results` against `baseline`, as human-readable lines."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        p95, base_p95 = result['p95_ms'], base['p95_ms']
+        if p95 > base_p95 * (1 + tolerance) and p95 - base_p95 > P95_NOISE_FLOOR_MS:
+            regressions.append(f"{name}: p95 {base_p95:.2f} -> {p95:.2f} ms")
+        rps, base_rps = result['throughput_rps'], base['throughput_rps']
+        if base_rps and rps < base_rps * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base_rps:.1f} -> {rps:.1f} req/s")
+        if result['error_rate'] > base.get('error_rate', 0) + 0.01:
+            regressions.append(f"{name}: error rate {base.get('error_rate', 0):.2%} -> {result['error_rate']:.2%}")
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(args) -> Iterator[str]:
+    """Run this script in --serve mode in a child process; yields its base URL."""
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+               '--investors', str(args.investors), '--transactions', str(args.transactions),
+               '--topups', str(args.topups), '--seed', str(args.seed),
+               '--rtt-ms', str(args.rtt_ms), '--paystack-ms', str(args.paystack_ms)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        import httpx
+        deadline = time.time() + 120
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'uvicorn exited with status {process.returncode}')
+            try:
+                if httpx.get(f'{url}/health', timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError('uvicorn did not become ready')
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def serve(args) -> None:
+    import uvicorn
+    seed(args)
+    from app.main import app
+    uvicorn.run(app, host='127.0.0.1', port=args.port, log_level='warning', access_log=False)
+
+
+async def run(args, fixtures: Dict[str, List], base_url: Optional[str]) -> Dict[str, Dict]:
+    import httpx
+
+    scenarios = build_scenarios(fixtures, random.Random(args.seed))
+    selected = list(scenarios) if args.scenarios == 'all' else [s.strip() for s in args.scenarios.split(',')]
+    unknown = [s for s in selected if s not in scenarios]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    if base_url:
+        transport, base = None, base_url
+    else:
+        from app.main import app
+        transport, base = httpx.ASGITransport(app=app), 'http://loadtest'
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    print(f"{'scenario':<24}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base, limits=limits, timeout=60) as client:
+        for name in selected:
+            result = await run_scenario(client, scenarios[name], args.requests, args.duration, args.concurrency)
+            results[name] = result
+            print(f"{name:<24}{result['requests']:>10}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('inproc', 'uvicorn'), default='inproc')
+    parser.add_argument('--url', help='base URL of a running server (overrides --target)')
+    parser.add_argument('--fixtures',
+                        help='JSON file with session_tokens, logins, topup_references and admin_token for --url')
+    parser.add_argument('--investors', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=8, help='transactions per investor')
+    parser.add_argument('--topups', type=int, default=500, help='pending top-ups to seed for topup_callback')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--duration', type=float, default=0.0, help='seconds per scenario (overrides --requests)')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--rtt-ms', type=float, default=0.0, help='simulated latency per Supabase call')
+    parser.add_argument('--paystack-ms', type=float, default=0.0, help='simulated Paystack verify latency')
+    parser.add_argument('--scenarios', default='all', help='comma-separated scenario names')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (0.2 = 20%%)')
+    parser.add_argument('--json', dest='json_path', help='also write results to this file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=8000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if args.serve:
+        serve(args)
+        return
+
+    if args.url:
+        if not args.fixtures:
+            sys.exit('--url needs --fixtures with the session tokens and logins to use')
+        with open(args.fixtures) as f:
+            fixtures = json.load(f)
+        target = args.url
+    else:
+        # uvicorn children seed the same data from the same --seed, so these fixtures match.
+        fixtures = seed(args)
+        target = args.target
+
+    print(f"target {target}, {args.investors} investors, concurrency {args.concurrency}, "
+          f"{args.rtt_ms} ms simulated round trip\n")
+    with contextlib.ExitStack() as stack:
+        base_url = args.url or (stack.enter_context(uvicorn_server(args)) if args.target == 'uvicorn' else None)
+        results = asyncio.run(run(args, fixtures, base_url))
+
+    report = {'config': {k: v for k, v in vars(args).items() if k not in ('serve', 'port')}, 'results': results}
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f).get('results', {})
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
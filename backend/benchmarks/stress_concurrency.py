@@ -0,0 +1,305 @@
+"""
+Concurrency stress test for the versioned (compare-and-swap) row updates.
+
+Runs the read-modify-write service paths from many threads at once against
+the in-memory fake Supabase, with a simulated round trip so reads and writes
+interleave, then checks the books:
+
+    auto_withdrawal  every worker pays the same due investors; each installment
+                     must be paid exactly once (payment_counter, total_paid and
+                     the spending balance all move by one installment)
+    due_date_check   every worker runs the scheduled due-date check for the same
+                     investors due today; each must be paid once and its
+                     next_due_date must move on by exactly one week
+    referral_awards  many referees of one referrer convert at once; the
+                     referrer must end up with POINTS_PER_REFERRAL per referee
+    redemptions      concurrent redemptions of one user; at most
+                     MAX_MONTHLY_REDEMPTIONS succeed and no points go missing
+    spending         concurrent credits and debits on one spending account;
+                     the balance must equal credits minus accepted debits and
+                     never go negative
+
+Exits with status 1 if any invariant is broken.
+
+Usage (from backend/):
+    python benchmarks/stress_concurrency.py --workers 16 --rounds 20 --rtt-ms 2
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeDatabase, install, seed_database  # noqa: E402
+
+
+def hammer(workers: int, tasks: List[Callable[[], dict]]) -> List[dict]:
+    """Run `tasks` on `workers` threads and return their results in order."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda task: task(), tasks))
+
+
+def row(db: FakeDatabase, table: str, column: str, value) -> dict:
+    return next(r for r in db.tables[table] if r.get(column) == value)
+
+
+def paid_today(db: FakeDatabase) -> set:
+    """Investors process_auto_withdrawal treats as already paid today (seeded deposits can be dated ahead)."""
+    from app.models.rows import parse_datetime
+
+    today = datetime.now().date()
+    return {t['investor_id'] for t in db.tables['transactions']
+            if t['transaction_type'] == 'interest_deposit' and parse_datetime(t['created_at']).date() >= today}
+
+
+def stress_auto_withdrawal(db: FakeDatabase, investor_ids: List[str], workers: int, rounds: int) -> List[str]:
+    from app.services.interest_calculation_service import InterestCalculationService
+    from app.services.spending_accounts import spending_accounts
+
+    service = InterestCalculationService()
+    skip = paid_today(db)
+    due = []
+    for investor_id in investor_ids:
+        investor = row(db, 'investors', 'id', investor_id)
+        # Make exactly one installment due
+        if investor['payment_counter'] > 0 and investor_id not in skip:
+            investor['payment_counter'] -= 1
+            due.append(investor_id)
+        if len(due) == rounds:
+            break
+
+    before = {}
+    for investor_id in due:
+        investor = row(db, 'investors', 'id', investor_id)
+        before[investor_id] = (investor['payment_counter'], investor['total_paid'],
+                               spending_accounts.get(investor_id)['balance'])
+
+    results = hammer(workers, [lambda i=i: service.process_auto_withdrawal(i) for i in due for _ in range(workers)])
+
+    problems = [r['error'] for r in results if not r['success']]
+    for investor_id in due:
+        counter, total_paid, balance = before[investor_id]
+        investor = row(db, 'investors', 'id', investor_id)
+        deposits = [t for t in db.tables['transactions']
+                    if t['investor_id'] == investor_id and t['transaction_type'] == 'interest_deposit'
+                    and t.get('transaction_id', '').startswith('INT-')]
+        paid = investor['total_paid'] - total_paid
+        account = row(db, 'spending_accounts', 'investor_id', investor_id)
+        if investor['payment_counter'] != counter + 1:
+            problems.append(f'{investor_id}: payment_counter {counter} -> {investor["payment_counter"]}')
+        if len(deposits) != 1:
+            problems.append(f'{investor_id}: {len(deposits)} interest deposits recorded')
+        elif abs(paid - deposits[0]['amount']) > 0.01 or abs(account['balance'] - balance - paid) > 0.01:
+            problems.append(f'{investor_id}: total_paid +{paid:.2f}, balance +{account["balance"] - balance:.2f}, '
+                            f'deposit {deposits[0]["amount"]:.2f}')
+    print(f"auto_withdrawal   {len(due)} investors x {workers} concurrent runs, "
+          f"{sum(1 for r in results if r.get('transaction_recorded'))} paid")
+    return problems
+
+
+def stress_due_date_check(db: FakeDatabase, investor_ids: List[str], workers: int, rounds: int) -> List[str]:
+    from app.models.rows import parse_datetime
+    from app.services.interest_calculation_service import InterestCalculationService
+
+    service = InterestCalculationService()
+    skip = paid_today(db)
+    today = datetime.now().date()
+    due, expected_week = [], {}
+    for investor_id in investor_ids:
+        investor = row(db, 'investors', 'id', investor_id)
+        start = parse_datetime(investor['investment_start_date'])
+        weeks_elapsed = (datetime.now(start.tzinfo) - start).days // 7
+        if investor_id in skip or weeks_elapsed < 2 \
+                or parse_datetime(investor['investment_expiry_date']).date() <= today + timedelta(days=1):
+            continue
+        # Due today, with exactly one installment outstanding
+        investor['payment_counter'] = weeks_elapsed - 1
+        if len(due) % 2:
+            # No due dates yet and a timestamptz start with a time of day:
+            # ensure_due_dates_up_to_date derives them and catches up to today first
+            investor['investment_start_date'] = (datetime.now(timezone.utc).replace(microsecond=0)
+                                                 - timedelta(weeks=weeks_elapsed)).isoformat()
+            investor['last_due_date'] = investor['next_due_date'] = None
+            expected_week[investor_id] = weeks_elapsed
+        else:
+            investor['next_due_date'] = today.isoformat()
+            expected_week[investor_id] = investor['current_week'] + 1
+        due.append(investor_id)
+        if len(due) == rounds:
+            break
+
+    before = {i: dict(row(db, 'investors', 'id', i)) for i in due}
+    results = hammer(workers, [lambda i=i: service.process_investor_due_date_check(i)
+                               for i in due for _ in range(workers)])
+
+    problems = [r['error'] for r in results if not r['success']]
+    paid = sum(1 for r in results if r.get('paid'))
+    if paid != len(due):
+        problems.append(f'{paid} checks reported paid for {len(due)} due investors')
+    for investor_id in due:
+        old, investor = before[investor_id], row(db, 'investors', 'id', investor_id)
+        deposits = [t for t in db.tables['transactions']
+                    if t['investor_id'] == investor_id and t['transaction_type'] == 'interest_deposit'
+                    and t.get('transaction_id', '').startswith('INT-')]
+        expected_due = today + timedelta(days=7)
+        next_due = parse_datetime(investor['next_due_date']).date() if investor['next_due_date'] else None
+        expired = expected_due > parse_datetime(old['investment_expiry_date']).date()
+        if len(deposits) != 1:
+            problems.append(f'{investor_id}: {len(deposits)} interest deposits recorded')
+        if investor['payment_counter'] != old['payment_counter'] + 1:
+            problems.append(f"{investor_id}: payment_counter {old['payment_counter']} -> {investor['payment_counter']}")
+        if investor['current_week'] != expected_week[investor_id]:
+            problems.append(f"{investor_id}: current_week {old['current_week']} -> {investor['current_week']}")
+        if next_due != expected_due and not (next_due is None and expired):
+            problems.append(f"{investor_id}: next_due_date {old['next_due_date']} -> {investor['next_due_date']}")
+    print(f"due_date_check    {len(due)} investors x {workers} concurrent checks, "
+          f"{len(due) // 2} without due dates yet, {paid} paid")
+    return problems
+
+
+def make_user(db: FakeDatabase) -> str:
+    user_id = str(uuid.uuid4())
+    db.tables['users'].append({'id': user_id, 'email': f'{user_id}@example.com'})
+    db.tables['user_points'].append({
+        'id': str(uuid.uuid4()), 'user_id': user_id, 'points_balance': 0, 'total_points_earned': 0,
+        'total_points_redeemed': 0, 'last_redemption_date': None, 'monthly_redemption_count': 0,
+        'last_redemption_month': None, 'version': 0,
+    })
+    return user_id
+
+
+def stress_referral_awards(db: FakeDatabase, workers: int, rounds: int) -> List[str]:
+    from app.services.referral_service import ReferralService
+
+    service = ReferralService()
+    referrer_id = make_user(db)
+    referees = [f'referee-{uuid.uuid4().hex[:8]}@example.com' for _ in range(rounds * 2)]
+    for email in referees:
+        db.tables['user_referrals'].append({
+            'id': str(uuid.uuid4()), 'referrer_id': referrer_id, 'referee_id': email,
+            'investor_account_created': False, 'points_awarded': 0,
+        })
+
+    # Every referee converts twice, concurrently; the second award must be refused
+    results = hammer(workers, [lambda e=email: service.award_referral_points(e) for email in referees * 2])
+
+    points = row(db, 'user_points', 'user_id', referrer_id)
+    expected = len(referees) * service.POINTS_PER_REFERRAL
+    awarded = sum(1 for r in results if r['success'])
+    problems = [r['error'] for r in results
+                if not r['success'] and r['error'] != 'Points already awarded for this referral']
+    if awarded != len(referees):
+        problems.append(f'{awarded} awards for {len(referees)} referees')
+    if points['points_balance'] != expected or points['total_points_earned'] != expected:
+        problems.append(f"referrer has {points['points_balance']} points "
+                        f"({points['total_points_earned']} earned), expected {expected}")
+    print(f"referral_awards   {len(referees)} referees x 2 concurrent awards, {awarded} awarded, "
+          f"{points['points_balance']} points")
+    return problems
+
+
+def stress_redemptions(db: FakeDatabase, investor_ids: List[str], workers: int) -> List[str]:
+    from app.services.referral_service import ReferralService
+    from app.services.spending_accounts import spending_accounts
+
+    service = ReferralService()
+    user_id = make_user(db)
+    investor = row(db, 'investors', 'id', investor_ids[-1])
+    row(db, 'users', 'id', user_id)['email'] = investor['email']
+    points = row(db, 'user_points', 'user_id', user_id)
+    points['points_balance'] = points['total_points_earned'] = service.MIN_REDEMPTION_POINTS * workers
+    balance = spending_accounts.get(investor['id'])['balance']
+
+    results = hammer(workers, [lambda: service.redeem_points(user_id, service.MIN_REDEMPTION_POINTS)
+                               for _ in range(workers)])
+
+    redeemed = sum(1 for r in results if r['success'])
+    spending_accounts.invalidate(investor['id'])
+    credited = spending_accounts.get(investor['id'])['balance'] - balance
+    problems = []
+    if redeemed > service.MAX_MONTHLY_REDEMPTIONS:
+        problems.append(f'{redeemed} redemptions succeeded, limit is {service.MAX_MONTHLY_REDEMPTIONS}')
+    if points['points_balance'] + points['total_points_redeemed'] != points['total_points_earned']:
+        problems.append(f"points do not add up: {points['points_balance']} left + "
+                        f"{points['total_points_redeemed']} redeemed != {points['total_points_earned']} earned")
+    if abs(credited - points['total_points_redeemed'] * service.POINTS_TO_NAIRA_RATE) > 0.01:
+        problems.append(f"spending account credited {credited:.2f} for {points['total_points_redeemed']} points")
+    print(f"redemptions       {workers} concurrent redemptions, {redeemed} succeeded")
+    return problems
+
+
+def stress_spending(db: FakeDatabase, investor_ids: List[str], workers: int, rounds: int) -> List[str]:
+    from app.services.spending_accounts import spending_accounts
+
+    investor_id = investor_ids[-2]
+    start = spending_accounts.get(investor_id)['balance']
+    amounts = [random.choice((1, 2, 5)) for _ in range(rounds * workers)]
+    tasks = []
+    for i, amount in enumerate(amounts):
+        if i % 2:
+            tasks.append(lambda a=amount: ('debit', a, spending_accounts.debit(investor_id, a)))
+        else:
+            tasks.append(lambda a=amount: ('credit', a, spending_accounts.credit(investor_id, a)))
+    results = hammer(workers, tasks)
+
+    expected = start + sum(a for kind, a, r in results if kind == 'credit') \
+        - sum(a for kind, a, r in results if kind == 'debit' and r is not None)
+    account = row(db, 'spending_accounts', 'investor_id', investor_id)
+    problems = []
+    if abs(account['balance'] - expected) > 0.01:
+        problems.append(f"spending balance {account['balance']:.2f}, expected {expected:.2f}")
+    if account['balance'] < 0:
+        problems.append(f"spending balance went negative: {account['balance']:.2f}")
+    print(f"spending          {len(tasks)} concurrent credits/debits, balance {start:.2f} -> {account['balance']:.2f}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=20, help='investors / referees per scenario')
+    parser.add_argument('--rtt-ms', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.disable(logging.WARNING)
+    db = FakeDatabase(latency_seconds=args.rtt_ms / 1000)
+    install(db)
+    investor_ids = seed_database(db, investors=max(args.rounds * 2, 10), transactions_per_investor=2,
+                                 seed=args.seed)['investor_ids']
+
+    from app.core import metrics
+
+    print(f"{args.workers} workers, {args.rtt_ms} ms simulated round trip\n")
+    started = time.perf_counter()
+    problems = []
+    problems += stress_auto_withdrawal(db, investor_ids, args.workers, args.rounds)
+    problems += stress_due_date_check(db, investor_ids, args.workers, args.rounds)
+    problems += stress_referral_awards(db, args.workers, args.rounds)
+    problems += stress_redemptions(db, investor_ids, args.workers)
+    problems += stress_spending(db, investor_ids, args.workers, args.rounds)
+
+    conflicts = {t: metrics.ROW_VERSION_CONFLICTS.value(t) for t in ('investors', 'user_points')}
+    failures = {t: metrics.ROW_VERSION_FAILURES.value(t) for t in ('investors', 'user_points')}
+    print(f"\nversion conflicts retried: {conflicts}, gave up: {failures}, "
+          f"{time.perf_counter() - started:.1f} s")
+
+    if problems:
+        print(f"\n{len(problems)} problem(s):")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("all invariants held")
+
+
+if __name__ == '__main__':
+    main()
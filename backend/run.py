@@ -1,27 +1,50 @@
 import webview
 import threading
+import time
+import sys
 import uvicorn
 from app.main import app  # Import the FastAPI app
 
-def start_server():
-    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="warning")  # Use port 8000 to match main.py
+HOST = "127.0.0.1"
+PORT = 8000  # Use port 8000 to match main.py
+# Give up if the server has not come up within this many seconds
+STARTUP_TIMEOUT = 30
+
+
+def wait_until_ready(server: uvicorn.Server, thread: threading.Thread, timeout: float) -> bool:
+    """
+    Wait for uvicorn to finish the app's startup handlers and bind its socket.
+
+    Returns:
+        True once the server accepts connections, False if it exited or timed out
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.started:
+            return True
+        if not thread.is_alive():
+            return False
+        time.sleep(0.01)
+    return False
+
 
 if __name__ == "__main__":
     # Start FastAPI server in a background thread
-    server_thread = threading.Thread(target=start_server, daemon=True)
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="warning"))
+    server_thread = threading.Thread(target=server.run, daemon=True)
     server_thread.start()
 
-    # Wait a moment for server to start
-    import time
-    time.sleep(1)
+    # Open the window as soon as the server is up rather than after a fixed delay
+    if not wait_until_ready(server, server_thread, STARTUP_TIMEOUT):
+        sys.exit(f"Backend did not start on http://{HOST}:{PORT}/")
 
     # Open PyWebView window pointing to the root URL which serves index.html
     webview.create_window(
         'Blue Gold Investment Bank',
-        'http://127.0.0.1:8000/',  # Point to root URL where index.html is served
+        f'http://{HOST}:{PORT}/',  # Point to root URL where index.html is served
         width=1400,
         height=900,
         resizable=True,
         fullscreen=False
     )
-    webview.start()
\ No newline at end of file
+    webview.start()
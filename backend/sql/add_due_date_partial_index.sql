@@ -0,0 +1,22 @@
+-- Partial index for the hourly interest job
+-- The job only selects investors with next_due_date <= today. Ending an
+-- investment (TransactionService.end_investment) clears next_due_date, so
+-- ended investments are left out of the index, it stays proportional to
+-- active investments and the job's range scan touches only the rows that are
+-- due. Investments ended before that change are cleared here.
+
+UPDATE investors
+SET next_due_date = NULL
+WHERE investment_ended IS TRUE AND next_due_date IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_investors_next_due_active
+  ON investors(next_due_date, id)
+  WHERE next_due_date IS NOT NULL;
+
+-- Investors whose schedule was never initialised (both dates NULL) are picked
+-- up by a separate, less frequent sweep.
+CREATE INDEX IF NOT EXISTS idx_investors_unscheduled
+  ON investors(id)
+  WHERE next_due_date IS NULL AND last_due_date IS NULL AND investment_type IS NOT NULL;
+
+ANALYZE investors;
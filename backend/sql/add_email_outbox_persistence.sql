@@ -0,0 +1,20 @@
+-- Make email_outbox the durable queue, not just a delivery log
+-- enqueue() now inserts the row before returning, and the sender reloads
+-- queued/retrying rows on startup, so a crash or restart no longer loses
+-- password-reset or account-deletion emails. Requires create_email_outbox_table.sql.
+--
+-- payload holds the template variables (e.g. a reset code) only while the
+-- message is waiting; it is cleared once the message is accepted or fails.
+--
+-- status values are now: queued, retrying, accepted, failed. 'accepted' means
+-- MailerSend took the message (single send or bulk batch) and will deliver it
+-- asynchronously; provider_id is the message id or bulk_email_id to look it up.
+
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS payload jsonb;
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS provider_id varchar(100);
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS accepted_at timestamptz;
+
+-- Startup recovery reads only the waiting rows
+CREATE INDEX IF NOT EXISTS idx_email_outbox_waiting
+  ON email_outbox(created_at)
+  WHERE status IN ('queued', 'retrying');
@@ -0,0 +1,23 @@
+-- Indexed admin investor search and keyset paging
+-- Admin list pages search email, name and account number with a substring
+-- match. A trigram GIN index over one normalised search column lets
+-- ILIKE '%term%' use an index instead of scanning every investor.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE investors
+ADD COLUMN IF NOT EXISTS search_text text GENERATED ALWAYS AS (
+  lower(
+    coalesce(email, '') || ' ' ||
+    coalesce(first_name, '') || ' ' ||
+    coalesce(surname, '') || ' ' ||
+    coalesce(account_number, '')
+  )
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_investors_search_trgm
+  ON investors USING gin (search_text gin_trgm_ops);
+
+-- Keyset pagination for admin lists (newest first)
+CREATE INDEX IF NOT EXISTS idx_investors_created_at_id
+  ON investors(created_at DESC, id DESC);
@@ -0,0 +1,7 @@
+-- Indexes supporting the chunked retention job
+-- Each chunk selects the oldest expired ids ordered by expires_at, so every
+-- table under a retention policy needs an index on its expiry column.
+-- sessions and password_reset_codes already have one (idx_sessions_expires,
+-- idx_password_reset_codes_expires).
+
+CREATE INDEX IF NOT EXISTS idx_notifications_expires_at ON notifications(expires_at);
@@ -0,0 +1,37 @@
+-- Row versions for optimistic concurrency
+-- investors, spending_accounts and user_points are read, changed in the API
+-- and written back (payment counters, points balances). Each row now carries
+-- a version that every UPDATE bumps, whoever issues it: the API, an RPC such
+-- as settle_withdrawal or adjust_spending_account, or a manual fix. Writers
+-- using app/services/versioned_rows.py update with `WHERE version = <read>`
+-- and retry when that matches nothing.
+--
+-- Apply before deploying the code that uses it: the versioned updates do not
+-- fall back when the column is missing.
+
+ALTER TABLE investors ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 0;
+ALTER TABLE spending_accounts ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 0;
+ALTER TABLE user_points ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.version = OLD.version + 1;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_investors_version ON investors;
+CREATE TRIGGER trg_investors_version
+BEFORE UPDATE ON investors
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_spending_accounts_version ON spending_accounts;
+CREATE TRIGGER trg_spending_accounts_version
+BEFORE UPDATE ON spending_accounts
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_user_points_version ON user_points;
+CREATE TRIGGER trg_user_points_version
+BEFORE UPDATE ON user_points
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
@@ -0,0 +1,20 @@
+-- Create email_outbox table recording delivery status of queued transactional emails
+-- Rows are written by the background sender (app/services/email_outbox_service.py),
+-- one upsert per batch. Template variables (e.g. reset codes) are never stored here.
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id varchar(64) PRIMARY KEY,
+  template varchar(100) NOT NULL,
+  recipient varchar(255) NOT NULL,
+  status varchar(20) NOT NULL DEFAULT 'queued',  -- queued, retrying, sent, failed
+  attempts int NOT NULL DEFAULT 0,
+  last_error text,
+  created_at timestamptz DEFAULT now(),
+  sent_at timestamptz,
+  updated_at timestamptz DEFAULT now()
+);
+
+-- Create indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_email_outbox_status ON email_outbox(status);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_recipient ON email_outbox(recipient);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_created_at ON email_outbox(created_at);
@@ -0,0 +1,23 @@
+-- Counter blocks for collision-free id allocation
+-- Each API process reserves a block of values with reserve_id_block() and
+-- encodes them into referral codes / account numbers locally, so issuing an
+-- id never needs an existence probe.
+
+CREATE TABLE IF NOT EXISTS id_blocks (
+  name varchar(50) PRIMARY KEY,
+  next_value bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz DEFAULT now()
+);
+
+INSERT INTO id_blocks (name) VALUES ('referral_code'), ('account_number')
+ON CONFLICT (name) DO NOTHING;
+
+-- Returns the first value of a freshly reserved block of p_size values.
+-- The row lock taken by UPDATE serialises concurrent reservations.
+CREATE OR REPLACE FUNCTION reserve_id_block(p_name varchar, p_size integer)
+RETURNS bigint AS $$
+  UPDATE id_blocks
+  SET next_value = next_value + p_size, updated_at = now()
+  WHERE name = p_name
+  RETURNING next_value - p_size;
+$$ LANGUAGE sql;
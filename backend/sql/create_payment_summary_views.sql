@@ -0,0 +1,60 @@
+-- SQL-side aggregation for the admin payments summary
+-- Per-investor money columns are normalised in a view, and the book-wide
+-- headline numbers come from one RPC, so the admin payments page reads a
+-- single JSON object instead of every investor row.
+-- Requires sql/add_investor_search_index.sql (search_text column).
+
+-- Per-investor totals, paged by the API on (created_at DESC, id DESC)
+CREATE OR REPLACE VIEW investor_payment_totals AS
+SELECT
+  id,
+  first_name,
+  surname,
+  email,
+  COALESCE(initial_investment, 0) AS initial_investment,
+  COALESCE(NULLIF(total_investment, 0), initial_investment, 0) AS total_investment,
+  COALESCE(total_paid, 0) AS total_paid,
+  CASE WHEN payment_status IN ('completed', 'success') THEN 0
+       ELSE COALESCE(NULLIF(total_investment, 0), initial_investment, 0)
+  END AS pending_amount,
+  payment_status,
+  paystack_reference,
+  portfolio_type,
+  investment_type,
+  search_text,
+  created_at
+FROM investors;
+
+-- Book-wide totals plus counts per portfolio and investment type
+CREATE OR REPLACE FUNCTION admin_payments_totals()
+RETURNS jsonb AS $$
+  WITH totals AS (
+    SELECT total_investment, total_paid, pending_amount, portfolio_type, investment_type
+    FROM investor_payment_totals
+  )
+  SELECT jsonb_build_object(
+    'investor_count', (SELECT COUNT(*) FROM totals),
+    'total_invested', (SELECT COALESCE(SUM(total_investment), 0) FROM totals),
+    'total_paid', (SELECT COALESCE(SUM(total_paid), 0) FROM totals),
+    'total_pending', (SELECT COALESCE(SUM(pending_amount), 0) FROM totals),
+    'pending_count', (SELECT COUNT(*) FROM totals WHERE pending_amount > 0),
+    'by_portfolio', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'portfolio_type', portfolio_type, 'investors', investors, 'total_invested', invested
+      ) ORDER BY investors DESC)
+      FROM (
+        SELECT portfolio_type, COUNT(*) AS investors, SUM(total_investment) AS invested
+        FROM totals GROUP BY portfolio_type
+      ) p
+    ), '[]'::jsonb),
+    'by_investment_type', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'investment_type', investment_type, 'investors', investors, 'total_invested', invested
+      ) ORDER BY investors DESC)
+      FROM (
+        SELECT investment_type, COUNT(*) AS investors, SUM(total_investment) AS invested
+        FROM totals GROUP BY investment_type
+      ) t
+    ), '[]'::jsonb)
+  );
+$$ LANGUAGE sql STABLE;
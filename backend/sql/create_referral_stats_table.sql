@@ -0,0 +1,50 @@
+-- Per-referrer referral counters
+-- Maintained by the API when a referral code is used and when points are
+-- awarded, so referral stats are a single-row read instead of a scan of
+-- every user_referrals row for the referrer.
+
+CREATE TABLE IF NOT EXISTS referral_stats (
+  referrer_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+  total_referrals INTEGER NOT NULL DEFAULT 0,
+  successful_referrals INTEGER NOT NULL DEFAULT 0,
+  total_points_earned INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- Atomic increment; creates the row on a referrer's first referral
+CREATE OR REPLACE FUNCTION increment_referral_stats(
+  p_referrer_id UUID,
+  p_total INTEGER DEFAULT 0,
+  p_successful INTEGER DEFAULT 0,
+  p_points INTEGER DEFAULT 0
+)
+RETURNS referral_stats AS $$
+  INSERT INTO referral_stats (referrer_id, total_referrals, successful_referrals, total_points_earned)
+  VALUES (p_referrer_id, p_total, p_successful, p_points)
+  ON CONFLICT (referrer_id) DO UPDATE SET
+    total_referrals = referral_stats.total_referrals + EXCLUDED.total_referrals,
+    successful_referrals = referral_stats.successful_referrals + EXCLUDED.successful_referrals,
+    total_points_earned = referral_stats.total_points_earned + EXCLUDED.total_points_earned,
+    updated_at = now()
+  RETURNING *;
+$$ LANGUAGE sql;
+
+-- Backfill from existing referrals (safe to re-run)
+INSERT INTO referral_stats (referrer_id, total_referrals, successful_referrals, total_points_earned)
+SELECT
+  referrer_id,
+  COUNT(*),
+  COUNT(*) FILTER (WHERE investor_account_created),
+  COALESCE(SUM(points_awarded), 0)
+FROM user_referrals
+WHERE referrer_id IS NOT NULL
+GROUP BY referrer_id
+ON CONFLICT (referrer_id) DO UPDATE SET
+  total_referrals = EXCLUDED.total_referrals,
+  successful_referrals = EXCLUDED.successful_referrals,
+  total_points_earned = EXCLUDED.total_points_earned,
+  updated_at = now();
+
+-- Keyset pagination for downlines (newest first)
+CREATE INDEX IF NOT EXISTS idx_user_referrals_referrer_created
+  ON user_referrals(referrer_id, created_at DESC, id DESC);
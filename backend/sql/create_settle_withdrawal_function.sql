@@ -0,0 +1,78 @@
+-- Settle a withdrawal in one transaction
+-- Marking a withdrawal as sent used to rewrite amount_due on every
+-- transaction the investor ever made, firing the updated_at trigger once per
+-- historical row, and then read-modify-write investors.total_paid. This does
+-- the same work in one round trip and touches only:
+--   * the withdrawal row itself;
+--   * the investor's open amount-due rows (the ones the dashboard sums:
+--     not a withdrawal request, not an end/renew record, not a credit) whose
+--     amount_due actually changes;
+--   * the investor row, whose total_paid is incremented in place.
+-- The withdrawal row is locked first, so two admins approving the same
+-- withdrawal settle it once; the second call gets already_sent = true.
+-- Only 'pending' and 'processing' (claimed by a payout) withdrawals settle;
+-- a rejected one raises instead of being booked as paid.
+-- A NULL p_amount_due settles the withdrawal without touching amount_due.
+
+-- Keeps the open-row update proportional to open rows, not to history
+CREATE INDEX IF NOT EXISTS idx_transactions_open_amount_due
+  ON transactions(investor_id)
+  WHERE withdrawal_requested = false
+    AND transaction_type NOT IN ('end_investment', 'renew_investment');
+
+CREATE OR REPLACE FUNCTION settle_withdrawal(p_transaction_id varchar, p_amount_due numeric)
+RETURNS jsonb AS $$
+DECLARE
+  v_withdrawal transactions%ROWTYPE;
+  v_total_paid numeric;
+  v_rows integer;
+BEGIN
+  SELECT * INTO v_withdrawal
+  FROM transactions
+  WHERE transaction_id = p_transaction_id AND transaction_type = 'withdrawal'
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Withdrawal % not found', p_transaction_id;
+  END IF;
+
+  IF v_withdrawal.withdraw_status = 'sent' THEN
+    RETURN jsonb_build_object('already_sent', true, 'transaction', to_jsonb(v_withdrawal));
+  END IF;
+
+  IF v_withdrawal.withdraw_status IS NULL OR v_withdrawal.withdraw_status NOT IN ('pending', 'processing') THEN
+    RAISE EXCEPTION 'Withdrawal % is %, not pending', p_transaction_id, v_withdrawal.withdraw_status;
+  END IF;
+
+  UPDATE investors
+  SET total_paid = COALESCE(total_paid, 0) + v_withdrawal.amount, updated_at = now()
+  WHERE id = v_withdrawal.investor_id
+  RETURNING total_paid INTO v_total_paid;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Investor % not found', v_withdrawal.investor_id;
+  END IF;
+
+  UPDATE transactions
+  SET withdraw_status = 'sent', withdrawal_amount = amount, failure_reason = NULL
+  WHERE id = v_withdrawal.id
+  RETURNING * INTO v_withdrawal;
+
+  UPDATE transactions
+  SET amount_due = round(p_amount_due, 2)
+  WHERE investor_id = v_withdrawal.investor_id
+    AND withdrawal_requested = false
+    AND transaction_type NOT IN ('end_investment', 'renew_investment')
+    AND amount_due >= 0
+    AND p_amount_due IS NOT NULL
+    AND amount_due IS DISTINCT FROM round(p_amount_due, 2);
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+  RETURN jsonb_build_object(
+    'already_sent', false,
+    'transaction', to_jsonb(v_withdrawal),
+    'total_paid', v_total_paid,
+    'amount_due_rows_updated', v_rows
+  );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,60 @@
+-- Spending-account access in one round trip
+-- The API used to select an investor's account, insert it when missing, and
+-- change balances with a read-modify-write, so a payout and a withdrawal
+-- landing together could overwrite each other. These functions fetch or
+-- create the account in one call and apply balance changes as deltas in a
+-- single UPDATE.
+
+-- Returns the investor's account, creating it on first use. investor_id has
+-- no unique constraint, so creation is serialised per investor with an
+-- advisory lock; where duplicates already exist the oldest account wins.
+CREATE OR REPLACE FUNCTION spending_account_for(p_investor_id uuid)
+RETURNS spending_accounts AS $$
+DECLARE
+  v_account spending_accounts%ROWTYPE;
+BEGIN
+  SELECT * INTO v_account FROM spending_accounts
+  WHERE investor_id = p_investor_id
+  ORDER BY created_at, id
+  LIMIT 1;
+  IF FOUND THEN
+    RETURN v_account;
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtext('spending_accounts:' || p_investor_id::text));
+
+  SELECT * INTO v_account FROM spending_accounts
+  WHERE investor_id = p_investor_id
+  ORDER BY created_at, id
+  LIMIT 1;
+  IF NOT FOUND THEN
+    INSERT INTO spending_accounts (investor_id, balance, total_withdrawn)
+    VALUES (p_investor_id, 0, 0)
+    RETURNING * INTO v_account;
+  END IF;
+  RETURN v_account;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Adds p_amount to the balance and p_withdrawn to total_withdrawn and returns
+-- the updated row. A debit that would take the balance below zero changes
+-- nothing and returns no row.
+CREATE OR REPLACE FUNCTION adjust_spending_account(
+  p_investor_id uuid,
+  p_amount numeric,
+  p_withdrawn numeric DEFAULT 0
+)
+RETURNS SETOF spending_accounts AS $$
+DECLARE
+  v_id uuid;
+BEGIN
+  v_id := (spending_account_for(p_investor_id)).id;
+  RETURN QUERY
+  UPDATE spending_accounts
+  SET balance = COALESCE(balance, 0) + p_amount,
+      total_withdrawn = COALESCE(total_withdrawn, 0) + p_withdrawn
+  WHERE id = v_id
+    AND (p_amount >= 0 OR COALESCE(balance, 0) + p_amount >= 0)
+  RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,51 @@
+-- Bulk withdrawal payouts (POST /admin/withdrawals/bulk-approve)
+-- A payout run claims pending withdrawals by moving them to 'processing',
+-- pays them with one Paystack bulk transfer per chunk and settles each chunk
+-- with a single settle_withdrawals() call. Requires
+-- create_settle_withdrawal_function.sql.
+--
+-- withdraw_status values are now: none, pending, processing, failed, sent.
+
+-- Paystack transfer recipient, created once per investor and reused
+ALTER TABLE investors ADD COLUMN IF NOT EXISTS paystack_recipient_code varchar(50);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_withdrawals_processing
+  ON transactions(transaction_id)
+  WHERE withdraw_status = 'processing';
+
+-- p_items: [{"transaction_id", "amount_due", "transfer_code", "transfer_status"}, ...]
+-- Each item settles in its own subtransaction, so one bad row is reported
+-- back instead of rolling back the whole chunk.
+CREATE OR REPLACE FUNCTION settle_withdrawals(p_items jsonb)
+RETURNS jsonb AS $$
+DECLARE
+  v_item jsonb;
+  v_settled jsonb;
+  v_results jsonb := '[]'::jsonb;
+BEGIN
+  FOR v_item IN SELECT * FROM jsonb_array_elements(p_items) LOOP
+    BEGIN
+      v_settled := settle_withdrawal(v_item->>'transaction_id', (v_item->>'amount_due')::numeric);
+
+      UPDATE transactions
+      SET paystack_ref = v_item->>'transfer_code',
+          paystack_status = v_item->>'transfer_status',
+          paystack_timestamp = now()
+      WHERE transaction_id = v_item->>'transaction_id';
+
+      v_results := v_results || jsonb_build_object(
+        'transaction_id', v_item->>'transaction_id',
+        'success', true,
+        'already_sent', v_settled->'already_sent'
+      );
+    EXCEPTION WHEN OTHERS THEN
+      v_results := v_results || jsonb_build_object(
+        'transaction_id', v_item->>'transaction_id',
+        'success', false,
+        'error', SQLERRM
+      );
+    END;
+  END LOOP;
+  RETURN v_results;
+END;
+$$ LANGUAGE plpgsql;
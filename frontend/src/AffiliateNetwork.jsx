@@ -11,6 +11,8 @@ const AffiliateNetwork = () => {
   const [userData, setUserData] = useState(null);
   const [referralStats, setReferralStats] = useState(null);
   const [downlines, setDownlines] = useState([]);
+  const [downlinesCursor, setDownlinesCursor] = useState(null);
+  const [loadingMoreDownlines, setLoadingMoreDownlines] = useState(false);
   const [loadingReferralCode, setLoadingReferralCode] = useState(true);
   const [loadingStats, setLoadingStats] = useState(true);
   const [loadingPoints, setLoadingPoints] = useState(true);
@@ -71,6 +73,7 @@ const AffiliateNetwork = () => {
         // Handle downlines
         if (downlinesResponse.status === 'fulfilled') {
           setDownlines(downlinesResponse.value.downlines || []);
+          setDownlinesCursor(downlinesResponse.value.next_cursor || null);
         } else {
           console.error('Error loading downlines:', downlinesResponse.reason);
         }
@@ -121,6 +124,7 @@ const AffiliateNetwork = () => {
 
       if (downlinesResponse.status === 'fulfilled') {
         setDownlines(downlinesResponse.value.downlines || []);
+        setDownlinesCursor(downlinesResponse.value.next_cursor || null);
       }
 
     } catch (err) {
@@ -130,6 +134,20 @@ const AffiliateNetwork = () => {
     }
   };
 
+  const handleLoadMoreDownlines = async () => {
+    if (!downlinesCursor) return;
+    setLoadingMoreDownlines(true);
+    try {
+      const page = await referralAPI.getDownlines(downlinesCursor);
+      setDownlines(prev => [...prev, ...(page.downlines || [])]);
+      setDownlinesCursor(page.next_cursor || null);
+    } catch (err) {
+      console.error('Error loading more downlines:', err);
+    } finally {
+      setLoadingMoreDownlines(false);
+    }
+  };
+
   const handleCopyReferralCode = () => {
     if (userData?.referralCode) {
       navigator.clipboard.writeText(userData.referralCode);
@@ -436,7 +454,7 @@ const AffiliateNetwork = () => {
               <div className="w-8 h-8 bg-gradient-to-br from-blue-400 to-indigo-500 rounded-lg flex items-center justify-center">
                 <Users className="w-5 h-5 text-white" />
               </div>
-              Your Referrals ({downlines.length})
+              Your Referrals ({downlinesCursor ? referralStats?.total_referrals ?? `${downlines.length}+` : downlines.length})
             </h2>
 
             <div className="space-y-3">
@@ -445,7 +463,7 @@ const AffiliateNetwork = () => {
                   key={downline.id}
                   initial={{ opacity: 0, y: 10 }}
                   animate={{ opacity: 1, y: 0 }}
-                  transition={{ delay: 0.1 * index }}
+                  transition={{ delay: 0.1 * (index % 50) }}
                   className="bg-gradient-to-r from-gray-50 to-blue-50 rounded-xl p-4 border border-gray-200 hover:shadow-md transition-shadow"
                 >
                   <div className="flex items-center justify-between mb-2">
@@ -475,6 +493,18 @@ const AffiliateNetwork = () => {
                 </motion.div>
               ))}
 
+              {downlinesCursor && (
+                <div className="text-center pt-2">
+                  <button
+                    onClick={handleLoadMoreDownlines}
+                    disabled={loadingMoreDownlines}
+                    className="px-4 py-2 text-sm font-medium text-blue-600 bg-white border border-blue-200 rounded-lg hover:bg-blue-50 disabled:opacity-50"
+                  >
+                    {loadingMoreDownlines ? 'Loading...' : 'Load more'}
+                  </button>
+                </div>
+              )}
+
               {downlines.length === 0 && (
                 <div className="text-center py-8">
                   <Users className="w-12 h-12 text-gray-300 mx-auto mb-3" />
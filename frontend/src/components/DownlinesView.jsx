@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { Users, ChevronDown, ChevronRight, Crown, User, TrendingUp, Calendar, RefreshCw } from 'lucide-react';
 
-const DownlinesView = ({ downlines = [], loading = false, showSpinner = false }) => {
+const DownlinesView = ({ downlines = [], loading = false, showSpinner = false, hasMore = false, loadingMore = false, onLoadMore }) => {
   const [expandedUsers, setExpandedUsers] = useState(new Set());
 
   const toggleExpanded = (userId) => {
@@ -317,6 +317,18 @@ const DownlinesView = ({ downlines = [], loading = false, showSpinner = false })
         <div className="space-y-2">
           {downlines.map((user, index) => renderUserNode(user, 1, index === downlines.length - 1))}
         </div>
+
+        {hasMore && onLoadMore && (
+          <div className="mt-4 text-center">
+            <button
+              onClick={onLoadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 text-sm font-medium text-indigo-600 bg-white border border-indigo-200 rounded-lg hover:bg-indigo-50 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Network Tips */}
@@ -6,14 +6,21 @@ const AdminInvestors = () => {
     const [loading, setLoading] = useState(true);
     const [search, setSearch] = useState('');
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
-    const fetchInvestors = async (searchQuery = '') => {
-        setLoading(true);
+    const fetchInvestors = async (searchQuery = '', cursor = null) => {
+        if (cursor) {
+            setLoadingMore(true);
+        } else {
+            setLoading(true);
+        }
         try {
             const token = localStorage.getItem('adminToken');
-            const url = searchQuery
-                ? `http://localhost:8000/admin/investors?search=${searchQuery}`
-                : 'http://localhost:8000/admin/investors';
+            const params = new URLSearchParams();
+            if (searchQuery) params.set('search', searchQuery);
+            if (cursor) params.set('cursor', cursor);
+            const url = `http://localhost:8000/admin/investors?${params.toString()}`;
 
             const response = await fetch(url, {
                 headers: { 'Authorization': `Bearer ${token}` }
@@ -21,7 +28,8 @@ const AdminInvestors = () => {
             const data = await response.json();
 
             if (data.success) {
-                setInvestors(data.data);
+                setInvestors(cursor ? (prev) => [...prev, ...data.data] : data.data);
+                setNextCursor(data.next_cursor || null);
             } else {
                 setError(data.detail || 'Failed to fetch investors');
             }
@@ -29,6 +37,7 @@ const AdminInvestors = () => {
             setError('Network error');
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
@@ -49,7 +58,7 @@ const AdminInvestors = () => {
                     <input
                         type="text"
                         className="admin-search-bar"
-                        placeholder="Search by email..."
+                        placeholder="Search by email, name or account number..."
                         value={search}
                         onChange={(e) => setSearch(e.target.value)}
                     />
@@ -90,6 +99,17 @@ const AdminInvestors = () => {
                             ))}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div style={{ marginTop: '16px', textAlign: 'center' }}>
+                            <button
+                                className="admin-btn-secondary"
+                                disabled={loadingMore}
+                                onClick={() => fetchInvestors(search, nextCursor)}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
         </div>
@@ -6,14 +6,22 @@ const AdminPayments = () => {
     const [loading, setLoading] = useState(true);
     const [search, setSearch] = useState('');
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [totals, setTotals] = useState(null);
 
-    const fetchPayments = async (searchQuery = '') => {
-        setLoading(true);
+    const fetchPayments = async (searchQuery = '', cursor = null) => {
+        if (cursor) {
+            setLoadingMore(true);
+        } else {
+            setLoading(true);
+        }
         try {
             const token = localStorage.getItem('adminToken');
-            const url = searchQuery
-                ? `http://localhost:8000/admin/payments?search=${searchQuery}`
-                : 'http://localhost:8000/admin/payments';
+            const params = new URLSearchParams();
+            if (searchQuery) params.set('search', searchQuery);
+            if (cursor) params.set('cursor', cursor);
+            const url = `http://localhost:8000/admin/payments?${params.toString()}`;
 
             const response = await fetch(url, {
                 headers: { 'Authorization': `Bearer ${token}` }
@@ -21,7 +29,9 @@ const AdminPayments = () => {
             const data = await response.json();
 
             if (data.success) {
-                setPayments(data.data);
+                setPayments(cursor ? (prev) => [...prev, ...data.data] : data.data);
+                setNextCursor(data.next_cursor || null);
+                if (!cursor) setTotals(data.totals || null);
             } else {
                 setError(data.detail || 'Failed to fetch payments');
             }
@@ -29,6 +39,7 @@ const AdminPayments = () => {
             setError('Network error');
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
@@ -49,7 +60,7 @@ const AdminPayments = () => {
                     <input
                         type="text"
                         className="admin-search-bar"
-                        placeholder="Search by email..."
+                        placeholder="Search by email, name or account number..."
                         value={search}
                         onChange={(e) => setSearch(e.target.value)}
                     />
@@ -58,6 +69,15 @@ const AdminPayments = () => {
 
             {error && <div className="error-message">{error}</div>}
 
+            {totals && (
+                <div style={{ display: 'flex', gap: '24px', flexWrap: 'wrap', marginBottom: '16px' }}>
+                    <div><small>Investors</small><h4>{totals.investor_count.toLocaleString()}</h4></div>
+                    <div><small>Total Invested</small><h4>₦{Number(totals.total_invested).toLocaleString()}</h4></div>
+                    <div><small>Total Paid</small><h4>₦{Number(totals.total_paid).toLocaleString()}</h4></div>
+                    <div><small>Pending ({totals.pending_count})</small><h4>₦{Number(totals.total_pending).toLocaleString()}</h4></div>
+                </div>
+            )}
+
             {loading ? (
                 <div>Loading...</div>
             ) : (
@@ -79,9 +99,9 @@ const AdminPayments = () => {
                                 <tr key={p.id}>
                                     <td>{p.name}</td>
                                     <td>{p.email}</td>
-                                    <td>₦{p.initial_investment.toLocaleString()}</td>
-                                    <td>₦{p.total_investment.toLocaleString()}</td>
-                                    <td>₦{p.total_paid.toLocaleString()}</td>
+                                    <td>₦{Number(p.initial_investment).toLocaleString()}</td>
+                                    <td>₦{Number(p.total_investment).toLocaleString()}</td>
+                                    <td>₦{Number(p.total_paid).toLocaleString()}</td>
                                     <td>
                                         <span className={`status-badge ${p.payment_status === 'success' ? 'status-success' : 'status-pending'}`}>
                                             {p.payment_status || 'Pending'}
@@ -92,6 +112,17 @@ const AdminPayments = () => {
                             ))}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div style={{ marginTop: '16px', textAlign: 'center' }}>
+                            <button
+                                className="admin-btn-secondary"
+                                disabled={loadingMore}
+                                onClick={() => fetchPayments(search, nextCursor)}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
         </div>
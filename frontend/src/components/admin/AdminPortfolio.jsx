@@ -6,16 +6,23 @@ const AdminPortfolio = () => {
     const [loading, setLoading] = useState(true);
     const [search, setSearch] = useState('');
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [editingId, setEditingId] = useState(null);
     const [editForm, setEditForm] = useState({});
 
-    const fetchPortfolios = async (searchQuery = '') => {
-        setLoading(true);
+    const fetchPortfolios = async (searchQuery = '', cursor = null) => {
+        if (cursor) {
+            setLoadingMore(true);
+        } else {
+            setLoading(true);
+        }
         try {
             const token = localStorage.getItem('adminToken');
-            const url = searchQuery
-                ? `http://localhost:8000/admin/portfolio?search=${searchQuery}`
-                : 'http://localhost:8000/admin/portfolio';
+            const params = new URLSearchParams();
+            if (searchQuery) params.set('search', searchQuery);
+            if (cursor) params.set('cursor', cursor);
+            const url = `http://localhost:8000/admin/portfolio?${params.toString()}`;
 
             const response = await fetch(url, {
                 headers: { 'Authorization': `Bearer ${token}` }
@@ -23,7 +30,8 @@ const AdminPortfolio = () => {
             const data = await response.json();
 
             if (data.success) {
-                setPortfolios(data.data);
+                setPortfolios(cursor ? (prev) => [...prev, ...data.data] : data.data);
+                setNextCursor(data.next_cursor || null);
             } else {
                 setError(data.detail || 'Failed to fetch portfolios');
             }
@@ -31,6 +39,7 @@ const AdminPortfolio = () => {
             setError('Network error');
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
@@ -81,7 +90,7 @@ const AdminPortfolio = () => {
                     <input
                         type="text"
                         className="admin-search-bar"
-                        placeholder="Search by email..."
+                        placeholder="Search by email, name or account number..."
                         value={search}
                         onChange={(e) => setSearch(e.target.value)}
                     />
@@ -130,6 +139,17 @@ const AdminPortfolio = () => {
                             ))}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div style={{ marginTop: '16px', textAlign: 'center' }}>
+                            <button
+                                className="admin-btn-secondary"
+                                disabled={loadingMore}
+                                onClick={() => fetchPortfolios(search, nextCursor)}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
@@ -540,8 +540,10 @@ class DashboardAPI {
     });
   }
 
-  async getDownlines() {
-    return this.fetchWithAuth('/referral/downlines');
+  async getDownlines(cursor = null, limit = 50) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.set('cursor', cursor);
+    return this.fetchWithAuth(`/referral/downlines?${params.toString()}`);
   }
 
   // Delete user account
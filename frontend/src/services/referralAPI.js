@@ -87,9 +87,11 @@ class ReferralAPI {
     });
   }
 
-  // Get referral downlines
-  async getDownlines() {
-    return this.fetchWithAuth('/referral/downlines');
+  // Get one page of referral downlines; pass the previous page's next_cursor for the next one
+  async getDownlines(cursor = null, limit = 50) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.set('cursor', cursor);
+    return this.fetchWithAuth(`/referral/downlines?${params.toString()}`);
   }
 
   // Award points (admin/internal use)